@@ -71,7 +71,8 @@ export function useWishlistData(urlEnding: string) {
       try {
         const response = await fetch(`/api/get_wishlist?urlEnding=${urlEnding}`, { signal: controller.signal });
         const data = await response.json();
-        const result = JSON.parse(data.responseData.result);
+        const rawResult = data.responseData.result;
+        const result = typeof rawResult === 'string' ? JSON.parse(rawResult) : rawResult;
 
         const basicWishlistData = result.data.map((item: { link: string; name: string; image: string }) => ({
           link: item.link, name: item.name, image: item.image
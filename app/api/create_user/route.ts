@@ -24,7 +24,8 @@ export async function POST(req: NextRequest) {
             headers: { 'Content-Type': 'application/json', 'X-API-Key': process.env.FLASK_API_KEY || '' },
             body: JSON.stringify({
                 email: encrypt(email),
-                password: encrypt(password)
+                password: encrypt(password),
+                keep_session: true
             })
         })
 
@@ -35,7 +35,8 @@ async function fetchComicDataFromBackend(url: string): Promise<BackendComicData
         headers: {
           'Accept': 'application/json',
           'X-Requested-With': 'XMLHttpRequest',
-          'X-API-Key': process.env.FLASK_API_KEY || ''
+          'X-API-Key': process.env.FLASK_API_KEY || '',
+          'X-Request-Deadline': String(Date.now() + 30000)
         }
       });
 
@@ -48,7 +49,11 @@ async function fetchComicDataFromBackend(url: string): Promise<BackendComicData
         if (response.status === 404 && retries === 0) {
           const postResponse = await fetch(`${backendUrl}/get_comic_information`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json', 'X-API-Key': process.env.FLASK_API_KEY || '' },
+            headers: {
+              'Content-Type': 'application/json',
+              'X-API-Key': process.env.FLASK_API_KEY || '',
+              'X-Request-Deadline': String(Date.now() + 30000)
+            },
             body: JSON.stringify({ url }),
             signal: AbortSignal.timeout(30000)
           });
@@ -0,0 +1,653 @@
+"""Shared caching forward proxy for the static assets of the scrape browsers.
+
+Every Chrome from ``get_chrome_options()`` goes through a proxy on 127.0.0.1
+that runs inside this process, so Magento's JS bundles, CSS, the Gigya SDK
+and fonts are downloaded once instead of once per fresh browser profile.
+
+Responses that are safe to share are kept on disk under ASSET_PROXY_DIR, one
+file per URL. To be shared, a response must be a 200 answer to a GET, have a
+script, stylesheet, font or image content type, carry no Set-Cookie, and not
+be ``private`` or ``no-store``. They are served from disk while fresh by
+their Cache-Control/Expires headers, and revalidated with their ETag or
+Last-Modified once stale. HTML and everything else passes through uncached.
+The cache is bounded by ASSET_PROXY_MAX_BYTES and evicts the least recently
+used entries. Worker processes share the directory.
+
+panini.de is HTTPS only, so assets can only be cached where the proxy may
+terminate TLS. Set ASSET_PROXY_CA_CERT and ASSET_PROXY_CA_KEY to the PEM
+files of a CA of your own (this needs the ``cryptography`` package). The
+proxy then issues per-host certificates from it, and Chrome is told to
+accept that CA's certificates only. Without a CA, HTTPS goes through as
+opaque CONNECT tunnels, and the proxy stays off unless ASSET_PROXY_ENABLED
+is set.
+"""
+import base64
+import contextlib
+import datetime
+import hashlib
+import ipaddress
+import json
+import os
+import select
+import socket
+import ssl
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, BinaryIO
+
+import urllib3
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+ASSET_PROXY_CA_CERT = os.environ.get("ASSET_PROXY_CA_CERT", "")
+ASSET_PROXY_CA_KEY = os.environ.get("ASSET_PROXY_CA_KEY", "")
+ASSET_PROXY_ENABLED = os.environ.get(
+    "ASSET_PROXY_ENABLED", "1" if ASSET_PROXY_CA_CERT and ASSET_PROXY_CA_KEY else "0"
+).lower() in ("1", "true", "yes")
+ASSET_PROXY_DIR = os.environ.get("ASSET_PROXY_DIR", os.path.join(_HERE, "data", "asset_cache"))
+ASSET_PROXY_MAX_BYTES = int(os.environ.get("ASSET_PROXY_MAX_BYTES", str(500 * 1024 * 1024)))
+ASSET_PROXY_MAX_OBJECT_BYTES = int(os.environ.get("ASSET_PROXY_MAX_OBJECT_BYTES", str(20 * 1024 * 1024)))
+ASSET_PROXY_TIMEOUT = float(os.environ.get("ASSET_PROXY_TIMEOUT", "30"))
+# Assets with only a Last-Modified stay fresh for a tenth of their age, at most this long.
+ASSET_PROXY_HEURISTIC_MAX_AGE = float(os.environ.get("ASSET_PROXY_HEURISTIC_MAX_AGE", "86400"))
+_TUNNEL_IDLE_SECONDS = 300
+_LEAF_CERT_DAYS = 30
+_CHUNK = 64 * 1024
+
+_CACHEABLE_TYPES = (
+    "text/css", "text/javascript", "application/javascript", "application/x-javascript",
+    "font/", "application/font", "application/x-font", "application/vnd.ms-fontobject", "image/",
+)
+_HOP_BY_HOP = frozenset({
+    "connection", "keep-alive", "proxy-connection", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+})
+
+
+def _cache_control(headers: Any) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: str | None) -> float | None:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers: Any) -> float:
+    """Seconds a response stays fresh from when it was received, per RFC 9111."""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0.0
+    try:
+        age = float(headers.get("Age") or 0)
+    except ValueError:
+        age = 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0.0, float(directives[name] or "") - age)
+            except ValueError:
+                return 0.0
+    date = _http_date(headers.get("Date")) or time.time()
+    if headers.get("Expires") is not None:
+        expires = _http_date(headers.get("Expires"))
+        return max(0.0, expires - date - age) if expires is not None else 0.0
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return max(0.0, min(ASSET_PROXY_HEURISTIC_MAX_AGE, (date - last_modified) / 10) - age)
+    return 0.0
+
+
+def is_cacheable(method: str, request_headers: Any, status: int, headers: Any) -> bool:
+    """Whether a response may be shared between browser sessions."""
+    if method != "GET" or status != 200 or "Authorization" in request_headers:
+        return False
+    directives = _cache_control(headers)
+    if "no-store" in directives or "private" in directives or "Set-Cookie" in headers:
+        return False
+    if (headers.get("Vary") or "").strip() == "*":
+        return False
+    content_type = (headers.get("Content-Type") or "").split(";")[0].strip().lower()
+    return content_type.startswith(_CACHEABLE_TYPES)
+
+
+def _vary(request_headers: Any, response_headers: Any) -> dict[str, str]:
+    names = [name.strip().lower() for name in (response_headers.get("Vary") or "").split(",") if name.strip()]
+    return {name: request_headers.get(name) or "" for name in names}
+
+
+class _Writer:
+    """Streams one response into a temporary file that ``commit`` moves into the cache."""
+
+    def __init__(self, cache: "AssetCache", key: str, meta: dict[str, Any]) -> None:
+        self._cache = cache
+        self._key = key
+        self._path = cache.path(key)
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._tmp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file: BinaryIO | None = open(self._tmp_path, "wb")  # noqa: SIM115 - open until commit/abort
+        self._header_size = self._file.write(json.dumps(meta).encode() + b"\n")
+        self._size = 0
+
+    def write(self, chunk: bytes) -> bool:
+        """Append ``chunk``; False (and the entry is dropped) once it outgrows the object limit."""
+        if self._file is None:
+            return False
+        self._size += len(chunk)
+        if self._size > self._cache.max_object_bytes:
+            self.abort()
+            return False
+        self._file.write(chunk)
+        return True
+
+    def commit(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self._path)
+        self._cache.stored(self._key, self._header_size + self._size)
+
+    def abort(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        with contextlib.suppress(OSError):
+            os.remove(self._tmp_path)
+
+
+class AssetCache:
+    """Cached responses on disk: a JSON metadata line followed by the raw (still encoded) body."""
+
+    def __init__(self, directory: str, max_bytes: int = ASSET_PROXY_MAX_BYTES,
+                 max_object_bytes: int = ASSET_PROXY_MAX_OBJECT_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self._lock = threading.Lock()
+        # key -> file size, least recently used first
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self.stats = {"stored": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self) -> None:
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                with contextlib.suppress(OSError):
+                    if name.endswith(".tmp"):
+                        os.remove(path)
+                    else:
+                        found.append((os.path.getmtime(path), name, os.path.getsize(path)))
+        for _, key, size in sorted(found):
+            self._sizes[key] = size
+            self._bytes += size
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def lookup(self, url: str, request_headers: Any) -> tuple[dict[str, Any], BinaryIO, int] | None:
+        """The stored response for ``url`` as (metadata, open body file, body size), if it matches."""
+        key = self.key(url)
+        try:
+            f = open(self.path(key), "rb")  # noqa: SIM115 - the caller closes it
+        except OSError:
+            with self._lock:
+                self._bytes -= self._sizes.pop(key, 0)
+            return None
+        try:
+            meta = json.loads(f.readline())
+            file_size = os.fstat(f.fileno()).st_size
+        except (OSError, ValueError):
+            f.close()
+            return None
+        if meta.get("url") != url or any(request_headers.get(name, "") != value
+                                          for name, value in meta.get("vary", {}).items()):
+            f.close()
+            return None
+        with self._lock:
+            self._bytes += file_size - self._sizes.pop(key, 0)  # it may have been written by another worker
+            self._sizes[key] = file_size
+        return meta, f, file_size - f.tell()
+
+    def writer(self, url: str, meta: dict[str, Any]) -> _Writer:
+        return _Writer(self, self.key(url), {**meta, "url": url})
+
+    def refresh(self, url: str, meta: dict[str, Any], body: BinaryIO) -> None:
+        """Rewrite a revalidated entry with new metadata, keeping its body."""
+        writer = self.writer(url, meta)
+        while chunk := body.read(_CHUNK):
+            if not writer.write(chunk):
+                return
+        writer.commit()
+
+    def stored(self, key: str, size: int) -> None:
+        with self._lock:
+            self._bytes += size - self._sizes.pop(key, 0)
+            self._sizes[key] = size
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits. Caller holds the lock."""
+        while self._bytes > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            with contextlib.suppress(OSError):
+                os.remove(self.path(key))
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._sizes), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class _CertificateAuthority:
+    """Issues a certificate per intercepted host, signed by the operator's CA."""
+
+    def __init__(self, cert_path: str, key_path: str) -> None:
+        from cryptography import x509
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        with open(cert_path, "rb") as f:
+            self._cert_pem = f.read()
+        with open(key_path, "rb") as f:
+            self._key = serialization.load_pem_private_key(f.read(), password=None)
+        self._cert = x509.load_pem_x509_certificate(self._cert_pem)
+        spki = self._cert.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.spki_hash = base64.b64encode(hashlib.sha256(spki).digest()).decode()
+        self._leaf_key = ec.generate_private_key(ec.SECP256R1())
+        self._directory = tempfile.mkdtemp(prefix="asset-proxy-certs-")
+        self._lock = threading.Lock()
+        # host -> (issued at, context)
+        self._contexts: dict[str, tuple[float, ssl.SSLContext]] = {}
+
+    def context_for(self, host: str) -> ssl.SSLContext:
+        with self._lock:
+            issued = self._contexts.get(host)
+            if issued is None or time.time() - issued[0] > _LEAF_CERT_DAYS * 86400 / 2:
+                issued = self._contexts[host] = (time.time(), self._issue(host))
+            return issued[1]
+
+    def _issue(self, host: str) -> ssl.SSLContext:
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.x509.oid import NameOID
+
+        try:
+            name: x509.GeneralName = x509.IPAddress(ipaddress.ip_address(host))
+        except ValueError:
+            name = x509.DNSName(host)
+        now = datetime.datetime.now(datetime.UTC)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host[:64])]))
+            .issuer_name(self._cert.subject)
+            .public_key(self._leaf_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=_LEAF_CERT_DAYS))
+            .add_extension(x509.SubjectAlternativeName([name]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+            .sign(self._key, hashes.SHA256())
+        )
+        stem = os.path.join(self._directory, hashlib.sha256(host.encode()).hexdigest()[:16])
+        with open(f"{stem}.pem", "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM) + self._cert_pem)
+        with open(f"{stem}.key", "wb") as f:
+            f.write(self._leaf_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                                 serialization.NoEncryption()))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(f"{stem}.pem", f"{stem}.key")
+        context.set_alpn_protocols(["http/1.1"])
+        return context
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    server: "_Server"
+    # "host[:port]" of the CONNECT tunnel this connection was switched to, when intercepting
+    tls_authority: str | None = None
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # a page load is a hundred requests; see get_stats() instead
+
+    def finish(self) -> None:
+        super().finish()
+        if self.tls_authority is not None:
+            self.connection.close()  # wrapping detached it from the socket the server closes
+
+    def do_CONNECT(self) -> None:
+        proxy = self.server.proxy
+        host, _, port = self.path.rpartition(":")
+        if not host or not port.isdigit():
+            self.send_error(400, "CONNECT needs host:port")
+            return
+        context = proxy.tls_context(host) if self.tls_authority is None else None
+        if context is None:
+            self._tunnel(host, int(port))
+            return
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        try:
+            connection = context.wrap_socket(self.connection, server_side=True)
+        except (ssl.SSLError, OSError) as e:
+            print(f"Asset proxy TLS handshake for {host} failed: {e}")
+            self.close_connection = True
+            return
+        proxy.count("intercepted")
+        # Read the requests inside the tunnel on this same handler.
+        self.connection = connection
+        self.rfile = connection.makefile("rb", _CHUNK)
+        self.wfile = connection.makefile("wb", _CHUNK)
+        self.tls_authority = host if port == "443" else f"{host}:{port}"
+        self.close_connection = False
+
+    def _tunnel(self, host: str, port: int) -> None:
+        try:
+            upstream = socket.create_connection((host, port), timeout=ASSET_PROXY_TIMEOUT)
+        except OSError as e:
+            self.send_error(502, f"Cannot reach {host}:{port}: {e}")
+            return
+        self.server.proxy.count("tunnels")
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        self.close_connection = True
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], _TUNNEL_IDLE_SECONDS)
+                if not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(_CHUNK)
+                    if not data:
+                        return
+                    (upstream if sock is self.connection else self.connection).sendall(data)
+        except OSError:
+            return
+        finally:
+            upstream.close()
+
+    def _read_body(self) -> bytes | None:
+        if "chunked" in (self.headers.get("Transfer-Encoding") or "").lower():
+            body = bytearray()
+            while size := int(self.rfile.readline().split(b";")[0].strip() or b"0", 16):
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass  # trailers
+            return bytes(body)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else None
+
+    def _forward(self) -> None:
+        proxy = self.server.proxy
+        if self.tls_authority is not None:
+            url = f"https://{self.tls_authority}{self.path}"
+        elif self.path.startswith("http://"):
+            url = self.path
+        else:
+            self.send_error(400, "Not a proxy request")
+            return
+        body = self._read_body()
+        headers = urllib3.HTTPHeaderDict()
+        for name, value in self.headers.items():
+            if name.lower() not in _HOP_BY_HOP and name.lower() != "host":
+                headers.add(name, value)
+        proxy.count("requests")
+
+        cached = None
+        if self.command == "GET" and "Authorization" not in self.headers:
+            cached = proxy.cache.lookup(url, self.headers)
+        if cached is not None:
+            meta, cached_body, size = cached
+            with cached_body:
+                if meta["expires"] > time.time():
+                    proxy.count("hits")
+                    proxy.count("bytes_saved", size)
+                    self._send_cached(meta, cached_body, size)
+                    return
+                if meta.get("etag") or meta.get("last_modified"):
+                    headers.discard("If-None-Match")
+                    headers.discard("If-Modified-Since")
+                    if meta.get("etag"):
+                        headers["If-None-Match"] = meta["etag"]
+                    if meta.get("last_modified"):
+                        headers["If-Modified-Since"] = meta["last_modified"]
+                    response = self._fetch(url, headers, body)
+                    if response is None:
+                        return
+                    if response.status == 304:
+                        response.release_conn()
+                        meta = {**meta, "expires": time.time() + freshness_lifetime(response.headers)}
+                        proxy.cache.refresh(url, meta, cached_body)
+                        cached_body.seek(-size, os.SEEK_END)
+                        proxy.count("revalidated")
+                        proxy.count("bytes_saved", size)
+                        self._send_cached(meta, cached_body, size)
+                        return
+                    self._relay(url, response)
+                    return
+        response = self._fetch(url, headers, body)
+        if response is not None:
+            self._relay(url, response)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _forward
+
+    def _fetch(self, url: str, headers: urllib3.HTTPHeaderDict, body: bytes | None) -> Any:
+        try:
+            return self.server.proxy.pool.request(
+                self.command, url, body=body, headers=headers, preload_content=False,
+                decode_content=False, redirect=False, retries=False)
+        except urllib3.exceptions.HTTPError as e:
+            self.server.proxy.count("errors")
+            self.send_error(502, f"Upstream request failed: {e}")
+            return None
+
+    def _send_cached(self, meta: dict[str, Any], body: BinaryIO, size: int) -> None:
+        self.send_response_only(meta["status"])
+        for name, value in meta["headers"]:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        if self.command != "HEAD":
+            while chunk := body.read(_CHUNK):
+                self.wfile.write(chunk)
+
+    def _relay(self, url: str, response: Any) -> None:
+        """Stream ``response`` to the browser, storing it on the way if it may be shared."""
+        proxy = self.server.proxy
+        stored_headers = [(name, value) for name, value in response.headers.items()
+                          if name.lower() not in _HOP_BY_HOP and name.lower() != "content-length"]
+        writer = None
+        if is_cacheable(self.command, self.headers, response.status, response.headers):
+            proxy.count("misses")
+            writer = proxy.cache.writer(url, {
+                "status": response.status,
+                "headers": stored_headers,
+                "vary": _vary(self.headers, response.headers),
+                "expires": time.time() + freshness_lifetime(response.headers),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            })
+        else:
+            proxy.count("passed")
+        length = response.headers.get("Content-Length")
+        has_body = self.command != "HEAD" and response.status >= 200 and response.status not in (204, 304)
+        chunked = has_body and length is None
+        try:
+            self.send_response_only(response.status, response.reason)
+            for name, value in stored_headers:
+                self.send_header(name, value)
+            if length is not None:
+                self.send_header("Content-Length", length)
+            elif chunked:
+                self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            last = b""
+            if has_body:
+                for chunk in response.stream(_CHUNK, decode_content=False):
+                    proxy.count("bytes_fetched", len(chunk))
+                    if writer is not None and not writer.write(chunk):
+                        writer = None
+                    self._write_body(last, chunked)
+                    last = chunk
+        except (OSError, urllib3.exceptions.HTTPError):
+            self.close_connection = True  # the browser or the site went away mid-response
+            if writer is not None:
+                writer.abort()
+            return
+        finally:
+            response.release_conn()
+        # The response only ends once it is in the cache, so the browser's next request can hit it.
+        if writer is not None:
+            try:
+                writer.commit()
+            except OSError as e:
+                print(f"Asset proxy could not store {url}: {e}")
+        try:
+            self._write_body(last, chunked)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            self.close_connection = True
+
+    def _write_body(self, chunk: bytes, chunked: bool) -> None:
+        if chunk:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n" if chunked else chunk)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    proxy: "AssetProxy"
+
+
+class AssetProxy:
+    """The proxy server, listening on an ephemeral port of 127.0.0.1."""
+
+    def __init__(self, directory: str = ASSET_PROXY_DIR, max_bytes: int = ASSET_PROXY_MAX_BYTES,
+                 ca_cert: str = ASSET_PROXY_CA_CERT, ca_key: str = ASSET_PROXY_CA_KEY) -> None:
+        self.cache = AssetCache(directory, max_bytes)
+        self.pool = urllib3.PoolManager(
+            num_pools=32,
+            maxsize=8,
+            block=False,
+            timeout=urllib3.Timeout(connect=5, read=ASSET_PROXY_TIMEOUT),
+            retries=False,
+        )
+        self._ca: _CertificateAuthority | None = None
+        if ca_cert and ca_key:
+            try:
+                self._ca = _CertificateAuthority(ca_cert, ca_key)
+            except ImportError:
+                print("Asset proxy: the cryptography package is needed to cache HTTPS; tunnelling it instead")
+            except (OSError, ValueError) as e:
+                print(f"Asset proxy: cannot load the CA ({e}); tunnelling HTTPS instead")
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "hits": 0, "revalidated": 0, "misses": 0, "passed": 0, "tunnels": 0,
+                        "intercepted": 0, "errors": 0, "bytes_saved": 0, "bytes_fetched": 0}
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.proxy = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="asset-proxy", daemon=True).start()
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def tls_context(self, host: str) -> ssl.SSLContext | None:
+        """The context to intercept ``host`` with, or None to tunnel it."""
+        if self._ca is None:
+            return None
+        try:
+            return self._ca.context_for(host)
+        except Exception as e:
+            print(f"Asset proxy: cannot issue a certificate for {host}: {e}")
+            return None
+
+    def chrome_arguments(self) -> list[str]:
+        arguments = [f"--proxy-server=http://{self.address}"]
+        if self._ca is not None:
+            arguments.append(f"--ignore-certificate-errors-spki-list={self._ca.spki_hash}")
+        return arguments
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        from_cache = counts["hits"] + counts["revalidated"]
+        return {
+            **counts,
+            "hit_rate": round(from_cache / counts["requests"], 3) if counts["requests"] else 0.0,
+            "cacheable_hit_rate": round(from_cache / (from_cache + counts["misses"]), 3)
+            if from_cache + counts["misses"] else 0.0,
+            "intercepting": self._ca is not None,
+            "address": self.address,
+            "cache": self.cache.get_stats(),
+        }
+
+
+_lock = threading.Lock()
+_proxy: AssetProxy | None = None
+_proxy_pid = 0
+
+
+def get_proxy() -> AssetProxy | None:
+    """This process's proxy, started on first use; None if disabled or it cannot start."""
+    global _proxy, _proxy_pid
+    if not ASSET_PROXY_ENABLED:
+        return None
+    with _lock:
+        # A forked gunicorn worker inherits the object but not the server thread.
+        if _proxy is None or _proxy_pid != os.getpid():
+            try:
+                _proxy = AssetProxy()
+            except OSError as e:
+                print(f"Asset proxy could not start, browsers connect directly: {e}")
+                return None
+            _proxy_pid = os.getpid()
+        return _proxy
+
+
+def chrome_arguments() -> list[str]:
+    """Chrome flags that route a browser through the proxy; empty when it is off."""
+    proxy = get_proxy()
+    return proxy.chrome_arguments() if proxy is not None else []
+
+
+def get_stats() -> dict[str, Any]:
+    with _lock:
+        proxy = _proxy if _proxy_pid == os.getpid() else None
+    return {"enabled": ASSET_PROXY_ENABLED, **(proxy.get_stats() if proxy is not None else {})}
@@ -0,0 +1,133 @@
+"""AES-256-GCM helpers shared by encrypt.py and decrypt_string.py.
+
+Three interchangeable encodings of the same (iv, tag, ciphertext) triple:
+
+* hex wire format ``iv:authTag:ciphertext`` - what the Next.js side stores
+* compact wire format ``g1.<urlsafe base64 of iv|tag|ciphertext>``
+* packed bytes ``iv|tag|ciphertext`` for bulk data that never leaves Python
+
+``decrypt_many``/``encrypt_many`` work on whole batches with a single key
+object, and accept bytes or memoryviews so packed blobs are decrypted without
+any hex round-trip.
+"""
+import base64
+import binascii
+import os
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Literal
+
+from Crypto.Cipher import AES
+
+from secret_key import load_secret_key
+
+IV_SIZE = 12
+TAG_SIZE = 16
+COMPACT_PREFIX = "g1."
+
+Token = str | bytes | bytearray | memoryview
+Plaintext = str | bytes | bytearray | memoryview
+
+
+def _to_bytes(value: Plaintext) -> bytes:
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, bytes):
+        return value
+    return bytes(value)
+
+
+class CipherKey:
+    """A validated AES-256 key with single and batch encrypt/decrypt helpers."""
+
+    def __init__(self, key: bytes) -> None:
+        if len(key) != 32:
+            raise ValueError('SECRET_KEY must be 32 bytes')
+        self.key = key
+
+    def encrypt_parts(self, plaintext: Plaintext) -> tuple[bytes, bytes, bytes]:
+        iv = os.urandom(IV_SIZE)
+        ciphertext, auth_tag = AES.new(self.key, AES.MODE_GCM, nonce=iv).encrypt_and_digest(_to_bytes(plaintext))
+        return iv, auth_tag, ciphertext
+
+    def decrypt_parts(self, iv: bytes, auth_tag: bytes, ciphertext: bytes) -> bytes:
+        return AES.new(self.key, AES.MODE_GCM, nonce=iv).decrypt_and_verify(ciphertext, auth_tag)
+
+    def _split(self, token: Token) -> tuple[bytes, bytes, bytes]:
+        if isinstance(token, str):
+            if token.startswith(COMPACT_PREFIX):
+                try:
+                    packed = base64.urlsafe_b64decode(token[len(COMPACT_PREFIX):] + "=" * (-len(token) % 4))
+                except binascii.Error as e:
+                    raise ValueError('Invalid compact encrypted format') from e
+                return self._split(packed)
+            parts = token.split(':')
+            if len(parts) != 3:
+                raise ValueError('Invalid encrypted format. Expected GCM format: iv:authTag:ciphertext')
+            return bytes.fromhex(parts[0]), bytes.fromhex(parts[1]), bytes.fromhex(parts[2])
+
+        # pycryptodome is measurably slower on memoryview arguments than on
+        # bytes, so take one copy of the record and slice that.
+        packed = token if isinstance(token, bytes) else bytes(token)
+        if len(packed) < IV_SIZE + TAG_SIZE:
+            raise ValueError('Packed ciphertext is too short')
+        return packed[:IV_SIZE], packed[IV_SIZE:IV_SIZE + TAG_SIZE], packed[IV_SIZE + TAG_SIZE:]
+
+    def encrypt(self, text: Plaintext, wire: Literal["hex", "compact"] = "hex") -> str:
+        iv, auth_tag, ciphertext = self.encrypt_parts(text)
+        if wire == "compact":
+            return COMPACT_PREFIX + base64.urlsafe_b64encode(iv + auth_tag + ciphertext).rstrip(b"=").decode('ascii')
+        return f"{iv.hex()}:{auth_tag.hex()}:{ciphertext.hex()}"
+
+    def encrypt_packed(self, plaintext: Plaintext) -> bytes:
+        iv, auth_tag, ciphertext = self.encrypt_parts(plaintext)
+        return iv + auth_tag + ciphertext
+
+    def decrypt_bytes(self, token: Token) -> bytes:
+        """Decrypt any of the three encodings and return the raw plaintext."""
+        return self.decrypt_parts(*self._split(token))
+
+    def decrypt(self, token: Token) -> str:
+        return self.decrypt_bytes(token).decode('utf-8')
+
+    def encrypt_many(self, items: Iterable[Plaintext],
+                     wire: Literal["hex", "compact", "packed"] = "hex") -> list[str] | list[bytes]:
+        if wire == "packed":
+            return [self.encrypt_packed(item) for item in items]
+        return [self.encrypt(item, wire) for item in items]
+
+    def decrypt_many(self, tokens: Iterable[Token], as_text: bool = True,
+                     errors: Literal["raise", "none"] = "raise") -> list[str | bytes | None]:
+        """Decrypt a batch. With ``errors="none"`` invalid tokens yield None instead of raising."""
+        new_cipher = AES.new
+        key = self.key
+        mode = AES.MODE_GCM
+        split = self._split
+        results: list[str | bytes | None] = []
+        append = results.append
+        for token in tokens:
+            try:
+                iv, auth_tag, ciphertext = split(token)
+                plaintext = new_cipher(key, mode, nonce=iv).decrypt_and_verify(ciphertext, auth_tag)
+                append(plaintext.decode('utf-8') if as_text else plaintext)
+            except (ValueError, KeyError):
+                if errors == "raise":
+                    raise
+                append(None)
+        return results
+
+
+@lru_cache(maxsize=1)
+def default_key() -> CipherKey:
+    """The process-wide key built from SECRET_KEY."""
+    return CipherKey(load_secret_key())
+
+
+def encrypt_many(items: Iterable[Plaintext],
+                 wire: Literal["hex", "compact", "packed"] = "hex") -> list[str] | list[bytes]:
+    return default_key().encrypt_many(items, wire)
+
+
+def decrypt_many(tokens: Iterable[Token], as_text: bool = True,
+                 errors: Literal["raise", "none"] = "raise") -> list[str | bytes | None]:
+    return default_key().decrypt_many(tokens, as_text, errors)
@@ -0,0 +1,477 @@
+"""Benchmark suite for the Python backend.
+
+    python benchmark.py              # run every benchmark
+    python benchmark.py startup      # run selected benchmarks by name
+    python benchmark.py --list
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+os.environ.setdefault('SECRET_KEY', '0123456789abcdef0123456789abcdef')
+os.environ.setdefault('FLASK_API_KEY', 'benchmark-api-key')
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[], dict[str, Any]]], Callable[[], dict[str, Any]]]:
+    def register(fn: Callable[[], dict[str, Any]]) -> Callable[[], dict[str, Any]]:
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def _timings_ms(fn: Callable[[], Any], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(samples: list[float], prefix: str = "") -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        f"{prefix}median_ms": statistics.median(ordered),
+        f"{prefix}p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    }
+
+
+def _run_python(code: str) -> float:
+    """Run ``code`` in a fresh interpreter and return its wall time in ms."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=_HERE, check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+@benchmark("startup")
+def bench_startup(repeat: int = 5) -> dict[str, Any]:
+    """Cold start of the Flask app, with and without the scraper warm-up."""
+    cold = [_run_python("import main") for _ in range(repeat)]
+    warm = [_run_python("import main, warmup; warmup.warm_worker()") for _ in range(repeat)]
+    result = _summary(cold, "import_main_")
+    result.update(_summary(warm, "import_main_warmed_"))
+    return result
+
+
+@benchmark("fixture_parse")
+def bench_fixture_parse(repeat: int = 50) -> dict[str, Any]:
+    """Parse the bundled wishlist/product fixtures."""
+    from warmup import parse_fixtures
+
+    first = _timings_ms(parse_fixtures, 1)
+    result = {"first_parse_ms": first[0]}
+    result.update(_summary(_timings_ms(parse_fixtures, repeat)))
+    return result
+
+
+@benchmark("crypto")
+def bench_crypto(count: int = 5000) -> dict[str, Any]:
+    """Decrypt/encrypt throughput: per-call decrypt_string vs batch_crypto."""
+    from batch_crypto import decrypt_many, encrypt_many
+    from decrypt_string import decrypt_string
+
+    plaintexts = [f"user{i:06d}@example.com" for i in range(count)]
+    hex_tokens = encrypt_many(plaintexts)
+    compact_tokens = encrypt_many(plaintexts, wire="compact")
+    packed_blob = b"".join(encrypt_many(plaintexts, wire="packed"))
+    record_size = len(packed_blob) // count
+    packed_views = [memoryview(packed_blob)[i * record_size:(i + 1) * record_size] for i in range(count)]
+
+    def per_second(fn: Callable[[], Any]) -> float:
+        start = time.perf_counter()
+        fn()
+        return count / (time.perf_counter() - start)
+
+    return {
+        "decrypt_string_per_s": per_second(lambda: [decrypt_string(t) for t in hex_tokens]),
+        "decrypt_many_hex_per_s": per_second(lambda: decrypt_many(hex_tokens)),
+        "decrypt_many_compact_per_s": per_second(lambda: decrypt_many(compact_tokens)),
+        "decrypt_many_packed_per_s": per_second(lambda: decrypt_many(packed_views, as_text=False)),
+        "encrypt_many_hex_per_s": per_second(lambda: encrypt_many(plaintexts)),
+        "encrypt_many_packed_per_s": per_second(lambda: encrypt_many(plaintexts, wire="packed")),
+    }
+
+
+@benchmark("serialization")
+def bench_serialization(items: int = 500, repeat: int = 50) -> dict[str, Any]:
+    """Wishlist response encoding: legacy string result vs native JSON, compression and msgpack."""
+    import gzip
+
+    import response_encoding
+    from normalize import normalize_item
+
+    data = [normalize_item({
+        "name": f"Spider-Man Collection {i}: Der Tag danach (Variant-Cover)",
+        "link": f"https://www.panini.de/shp_deu_de/spider-man-collection-{i}-dmarv{i:03d}.html",
+        "image": f"https://www.panini.de/media/catalog/product/d/m/dmarv{i:03d}.jpg",
+        "price": f"{10 + i % 40},{i % 100:02d} €",
+    }) for i in range(items)]
+    result = {"message": "Wishlist", "data": data}
+
+    def legacy() -> bytes:
+        return json.dumps({"message": "ok", "result": json.dumps(result)}).encode()
+
+    def native() -> bytes:
+        return json.dumps({"message": "ok", "result": result}).encode()
+
+    body = native()
+    metrics: dict[str, Any] = {
+        "legacy_bytes": len(legacy()),
+        "native_bytes": len(body),
+        "legacy_encode_ms": statistics.median(_timings_ms(legacy, repeat)),
+        "native_encode_ms": statistics.median(_timings_ms(native, repeat)),
+        "gzip_bytes": len(gzip.compress(body, response_encoding.GZIP_LEVEL)),
+        "gzip_ms": statistics.median(_timings_ms(lambda: response_encoding.compress(body, "gzip"), repeat)),
+    }
+    if "br" in response_encoding.supported_encodings():
+        metrics["brotli_bytes"] = len(response_encoding.compress(body, "br"))
+        metrics["brotli_ms"] = statistics.median(_timings_ms(lambda: response_encoding.compress(body, "br"), repeat))
+    if response_encoding.msgpack_available():
+        packed = response_encoding.packb({"message": "ok", "result": result})
+        metrics["msgpack_bytes"] = len(packed)
+        metrics["msgpack_encode_ms"] = statistics.median(
+            _timings_ms(lambda: response_encoding.packb({"message": "ok", "result": result}), repeat)
+        )
+    return metrics
+
+
+class _CountingElement:
+    """WebElement stand-in; every method or property read counts as one WebDriver round-trip."""
+
+    def __init__(self, driver: "CountingDriver", text: str = "", html: str = "",
+                 children: dict[str, list["_CountingElement"]] | None = None) -> None:
+        self._driver = driver
+        self._text = text
+        self._html = html
+        self._children = children or {}
+
+    @property
+    def text(self) -> str:
+        self._driver.round_trip()
+        return self._text
+
+    def is_displayed(self) -> bool:
+        self._driver.round_trip()
+        return True
+
+    def get_attribute(self, name: str) -> str:
+        self._driver.round_trip()
+        return self._html if name == "outerHTML" else ""
+
+    def find_element(self, by: str, selector: str) -> "_CountingElement":
+        from selenium.common.exceptions import NoSuchElementException
+
+        self._driver.round_trip()
+        if not self._children.get(selector):
+            raise NoSuchElementException(selector)
+        return self._children[selector][0]
+
+    def find_elements(self, by: str, selector: str) -> list["_CountingElement"]:
+        self._driver.round_trip()
+        return self._children.get(selector, [])
+
+
+class CountingDriver:
+    """A fake Chrome driver serving one product page (or wishlist list) that counts round-trips.
+
+    ``latency`` is slept per call to stand in for the chromedriver HTTP hop.
+    """
+
+    def __init__(self, price: str, title: str, attributes: dict[str, str],
+                 list_html: str = "", latency: float = 0.0, page_html: str = "") -> None:
+        self.round_trips = 0
+        self.latency = latency
+        self.price, self.title, self.attributes, self.list_html = price, title, attributes, list_html
+        self.page_html = page_html or f"<html><body>{list_html}</body></html>"
+        rows = [_CountingElement(self, children={
+            ".//strong[@class='label']": [_CountingElement(self, f"{label}:")],
+            ".//span[@class='data']": [_CountingElement(self, value)],
+        }) for label, value in attributes.items()]
+        table_html = "".join(f"<li>{label}: {value}</li>" for label, value in attributes.items())
+        self._elements = {
+            "//span[@class='price']": _CountingElement(self, price, f"<span>{price}</span>"),
+            "//div[@class='additional-attributes-wrapper']": _CountingElement(
+                self, html=table_html, children={".//ul[@class='items']/li": rows}),
+            "//h1[@class='page-title']/span": _CountingElement(self, title),
+            "ol.product-items": _CountingElement(self, html=list_html),
+        }
+
+    def round_trip(self) -> None:
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def find_element(self, by: str, selector: str) -> _CountingElement:
+        from selenium.common.exceptions import NoSuchElementException
+
+        self.round_trip()
+        if selector not in self._elements:
+            raise NoSuchElementException(selector)
+        return self._elements[selector]
+
+    def execute_async_script(self, script: str, *args: Any) -> dict[str, Any]:
+        """Answers the dom_extract scripts as the page would."""
+        from bs4 import BeautifulSoup
+
+        import dom_extract
+        import structured_data
+
+        self.round_trip()
+        if script == dom_extract.WISHLIST_SCRIPT:
+            return {"listHtml": self.list_html, "messages": []}
+        price_index = [s[1] for s in args[0]].index("//span[@class='price']")
+        table_index = [s[1] for s in args[1]].index("//div[@class='additional-attributes-wrapper']")
+        title_index = [s[1] for s in args[2]].index("//h1[@class='page-title']/span")
+        structured = structured_data.blocks_from_soup(BeautifulSoup(self.page_html, "lxml"))
+        return {
+            "structured": structured, "structuredPrice": "price" in structured_data.extract(structured),
+            "priceIndex": price_index, "price": self.price, "priceHtml": f"<span>{self.price}</span>",
+            "tableIndex": table_index, "tableHtml": self._elements[args[1][table_index][1]]._html,
+            "titleIndex": title_index, "title": self.title,
+            "attributes": [[label, value] for label, value in self.attributes.items()],
+        }
+
+    @property
+    def page_source(self) -> str:
+        self.round_trip()
+        return self.page_html
+
+
+def fixture_driver(latency: float = 0.0) -> CountingDriver:
+    """A CountingDriver for the bundled product.html and wishlist.html fixtures."""
+    from get_comic_information import parse_product_html
+
+    with open(os.path.join(_HERE, "fixtures", "product.html"), encoding="utf-8") as f:
+        product_html = f.read()
+    product = parse_product_html(product_html, "")
+    with open(os.path.join(_HERE, "fixtures", "wishlist.html"), encoding="utf-8") as f:
+        wishlist_html = f.read()
+    start = wishlist_html.index("<ol")
+    list_html = wishlist_html[start:wishlist_html.index("</ol>", start) + len("</ol>")]
+    attributes = {k: v for k, v in product.items() if k not in ("price", "url", "title", "name")}
+    return CountingDriver(product["price"], product["title"], attributes, list_html, latency, product_html)
+
+
+@benchmark("dom_round_trips")
+def bench_dom_round_trips(latency_ms: float = 2.0) -> dict[str, Any]:
+    """WebDriver round-trips per product page and wishlist: per-element reads vs one in-page script."""
+    import contextlib
+    import io
+    from unittest import mock
+
+    import dom_extract
+    import fingerprint
+    from get_comic_information import read_product
+    from get_wishlist import _wait_for_product_list, _wishlist_snapshot
+
+    metrics: dict[str, Any] = {}
+    for mode in ("elements", "script"):
+        with mock.patch.object(dom_extract, "DOM_EXTRACTION", mode), mock.patch("price_history.observe"), \
+                contextlib.redirect_stdout(io.StringIO()):
+            fingerprint.reset()
+            driver = fixture_driver(latency_ms / 1000)
+            start = time.perf_counter()
+            read_product(driver, "https://www.panini.de/benchmark.html")
+            metrics[f"product_{mode}_ms"] = (time.perf_counter() - start) * 1000
+            metrics[f"product_{mode}_round_trips"] = driver.round_trips
+
+            driver = fixture_driver(latency_ms / 1000)
+            if _wishlist_snapshot(driver) is None:
+                _wait_for_product_list(driver)
+            metrics[f"wishlist_{mode}_round_trips"] = driver.round_trips
+    return metrics
+
+
+@benchmark("hedging")
+def bench_hedging(lookups: int = 300, stall_rate: float = 0.03, stall_ms: float = 300.0) -> dict[str, Any]:
+    """Comic lookup latency with a stalling tail, without and with hedging at p95."""
+    import contextlib
+    import io
+    import random
+    from unittest import mock
+
+    import cancellation
+    import hedging
+
+    rng = random.Random(7)
+
+    def lookup(url: str) -> dict[str, str]:
+        stalled = rng.random() < stall_rate
+        cancellation.sleep((stall_ms if stalled else rng.uniform(5, 15)) / 1000)
+        return {"url": url}
+
+    metrics: dict[str, Any] = {}
+    with mock.patch.object(cancellation, "CANCEL_POLL_SECONDS", 0.005), contextlib.redirect_stdout(io.StringIO()):
+        plain = _timings_ms(lambda: lookup("https://www.panini.de/benchmark.html"), lookups)
+        hedger = hedging.Hedger(lookup, percentile=95, min_delay=0.005, budget_percent=10)
+        hedged = _timings_ms(lambda: hedger.call("https://www.panini.de/benchmark.html"), lookups)
+    metrics.update(_summary(plain, "unhedged_"))
+    metrics.update(_summary(hedged, "hedged_"))
+    stats = hedger.get_stats()
+    metrics["hedged_share"] = stats["hedged"] / lookups
+    metrics["hedges_won"] = stats["hedge_won"]
+    return metrics
+
+
+@benchmark("pacing")
+def bench_pacing(pages: int = 480, threads: int = 8, capacity: int = 30, penalty_ms: float = 3000.0) -> dict[str, Any]:
+    """Throughput against a simulated site that queues everyone for a while above ``capacity`` requests/s."""
+    import contextlib
+    import io
+    import threading
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest import mock
+
+    import cancellation
+    import pacing
+
+    def run(paced: bool) -> dict[str, float]:
+        lock = threading.Lock()
+        recent: deque[float] = deque()
+        queued_until = 0.0
+        throttled = 0
+
+        def visit() -> float:
+            """Seconds until the waiting room lets this request through; 0 if it was served."""
+            nonlocal queued_until, throttled
+            now = time.monotonic()
+            with lock:
+                while recent and now - recent[0] > 1:
+                    recent.popleft()
+                if now >= queued_until and len(recent) >= capacity:
+                    queued_until = now + penalty_ms / 1000
+                if now < queued_until:
+                    throttled += 1
+                    return queued_until - now
+                recent.append(now)
+                return 0.0
+
+        def fetch(_: int) -> None:
+            while True:
+                with pacing.slot("https://www.panini.de/shp_deu_de/page.html") if paced else \
+                        contextlib.nullcontext(pacing.Slot()) as slot:
+                    wait = visit()
+                    time.sleep(wait or 0.02)
+                    if not wait:
+                        return
+                    slot.throttle(retry_after=wait)
+
+        pacing.reset()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(fetch, range(pages)))
+        return {"pages_per_second": pages / (time.perf_counter() - start), "throttled": throttled}
+
+    metrics: dict[str, Any] = {}
+    # Site and scheduler scaled down together: a 3s waiting room instead of minutes.
+    with mock.patch.object(cancellation, "CANCEL_POLL_SECONDS", 0.005), \
+            mock.patch.object(pacing, "PACING_RATE", 2.0 * capacity), \
+            mock.patch.object(pacing, "PACING_BURST", 5.0), \
+            mock.patch.object(pacing, "PACING_COOLDOWN", 0.2), \
+            mock.patch.object(pacing, "PACING_RECOVERY_SECONDS", 30.0), \
+            contextlib.redirect_stdout(io.StringIO()):
+        for mode, paced in (("unpaced", False), ("paced", True)):
+            for key, value in run(paced).items():
+                metrics[f"{mode}_{key}"] = value
+    pacing.reset()
+    return metrics
+
+
+@benchmark("asset_proxy")
+def bench_asset_proxy(sessions: int = 20, assets: int = 30, latency_ms: float = 20.0,
+                      asset_kb: int = 40) -> dict[str, Any]:
+    """Asset loading for fresh browser sessions against a slow origin, direct and through the caching proxy."""
+    import tempfile
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import urllib3
+
+    import asset_proxy
+
+    body = b"x" * asset_kb * 1024
+
+    class Origin(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/javascript")
+            self.send_header("Cache-Control", "public, max-age=3600")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    origin = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{origin.server_address[1]}/static/bundle{i}.js" for i in range(assets)]
+
+    def page_load(http: urllib3.PoolManager) -> None:
+        # A fresh profile has nothing cached; Chrome loads about six assets at a time per host.
+        with ThreadPoolExecutor(6) as pool:
+            list(pool.map(lambda url: http.request("GET", url).data, urls))
+
+    metrics: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        proxy = asset_proxy.AssetProxy(directory, ca_cert="", ca_key="")
+        try:
+            direct = _timings_ms(lambda: page_load(urllib3.PoolManager(maxsize=6)), sessions)
+            proxied = _timings_ms(lambda: page_load(urllib3.ProxyManager(f"http://{proxy.address}", maxsize=6)),
+                                  sessions)
+            stats = proxy.get_stats()
+        finally:
+            proxy.close()
+            origin.shutdown()
+            origin.server_close()
+    metrics.update(_summary(direct, "direct_"))
+    metrics.update(_summary(proxied, "proxied_"))
+    metrics["hit_rate"] = stats["hit_rate"]
+    metrics["origin_mb_saved"] = stats["bytes_saved"] / 1024 / 1024
+    return metrics
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="list available benchmarks")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, fn in BENCHMARKS.items():
+            print(f"{name:<20}{(fn.__doc__ or '').strip()}")
+        return 0
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {name: BENCHMARKS[name]() for name in args.names or BENCHMARKS}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for name, metrics in results.items():
+        print(name)
+        for key, value in metrics.items():
+            print(f"  {key:<36}{value:>12.2f}" if isinstance(value, float) else f"  {key:<36}{value:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
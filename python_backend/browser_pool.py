@@ -0,0 +1,194 @@
+"""Pre-spawned headless Chrome instances.
+
+Drivers handed out here have never navigated anywhere, so they carry no
+cookies or login state; every session still quits its driver when done.
+The pool only saves the Chrome/chromedriver start-up time by launching
+spare instances ahead of demand. Each driver runs on its own copy of the
+profile template (see profile_template), so it starts with the cookie
+consent given; the copy is deleted when the driver quits.
+
+Every ``driver.get`` waits for its host's pacing slot (see pacing) and
+reports queue-it redirects back to it.
+
+A driver handed out inside a cancellation scope is killed if the request is
+cancelled. A driver that is ready only after the request was cancelled has
+not navigated yet, so it goes back to the pool instead.
+"""
+import atexit
+import contextlib
+import os
+import threading
+import time
+from typing import Any
+
+from selenium import webdriver
+
+import browser_watchdog
+import cancellation
+import pacing
+import profile_template
+from chrome_options import get_chrome_options
+from queue_it import is_queue_it_url
+
+WARM_BROWSER_MAX_IDLE = int(os.environ.get("WARM_BROWSER_MAX_IDLE", "600"))
+BROWSER_PAGE_LOAD_TIMEOUT = int(os.environ.get("BROWSER_PAGE_LOAD_TIMEOUT", "30"))
+
+_pool_lock = threading.Lock()
+_idle: list[tuple[float, webdriver.Chrome]] = []
+_target = 0
+_refilling = False
+
+
+def _launch() -> webdriver.Chrome:
+    profile = profile_template.clone()
+    try:
+        driver = webdriver.Chrome(options=get_chrome_options(user_data_dir=profile))
+    except Exception:
+        profile_template.remove_clone(profile)
+        raise
+    session = browser_watchdog.track_driver(driver)
+    if session is not None or profile is not None:
+        quit_driver = driver.quit
+
+        def quit() -> None:
+            try:
+                quit_driver()
+            finally:
+                if session is not None:
+                    browser_watchdog.finish(session)
+                profile_template.remove_clone(profile)
+
+        driver.quit = quit
+    if profile is not None:
+        profile_template.started(driver)
+
+    navigate = driver.get
+
+    def get(url: str) -> None:
+        with pacing.slot(url, navigation=True) as slot:
+            navigate(url)
+            if is_queue_it_url(driver.current_url):
+                slot.throttle()
+
+    driver.get = get
+    return driver
+
+
+def _is_alive(driver: webdriver.Chrome) -> bool:
+    try:
+        _ = driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _refill() -> None:
+    """Launch browsers until the pool is at its target; only one refill runs at a time."""
+    global _refilling
+    with _pool_lock:
+        if _refilling:
+            return
+        _refilling = True
+    while True:
+        with _pool_lock:
+            if len(_idle) >= _target:
+                _refilling = False
+                return
+        try:
+            driver = _launch()
+        except Exception:
+            with _pool_lock:
+                _refilling = False
+            raise
+        with _pool_lock:
+            _idle.append((time.monotonic(), driver))
+
+
+def prespawn(count: int) -> int:
+    """Keep ``count`` idle browsers ready and launch them now. Returns the pool size."""
+    global _target
+    with _pool_lock:
+        _target = max(count, 0)
+    _refill()
+    with _pool_lock:
+        return len(_idle)
+
+
+def _give_back(driver: webdriver.Chrome) -> None:
+    with _pool_lock:
+        if len(_idle) < max(_target, 1):
+            _idle.append((time.monotonic(), driver))
+            return
+    with contextlib.suppress(Exception):
+        driver.quit()
+
+
+def _kill_on_cancel(driver: webdriver.Chrome) -> None:
+    def kill() -> None:
+        if not browser_watchdog.kill(driver, "cancelled"):
+            with contextlib.suppress(Exception):
+                driver.quit()
+    cancellation.on_cancel(driver, kill)
+
+
+def new_driver() -> webdriver.Chrome:
+    """Return a fresh driver, taking a pre-spawned one when available.
+
+    Raises Cancelled (after returning the unused driver to the pool) if the
+    current request was cancelled while it started.
+    """
+    driver = None
+    while driver is None:
+        with _pool_lock:
+            if not _idle:
+                break
+            spawned_at, candidate = _idle.pop()
+        # The liveness check is a WebDriver round trip; other requests must not wait on it.
+        if time.monotonic() - spawned_at < WARM_BROWSER_MAX_IDLE and _is_alive(candidate):
+            driver = candidate
+        else:
+            with contextlib.suppress(Exception):
+                candidate.quit()
+    with _pool_lock:
+        refill = len(_idle) < _target and not _refilling
+
+    if refill:
+        threading.Thread(target=_refill, daemon=True).start()
+    if driver is None:
+        driver = _launch()
+    token = cancellation.current()
+    if token is not None and token.poll():
+        _give_back(driver)
+        token.check()
+    # Only some scrapers set their own timeout; a hung driver.get must not outlive the worker.
+    driver.set_page_load_timeout(BROWSER_PAGE_LOAD_TIMEOUT)
+    browser_watchdog.start(driver)
+    _kill_on_cancel(driver)
+    return driver
+
+
+def keep_after_request(driver: webdriver.Chrome) -> None:
+    """Let ``driver`` outlive the current request without being killed by its cancellation."""
+    cancellation.discard(driver)
+
+
+def adopt(driver: webdriver.Chrome) -> None:
+    """Make ``driver``, kept from an earlier request, subject to the current request's cancellation."""
+    _kill_on_cancel(driver)
+
+
+def get_stats() -> dict[str, Any]:
+    with _pool_lock:
+        return {"idle": len(_idle), "target": _target}
+
+
+@atexit.register
+def shutdown() -> None:
+    global _target
+    with _pool_lock:
+        _target = 0
+        drivers = [driver for _, driver in _idle]
+        _idle.clear()
+    for driver in drivers:
+        with contextlib.suppress(Exception):
+            driver.quit()
@@ -0,0 +1,303 @@
+"""Resource limits for the headless Chrome process trees.
+
+Every driver handed out by browser_pool is tracked from its chromedriver PID
+down through every Chrome process below it, using /proc directly. A
+background thread samples the trees and kills one (SIGKILL, deepest first)
+when its total RSS exceeds BROWSER_MAX_RSS_MB or the session has been in use
+longer than BROWSER_MAX_SESSION_SECONDS. The scraper then fails on its next
+WebDriver call and goes down its normal error path.
+
+When a session ends, any process left over from its tree is killed. Headless
+Chrome and chromedriver processes orphaned by a worker that was itself
+killed (re-parented to PID 1 or the gunicorn master) are swept up too. Zombie
+children of this process are reaped. Peak RSS per session is kept for
+``/browser_stats``.
+
+Without /proc (not Linux) the watchdog does nothing.
+"""
+import contextlib
+import itertools
+import os
+import signal
+import threading
+import time
+from collections import deque
+from typing import Any
+
+BROWSER_MAX_RSS_MB = int(os.environ.get("BROWSER_MAX_RSS_MB", "1536"))
+BROWSER_MAX_SESSION_SECONDS = int(os.environ.get("BROWSER_MAX_SESSION_SECONDS", "180"))
+BROWSER_WATCHDOG_INTERVAL = float(os.environ.get("BROWSER_WATCHDOG_INTERVAL", "2"))
+BROWSER_KILL_ORPHANS = os.environ.get("BROWSER_KILL_ORPHANS", "1").lower() in ("1", "true", "yes")
+ORPHAN_GRACE_SECONDS = 30
+
+_PROC = "/proc"
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_BROWSER_NAMES = ("chromedriver", "chrome", "chromium", "headless_shell")
+
+
+def available() -> bool:
+    return os.path.isdir(os.path.join(_PROC, "self"))
+
+
+def _read_stat(pid: int) -> tuple[str, str, int, int] | None:
+    """(comm, state, ppid, start ticks) from /proc/<pid>/stat."""
+    try:
+        with open(os.path.join(_PROC, str(pid), "stat"), encoding="utf-8", errors="replace") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces and parentheses; it ends at the last ')'.
+    comm = data[data.index("(") + 1:data.rindex(")")]
+    fields = data[data.rindex(")") + 2:].split()
+    return comm, fields[0], int(fields[1]), int(fields[19])
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(os.path.join(_PROC, str(pid), "statm"), encoding="utf-8") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(os.path.join(_PROC, str(pid), "cmdline"), "rb") as f:
+            return f.read().replace(b"\0", b" ").decode("utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def _process_table() -> dict[int, tuple[str, str, int, int]]:
+    table = {}
+    for entry in os.listdir(_PROC):
+        if entry.isdigit():
+            stat = _read_stat(int(entry))
+            if stat is not None:
+                table[int(entry)] = stat
+    return table
+
+
+def _descendants(root: int, table: dict[int, tuple[str, str, int, int]]) -> list[int]:
+    """``root`` and everything below it, parents before children."""
+    children: dict[int, list[int]] = {}
+    for pid, (_, _, ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    tree, queue = [], deque([root])
+    while queue:
+        pid = queue.popleft()
+        if pid in table:
+            tree.append(pid)
+            queue.extend(children.get(pid, ()))
+    return tree
+
+
+def _kill(pids: list[int]) -> None:
+    for pid in reversed(pids):  # children first so nothing re-parents mid-kill
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.kill(pid, signal.SIGKILL)
+
+
+def _reap(pids: list[int]) -> None:
+    for pid in pids:
+        with contextlib.suppress(ChildProcessError, OSError):
+            os.waitpid(pid, os.WNOHANG)
+
+
+class Session:
+    def __init__(self, session_id: int, root_pid: int, label: str) -> None:
+        self.id = session_id
+        self.root_pid = root_pid
+        self.label = label
+        self.created = time.monotonic()
+        self.started: float | None = None  # set when the driver is handed to a scraper
+        # every pid seen in the tree -> its start time, so a recycled pid is never killed
+        self.pids: dict[int, int] = {}
+        self.processes = 0
+        self.rss = 0
+        self.peak_rss = 0
+        self.killed: str | None = None
+
+    def summary(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "id": self.id,
+            "label": self.label,
+            "processes": self.processes,
+            "rss_mb": round(self.rss / 2**20, 1),
+            "peak_rss_mb": round(self.peak_rss / 2**20, 1),
+            "in_use_seconds": round(now - self.started, 1) if self.started else 0.0,
+            "killed": self.killed,
+        }
+
+
+_lock = threading.Lock()
+_sessions: dict[int, Session] = {}
+_finished: deque[dict[str, Any]] = deque(maxlen=50)
+_counts = {"sessions": 0, "killed_rss": 0, "killed_wall_time": 0, "killed_cancelled": 0,
+           "leftovers_killed": 0, "orphans_killed": 0}
+_ids = itertools.count(1)
+_thread: threading.Thread | None = None
+
+
+def track(root_pid: int, label: str = "chrome") -> Session:
+    """Start watching the process tree under ``root_pid``."""
+    session = Session(next(_ids), root_pid, label)
+    stat = _read_stat(root_pid) if available() else None
+    if stat is not None:
+        session.pids[root_pid] = stat[3]
+    with _lock:
+        _sessions[session.id] = session
+        _counts["sessions"] += 1
+    _ensure_thread()
+    return session
+
+
+def track_driver(driver: Any) -> Session | None:
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return None
+    return track(pid)
+
+
+def start(driver: Any) -> None:
+    """Start the wall-time clock: the driver's session is now serving a scraper."""
+    pid = getattr(getattr(getattr(driver, "service", None), "process", None), "pid", None)
+    with _lock:
+        for session in _sessions.values():
+            if session.root_pid == pid:
+                session.started = time.monotonic()
+
+
+def kill(driver: Any, reason: str) -> bool:
+    """Kill the process tree behind ``driver`` now; its scraper fails on the next WebDriver call.
+
+    Returns False when the driver is not tracked (or there is no /proc); the
+    caller has to stop it some other way.
+    """
+    pid = getattr(getattr(getattr(driver, "service", None), "process", None), "pid", None)
+    with _lock:
+        session = next((s for s in _sessions.values() if s.root_pid == pid), None)
+    if session is None or not available():
+        return False
+    tree = _tree(session, _process_table())
+    session.killed = reason
+    print(f"Killing browser session {session.id} ({reason}, {len(tree)} processes)")
+    _kill(tree)
+    with _lock:
+        _counts[f"killed_{reason}"] = _counts.get(f"killed_{reason}", 0) + 1
+    return True
+
+
+def _tree(session: Session, table: dict[int, tuple[str, str, int, int]]) -> list[int]:
+    root = session.root_pid
+    if root not in table or table[root][3] != session.pids.get(root, table[root][3]):
+        return []  # the root exited and its pid was recycled
+    return _descendants(root, table)
+
+
+def finish(session: Session) -> None:
+    """Stop tracking and kill anything the session left behind."""
+    with _lock:
+        if _sessions.pop(session.id, None) is None:
+            return
+        _finished.append({**session.summary(), "ended_at": time.time()})
+    if not available():
+        return
+    table = _process_table()
+    leftovers = _tree(session, table)
+    leftovers += [pid for pid, start_ticks in session.pids.items()
+                  if pid in table and table[pid][3] == start_ticks and pid not in leftovers]
+    leftovers = [pid for pid in leftovers if table[pid][1] != "Z"]
+    if leftovers:
+        print(f"Browser session {session.id} left {len(leftovers)} processes behind, killing them")
+        _kill(leftovers)
+        with _lock:
+            _counts["leftovers_killed"] += len(leftovers)
+    _reap(list(session.pids))
+
+
+def check(now: float | None = None) -> None:
+    """One watchdog pass: sample trees, enforce ceilings, sweep orphans, reap zombies."""
+    if not available():
+        return
+    now = time.monotonic() if now is None else now
+    table = _process_table()
+    with _lock:
+        sessions = list(_sessions.values())
+
+    for session in sessions:
+        tree = _tree(session, table)
+        session.pids.update((pid, table[pid][3]) for pid in tree)
+        session.processes = len(tree)
+        session.rss = sum(_rss_bytes(pid) for pid in tree)
+        session.peak_rss = max(session.peak_rss, session.rss)
+        reason = None
+        if session.rss > BROWSER_MAX_RSS_MB * 2**20:
+            reason = "rss"
+        elif session.started and now - session.started > BROWSER_MAX_SESSION_SECONDS:
+            reason = "wall_time"
+        if reason and tree:
+            session.killed = reason
+            print(f"Browser session {session.id} exceeded its {reason} limit "
+                  f"({session.rss / 2**20:.0f} MB, {now - (session.started or now):.0f}s), killing {len(tree)} processes")
+            _kill(tree)
+            with _lock:
+                _counts[f"killed_{reason}"] += 1
+
+    tracked = {pid for session in sessions for pid in session.pids}
+    if BROWSER_KILL_ORPHANS:
+        _sweep_orphans(table, tracked)
+    my_pid = os.getpid()
+    _reap([pid for pid, (_, state, ppid, _) in table.items() if ppid == my_pid and state == "Z"])
+
+
+def _sweep_orphans(table: dict[int, tuple[str, str, int, int]], tracked: set[int]) -> None:
+    """Kill headless browser trees whose owner died and that were re-parented to init or our master."""
+    adopters = {1, os.getppid()}
+    uptime_ticks = time.clock_gettime(time.CLOCK_BOOTTIME) * os.sysconf("SC_CLK_TCK")
+    for pid, (comm, state, ppid, start_ticks) in table.items():
+        if ppid not in adopters or pid in tracked or state == "Z":
+            continue
+        if not comm.startswith(_BROWSER_NAMES):
+            continue
+        if comm != "chromedriver" and "--headless" not in _cmdline(pid):
+            continue
+        if (uptime_ticks - start_ticks) / os.sysconf("SC_CLK_TCK") < ORPHAN_GRACE_SECONDS:
+            continue
+        if os.stat(os.path.join(_PROC, str(pid))).st_uid != os.getuid():
+            continue
+        tree = _descendants(pid, table)
+        print(f"Killing orphaned browser process tree {pid} ({comm}, {len(tree)} processes)")
+        _kill(tree)
+        with _lock:
+            _counts["orphans_killed"] += len(tree)
+
+
+def _run() -> None:
+    while True:
+        time.sleep(BROWSER_WATCHDOG_INTERVAL)
+        try:
+            check()
+        except Exception as e:
+            print(f"Browser watchdog pass failed: {e}")
+
+
+def _ensure_thread() -> None:
+    global _thread
+    with _lock:
+        if _thread is not None or not available():
+            return
+        _thread = threading.Thread(target=_run, name="browser-watchdog", daemon=True)
+        _thread.start()
+
+
+def get_stats() -> dict[str, Any]:
+    with _lock:
+        return {
+            **_counts,
+            "limits": {"max_rss_mb": BROWSER_MAX_RSS_MB, "max_session_seconds": BROWSER_MAX_SESSION_SECONDS},
+            "active": [s.summary() for s in _sessions.values()],
+            "recent": list(_finished),
+        }
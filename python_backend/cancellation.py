@@ -0,0 +1,210 @@
+"""Cooperative cancellation of scrapes nobody is waiting for any more.
+
+Scraping routes run inside ``scope(token)``. The token is cancelled once the
+deadline from the ``X-Request-Deadline`` header (Unix time in milliseconds,
+e.g. ``Date.now() + 30000``) has passed, or once the client has closed its
+connection. A monitor thread polls every active token each
+CANCEL_POLL_SECONDS, so this also happens while the request thread is
+blocked inside a WebDriver wait.
+
+When a token fires, its callbacks run. browser_pool registers one per driver
+that kills the driver's process tree, so any wait in progress fails at once.
+The scrapers call ``checkpoint()`` between navigations and wherever they
+swallow a failed wait, so the request ends with Cancelled instead of
+carrying on. The seconds spent on scrapes that ended like this are counted
+in ``get_stats()``.
+"""
+import contextlib
+import contextvars
+import math
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+CANCEL_POLL_SECONDS = float(os.environ.get("CANCEL_POLL_SECONDS", "0.5"))
+# Deadline for requests that do not send X-Request-Deadline; 0 means none.
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "0"))
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint once the request's deadline passed or its client went away."""
+
+
+class CancelToken:
+    def __init__(self, deadline: float | None = None, disconnected: Callable[[], bool] | None = None) -> None:
+        self.deadline = deadline  # time.monotonic() value
+        self._disconnected = disconnected
+        self._lock = threading.Lock()
+        self._callbacks: dict[Any, Callable[[], None]] = {}
+        self.started = time.monotonic()
+        self.cancelled_at: float | None = None
+        self.reason: str | None = None
+
+    def cancel(self, reason: str) -> bool:
+        """Cancel and run the callbacks; False if already cancelled."""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancellation callback failed: {e}")
+        return True
+
+    def poll(self, now: float | None = None) -> bool:
+        """Cancel if the deadline passed or the client disconnected; True once cancelled."""
+        if self.reason is None:
+            now = time.monotonic() if now is None else now
+            if self.deadline is not None and now >= self.deadline:
+                self.cancel("deadline")
+            elif self._disconnected is not None and self._disconnected():
+                self.cancel("disconnected")
+        return self.reason is not None
+
+    def check(self) -> None:
+        if self.poll():
+            raise Cancelled(f"Request cancelled ({self.reason})")
+
+    def on_cancel(self, key: Any, callback: Callable[[], None]) -> None:
+        """Run ``callback`` when the token fires, unless ``discard(key)`` comes first."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks[key] = callback
+                return
+        callback()
+
+    def discard(self, key: Any) -> None:
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+
+def parse_deadline(header: str, now: float | None = None) -> float | None:
+    """An X-Request-Deadline value (epoch milliseconds) as a time.monotonic() deadline."""
+    now = time.monotonic() if now is None else now
+    try:
+        deadline_ms = float(header)
+    except ValueError:
+        deadline_ms = math.nan
+    if math.isfinite(deadline_ms):
+        return now + (deadline_ms / 1000 - time.time())
+    return now + REQUEST_DEADLINE_SECONDS if REQUEST_DEADLINE_SECONDS > 0 else None
+
+
+def peer_closed(sock: Any) -> Callable[[], bool]:
+    """A probe telling whether the client closed ``sock``, without consuming anything it sent."""
+    def probe() -> bool:
+        try:
+            return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+        except (BlockingIOError, InterruptedError):
+            return False
+        except ValueError:  # TLS sockets do not take flags
+            return False
+        except OSError:
+            return True
+    return probe
+
+
+_current: contextvars.ContextVar[CancelToken | None] = contextvars.ContextVar("cancel_token", default=None)
+
+_lock = threading.Lock()
+_active: set[CancelToken] = set()
+_monitor: threading.Thread | None = None
+_stats = {"cancelled_deadline": 0, "cancelled_disconnected": 0, "wasted_seconds": 0.0, "max_stop_seconds": 0.0}
+
+
+def current() -> CancelToken | None:
+    return _current.get()
+
+
+def checkpoint() -> None:
+    """Raise Cancelled if the current request has been cancelled; a no-op outside ``scope``."""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that gives up at the next poll once the current request is cancelled."""
+    token = _current.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    end = time.monotonic() + seconds
+    while (remaining := end - time.monotonic()) > 0:
+        token.check()
+        time.sleep(min(remaining, CANCEL_POLL_SECONDS))
+    token.check()
+
+
+def on_cancel(key: Any, callback: Callable[[], None]) -> None:
+    token = _current.get()
+    if token is not None:
+        token.on_cancel(key, callback)
+
+
+def discard(key: Any) -> None:
+    token = _current.get()
+    if token is not None:
+        token.discard(key)
+
+
+def _run_monitor() -> None:
+    global _monitor
+    while True:
+        time.sleep(CANCEL_POLL_SECONDS)
+        with _lock:
+            tokens = list(_active)
+            if not tokens:
+                _monitor = None
+                return
+        now = time.monotonic()
+        for token in tokens:
+            try:
+                token.poll(now)
+            except Exception as e:
+                print(f"Cancellation check failed: {e}")
+
+
+def _watch(token: CancelToken) -> None:
+    global _monitor
+    with _lock:
+        _active.add(token)
+        if _monitor is None:
+            _monitor = threading.Thread(target=_run_monitor, name="cancellation-monitor", daemon=True)
+            _monitor.start()
+
+
+def _finish(token: CancelToken) -> None:
+    now = time.monotonic()
+    with _lock:
+        _active.discard(token)
+        if token.reason is not None and token.cancelled_at is not None:
+            _stats[f"cancelled_{token.reason}"] = _stats.get(f"cancelled_{token.reason}", 0) + 1
+            _stats["wasted_seconds"] += now - token.started
+            _stats["max_stop_seconds"] = max(_stats["max_stop_seconds"], now - token.cancelled_at)
+
+
+@contextlib.contextmanager
+def scope(token: CancelToken) -> Iterator[CancelToken]:
+    """Make ``token`` the current request's token and watch it until the block ends."""
+    reset = _current.set(token)
+    _watch(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+        _finish(token)
+
+
+def get_stats() -> dict[str, Any]:
+    with _lock:
+        return {**_stats, "wasted_seconds": round(_stats["wasted_seconds"], 1),
+                "max_stop_seconds": round(_stats["max_stop_seconds"], 2), "active": len(_active)}
@@ -1,7 +1,10 @@
 from selenium.webdriver.chrome.options import Options
 
+import asset_proxy
+from http_client import USER_AGENT
 
-def get_chrome_options() -> Options:
+
+def get_chrome_options(user_data_dir: str | None = None) -> Options:
     options = Options()
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--no-sandbox")
@@ -13,8 +16,15 @@ def get_chrome_options() -> Options:
     options.add_argument("--disable-extensions")
     options.add_argument("--disable-infobars")
     options.add_argument("--disable-notifications")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36"
-    )
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-component-update")
+    options.add_argument("--disable-sync")
+    options.add_argument("--password-store=basic")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+    for argument in asset_proxy.chrome_arguments():
+        options.add_argument(argument)
     return options
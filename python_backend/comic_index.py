@@ -0,0 +1,178 @@
+"""In-process search index over cached comic records.
+
+Titles, series and people (author, artist) are folded to lowercase ASCII
+(``ä`` -> ``ae``, ``ß`` -> ``ss``, accents dropped) and split into tokens; ISBNs
+and article numbers are kept as exact keys. ``main._set_cached_comic`` adds
+every record it caches and the cache removes records it evicts, so the index
+never holds more than the comic cache does.
+
+A query matches a record when every query token is a prefix of one of the
+record's tokens. Exact token hits score higher than prefix hits, and title
+hits higher than author hits; an ISBN or article number hit wins outright.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any
+
+# Record key -> weight. Keys mirror the attribute labels on panini.de product
+# pages plus the English names used by the Next.js comic cache.
+FIELD_WEIGHTS = {
+    "title": 3.0, "name": 3.0,
+    "Serie": 2.0, "series": 2.0,
+    "Autor": 2.0, "author": 2.0, "Zeichner": 1.5, "drawer": 1.5,
+    "stories": 1.0,
+}
+EXACT_FIELDS = ("ISBN", "isbn", "Artikelnummer", "articleNumber")
+EXACT_SCORE = 100.0
+PREFIX_FACTOR = 0.5
+MIN_PREFIX_LENGTH = 2
+
+_FOLD_TABLE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase, spell out German umlauts and strip remaining accents."""
+    text = text.lower().translate(_FOLD_TABLE)
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def exact_key(value: str) -> str:
+    """ISBNs and article numbers compare without hyphens, spaces or case."""
+    return "".join(_TOKEN_RE.findall(fold(value)))
+
+
+class ComicIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # token -> url -> best field weight for that token
+        self._postings: dict[str, dict[str, float]] = {}
+        self._tokens: list[str] = []  # sorted, for prefix scans
+        self._exact: dict[str, set[str]] = {}
+        self._doc_tokens: dict[str, set[str]] = {}
+        self._doc_keys: dict[str, set[str]] = {}
+        self._titles: dict[str, str] = {}
+
+    def add(self, url: str, data: dict[str, Any]) -> None:
+        """Index ``data`` under ``url``, replacing any previous version."""
+        weights: dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = data.get(field)
+            if isinstance(value, list):
+                value = " ".join(str(v) for v in value)
+            if not isinstance(value, str):
+                continue
+            for token in tokenize(value):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        keys = {exact_key(data[field]) for field in EXACT_FIELDS if isinstance(data.get(field), str)}
+        keys.discard("")
+
+        with self._lock:
+            self._remove_locked(url)
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    insort(self._tokens, token)
+                postings[url] = weight
+            for key in keys:
+                self._exact.setdefault(key, set()).add(url)
+            self._doc_tokens[url] = set(weights)
+            self._doc_keys[url] = keys
+            self._titles[url] = fold(str(data.get("title") or data.get("name") or ""))
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self._remove_locked(url)
+
+    def _remove_locked(self, url: str) -> None:
+        for token in self._doc_tokens.pop(url, ()):
+            postings = self._postings[token]
+            postings.pop(url, None)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+        for key in self._doc_keys.pop(url, ()):
+            urls = self._exact[key]
+            urls.discard(url)
+            if not urls:
+                del self._exact[key]
+        self._titles.pop(url, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._tokens.clear()
+            self._exact.clear()
+            self._doc_tokens.clear()
+            self._doc_keys.clear()
+            self._titles.clear()
+
+    def _match_token(self, token: str) -> dict[str, float]:
+        """Score per url for one query token: exact hits full weight, prefix hits less."""
+        scores = dict(self._postings.get(token, {}))
+        if len(token) < MIN_PREFIX_LENGTH:
+            return scores
+        start = bisect_left(self._tokens, token)
+        for candidate in self._tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            if candidate == token:
+                continue
+            for url, weight in self._postings[candidate].items():
+                scores[url] = max(scores.get(url, 0.0), weight * PREFIX_FACTOR)
+        return scores
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[str, float]]:
+        """Return ``(url, score)`` pairs, best first."""
+        tokens = tokenize(query)
+        key = exact_key(query)
+        with self._lock:
+            scores: dict[str, float] = {}
+            if tokens:
+                for i, token in enumerate(tokens):
+                    matched = self._match_token(token)
+                    if i == 0:
+                        scores = matched
+                    else:
+                        scores = {url: score + matched[url] for url, score in scores.items() if url in matched}
+                    if not scores:
+                        break
+            for url in self._exact.get(key, ()):
+                scores[url] = scores.get(url, 0.0) + EXACT_SCORE
+            titles = self._titles
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], titles.get(item[0], ""), item[0]))
+        return ranked[:limit]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"documents": len(self._doc_tokens), "tokens": len(self._postings), "exact_keys": len(self._exact)}
+
+
+_index = ComicIndex()
+
+
+def add(url: str, data: dict[str, Any]) -> None:
+    _index.add(url, data)
+
+
+def remove(url: str) -> None:
+    _index.remove(url)
+
+
+def search(query: str, limit: int = 20) -> list[tuple[str, float]]:
+    return _index.search(query, limit)
+
+
+def clear() -> None:
+    _index.clear()
+
+
+def stats() -> dict[str, int]:
+    return _index.stats()
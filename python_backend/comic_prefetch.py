@@ -0,0 +1,77 @@
+"""Background comic-information fetches for enriched wishlist responses.
+
+As a wishlist is parsed, every item link is handed to a Prefetcher: links
+already in the comic cache cost nothing, the others are fetched on a small
+thread pool (ENRICH_MAX_WORKERS) so the per-item scrapes the frontend would
+start after the wishlist arrives are already running, or done, by then. At
+most ENRICH_MAX_QUEUED links wait or run at once; beyond that a link is
+skipped and fetched on demand later, as before.
+"""
+import os
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Any
+
+ENRICH_MAX_WORKERS = int(os.environ.get("ENRICH_MAX_WORKERS", "2"))
+ENRICH_MAX_QUEUED = int(os.environ.get("ENRICH_MAX_QUEUED", "100"))
+
+
+class Prefetcher:
+    def __init__(self, lookup: Callable[[str], Any], fetch: Callable[[str], Any],
+                 max_workers: int = ENRICH_MAX_WORKERS, max_queued: int = ENRICH_MAX_QUEUED) -> None:
+        self._lookup = lookup  # cached result or None
+        self._fetch = fetch  # fetches and caches; returns a dict with "error" on failure
+        self._max_workers = max_workers
+        self._max_queued = max_queued
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._in_flight: dict[str, Future[Any]] = {}
+        self._counts = {"submitted": 0, "cache_hits": 0, "fetched": 0, "failed": 0, "dropped": 0}
+
+    def submit(self, url: str) -> None:
+        """Start fetching ``url`` unless it is cached, already on its way, or the queue is full."""
+        if self._lookup(url) is not None:
+            with self._lock:
+                self._counts["cache_hits"] += 1
+            return
+        with self._lock:
+            if url in self._in_flight:
+                return
+            if len(self._in_flight) >= self._max_queued:
+                self._counts["dropped"] += 1
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="comic-prefetch")
+            # registered under the lock, so _run cannot finish and unregister first
+            self._in_flight[url] = self._executor.submit(self._run, url)
+            self._counts["submitted"] += 1
+
+    def _run(self, url: str) -> None:
+        try:
+            result = self._fetch(url)
+            failed = not isinstance(result, dict) or "error" in result
+        except Exception as e:
+            print(f"Prefetching comic information for {url} failed: {e}")
+            failed = True
+        with self._lock:
+            self._counts["failed" if failed else "fetched"] += 1
+            self._in_flight.pop(url, None)
+
+    def pending(self, url: str) -> bool:
+        with self._lock:
+            return url in self._in_flight
+
+    def wait(self, urls: Iterable[str], timeout: float) -> None:
+        """Block up to ``timeout`` seconds for the fetches of ``urls`` still in flight."""
+        if timeout <= 0:
+            return
+        with self._lock:
+            futures = [self._in_flight[url] for url in urls if url in self._in_flight]
+        if futures:
+            wait_futures(futures, timeout=timeout)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._in_flight), "max_workers": self._max_workers}
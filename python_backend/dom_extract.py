@@ -0,0 +1,183 @@
+"""In-page extraction scripts for the Selenium scrapers.
+
+Every ``find_element``, ``.text`` and ``get_attribute`` is a separate HTTP
+round-trip to chromedriver, so reading a product's attribute table element by
+element costs two calls per row plus the waits. The scripts here do the
+waiting and the reading inside the page and come back with one structured
+object from a single ``execute_async_script`` call.
+
+The selector strategies are passed in from the scrapers in the order
+selector_stats chose, with their timeouts: a later strategy is only accepted
+once the earlier ones have had their full wait, as with the sequential
+WebDriverWaits. The total wait per field stays under chromedriver's default
+30 second script timeout.
+
+DOM_EXTRACTION=elements switches back to per-element WebDriver calls; the
+scrapers also fall back to them when a script fails.
+"""
+import os
+from collections.abc import Sequence
+from typing import Any
+
+import selector_stats
+
+DOM_EXTRACTION = os.environ.get("DOM_EXTRACTION", "script").lower()
+
+_FIND_JS = r"""
+function find(by, selector, root) {
+    root = root || document;
+    if (by === 'xpath') {
+        return document.evaluate(selector, root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    return root.querySelector(selector);
+}
+function findAll(by, selector, root) {
+    if (by === 'xpath') {
+        const result = document.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+        return nodes;
+    }
+    return Array.from(root.querySelectorAll(selector));
+}
+function visible(el) {
+    return el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+}
+function text(el) {
+    return el ? el.innerText.trim() : '';
+}
+function hasText(el) {
+    return text(el) !== '';
+}
+// strategies: [[by, selector, timeout ms], ...]; a strategy may win once the earlier ones timed out.
+// A match only counts when hasData(el) holds: an empty element is no better than none.
+function firstMatch(strategies, elapsed, needVisible, hasData) {
+    let waited = 0;
+    for (let i = 0; i < strategies.length; i++) {
+        const [by, selector, timeout] = strategies[i];
+        if (elapsed < waited) break;
+        const el = find(by, selector);
+        if (el && (!needVisible || visible(el)) && hasData(el)) return [i, el];
+        waited += timeout;
+    }
+    return [-1, null];
+}
+function totalWait(strategies) {
+    return strategies.reduce((sum, s) => sum + s[2], 0);
+}
+"""
+
+PRODUCT_SCRIPT = _FIND_JS + r"""
+const [priceStrategies, tableStrategies, titleStrategies, done] = arguments;
+const ATTRIBUTE_ROWS = ".//ul[@class='items']/li";
+const hasRows = el => findAll('xpath', ATTRIBUTE_ROWS, el).length > 0;
+const started = Date.now();
+const deadline = Math.max(totalWait(priceStrategies), totalWait(tableStrategies));
+// JSON-LD and Magento price-box data for structured_data; see structured_data.blocks_from_soup.
+function structuredBlocks() {
+    const main = document.querySelector('.product-info-main') || document;
+    const priceBox = main.querySelector('[data-role="priceBox"][data-product-id]');
+    return {
+        jsonLd: Array.from(document.querySelectorAll('script[type="application/ld+json"]'), s => s.textContent),
+        mageInit: Array.from(document.querySelectorAll('script[type="text/x-magento-init"]'), s => s.textContent)
+            .filter(t => t.indexOf('priceConfig') >= 0)
+            .concat(Array.from(main.querySelectorAll('[data-mage-init*="priceConfig"]'),
+                               el => el.getAttribute('data-mage-init'))),
+        priceAmounts: Array.from(main.querySelectorAll('[data-price-amount]'),
+                                 el => [el.getAttribute('data-price-type') || '', el.getAttribute('data-price-amount')]),
+        productId: priceBox ? priceBox.getAttribute('data-product-id') : '',
+    };
+}
+const structured = structuredBlocks();
+// With a price in the embedded data there is no need to wait for the price to render.
+const structuredPrice = structured.priceAmounts.some(p => p[0] === 'finalPrice' && p[1])
+    || structured.jsonLd.some(t => /"(price|lowPrice)"\s*:/.test(t));
+(function poll() {
+    const elapsed = Date.now() - started;
+    const [priceIndex, price] = firstMatch(priceStrategies, elapsed, true, hasText);
+    const [tableIndex, table] = firstMatch(tableStrategies, elapsed, true, hasRows);
+    if ((!(price || structuredPrice) || !table) && elapsed < deadline) {
+        setTimeout(poll, 100);
+        return;
+    }
+    const [titleIndex, title] = firstMatch(titleStrategies, Infinity, false, hasText);
+    const attributes = [];
+    if (table) {
+        for (const item of findAll('xpath', ATTRIBUTE_ROWS, table)) {
+            const label = find('xpath', ".//strong[@class='label']", item);
+            const value = find('xpath', ".//span[@class='data']", item);
+            if (label && value) attributes.push([text(label).replace(/^:+|:+$/g, ''), text(value)]);
+        }
+    }
+    done({
+        priceIndex: priceIndex, price: text(price), priceHtml: price ? price.outerHTML : '',
+        tableIndex: tableIndex, tableHtml: table ? table.outerHTML : '',
+        titleIndex: titleIndex, title: title ? text(title) : null,
+        attributes: attributes, structured: structured, structuredPrice: structuredPrice,
+    });
+})();
+"""
+
+WISHLIST_SCRIPT = _FIND_JS + r"""
+const [listSelector, timeout, done] = arguments;
+const started = Date.now();
+(function poll() {
+    const list = document.querySelector(listSelector);
+    if (!list && Date.now() - started < timeout) {
+        setTimeout(poll, 100);
+        return;
+    }
+    done({
+        listHtml: list ? list.outerHTML : '',
+        messages: Array.from(document.querySelectorAll('.message'), text),
+    });
+})();
+"""
+
+
+def enabled() -> bool:
+    return DOM_EXTRACTION == "script"
+
+
+def _as_js(strategies: Sequence[tuple[Any, ...]], page_type: str, field: str) -> list[list[Any]]:
+    """[[by, selector, timeout ms], ...] with selector_stats' adaptive timeouts."""
+    js = []
+    for strategy in strategies:
+        by, selector = strategy[0], strategy[1]
+        timeout = strategy[2] if len(strategy) > 2 else 0
+        js.append([by, selector, int(selector_stats.timeout_for(page_type, field, selector, timeout) * 1000)])
+    return js
+
+
+def record_match(page_type: str, field: str, strategies: Sequence[tuple[Any, ...]], index: int,
+                 yielded: bool = True) -> None:
+    """Record the strategies the script tried: misses before ``index``, and a hit at it if it ``yielded`` data."""
+    tried = strategies if index < 0 else strategies[:index + 1]
+    for i, strategy in enumerate(tried):
+        selector_stats.record(page_type, field, strategy[1], yielded and i == index)
+
+
+def product_snapshot(driver: Any, price_strategies: Sequence[tuple[str, str, int]],
+                     table_strategies: Sequence[tuple[str, str, int]],
+                     title_strategies: Sequence[tuple[str, str]]) -> dict[str, Any]:
+    """Price, title, attribute rows and embedded product data of the loaded page in one round-trip.
+
+    The price is not waited for when the embedded data (see structured_data) carries one.
+    """
+    snapshot = driver.execute_async_script(
+        PRODUCT_SCRIPT,
+        _as_js(price_strategies, "product", "price"),
+        _as_js(table_strategies, "product", "attribute_table"),
+        _as_js(title_strategies, "product", "title"),
+    )
+    if snapshot["priceIndex"] >= 0 or not snapshot["structuredPrice"]:
+        # not waited for when the embedded data has the price, so a miss says nothing
+        record_match("product", "price", price_strategies, snapshot["priceIndex"], bool(snapshot["price"]))
+    record_match("product", "attribute_table", table_strategies, snapshot["tableIndex"], bool(snapshot["attributes"]))
+    record_match("product", "title", title_strategies, snapshot["titleIndex"], bool(snapshot["title"]))
+    return snapshot
+
+
+def wishlist_snapshot(driver: Any, list_selector: str, timeout: float) -> dict[str, Any]:
+    """Wait for the wishlist product list; its HTML and the page's status messages in one round-trip."""
+    return driver.execute_async_script(WISHLIST_SCRIPT, list_selector, int(timeout * 1000))
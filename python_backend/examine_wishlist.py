@@ -3,10 +3,15 @@ from time import sleep
 
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+
+from chrome_options import get_chrome_options
+from panini_session import (
+    LOGIN_URL,
+    SHARED_WISHLIST_URL,
+    WISHLIST_URL,
+    click_cookie_consent,
+    gigya_login,
+)
 
 
 def examine_wishlist_page():
@@ -15,40 +20,19 @@ def examine_wishlist_page():
     """
     print("Starting page examination...")
 
-    options = Options()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--start-maximized")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-infobars")
-    options.add_argument("--disable-notifications")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36")
-
     driver = None
 
     try:
         print("Starting Chrome WebDriver...")
-        driver = webdriver.Chrome(options=options)
+        driver = webdriver.Chrome(options=get_chrome_options())
         driver.set_page_load_timeout(60)
 
         # First, check direct access to the shared wishlist
         print("\n--- CHECKING SHARED WISHLIST PAGE ---")
-        driver.get("https://www.panini.de/shp_deu_de/wishlist/shared/")
+        driver.get(SHARED_WISHLIST_URL)
 
         # Handle cookies
-        try:
-            print("Looking for cookie consent button...")
-            WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Nur technische Cookies verwenden')]"))
-            ).click()
-            print("Clicked cookie consent button")
-        except Exception as e:
-            print(f"No cookie dialog found or couldn't click it: {e}")
-            pass
+        click_cookie_consent(driver, timeout=10)
 
         # Give the page some time to load
         print("Waiting for page to load...")
@@ -104,45 +88,20 @@ def examine_wishlist_page():
 
         # Now try with login flow
         print("\n--- CHECKING WITH LOGIN FLOW ---")
-        driver.get("https://www.panini.de/shp_deu_de/customer/account/login/")
+        driver.get(LOGIN_URL)
 
         print("Please enter your Panini email address:")
         email = input()
         print("Please enter your Panini password:")
         password = input()
 
-        # Fill login form
-        print("Filling login form...")
-        email_field = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//input[@placeholder='Email *']"))
-        )
-        password_field = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//input[@placeholder='Passwort *']"))
-        )
-
-        driver.execute_script("arguments[0].scrollIntoView(true);", email_field)
-        driver.execute_script("arguments[0].scrollIntoView(true);", password_field)
-
-        driver.execute_script("arguments[0].value = arguments[1];", email_field, email)
-        driver.execute_script("arguments[0].value = arguments[1];", password_field, password)
-
-        login_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//input[@value='Senden']"))
-        )
-        driver.execute_script("arguments[0].scrollIntoView(true);", login_button)
-        driver.execute_script("arguments[0].click();", login_button)
-
-        # Wait for login to complete
-        print("Waiting for login to complete...")
+        # Log in through the Gigya form
         try:
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, "//span[contains(text(),'Mein Konto')]"))
-            )
-            print("Login successful")
+            gigya_login(driver, email, password)
 
             # Navigate to the wishlist page
             print("Navigating to wishlist...")
-            driver.get("https://www.panini.de/shp_deu_de/wishlist/")
+            driver.get(WISHLIST_URL)
             sleep(5)
 
             # Save the logged-in wishlist page
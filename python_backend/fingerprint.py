@@ -0,0 +1,96 @@
+"""Content fingerprints for skipping re-parses of unchanged pages.
+
+The scrapers hash only the DOM region they read (the wishlist's product list,
+a product page's price and attribute block) and keep the last fingerprint
+together with the parsed result. When a later scrape sees the same
+fingerprint, the stored result is reused: no per-item parsing, no extra
+Selenium round trips, no price history or thumbnail updates.
+
+Magento renders per-session tokens (``form_key``, ``uenc`` redirect targets,
+``data-post`` payloads) into the markup, so those are stripped before hashing.
+"""
+import copy
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+FINGERPRINT_MAX_ENTRIES = int(os.environ.get("FINGERPRINT_MAX_ENTRIES", "2000"))
+
+_VOLATILE_RE = re.compile(
+    r"""\sdata-post=(?:"[^"]*"|'[^']*')"""
+    r"""|(?:form_key|uenc)(?:=|/)[^&"'/\s]*"""
+    r"""|name="form_key"[^>]*"""
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+_TAG_GAP_RE = re.compile(r">\s+<")
+
+_lock = threading.Lock()
+# (page type, key) -> (fingerprint, parsed result)
+_entries: OrderedDict[tuple[str, str], tuple[str, Any]] = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def compute(*regions: str) -> str:
+    """Fast hash of one or more HTML fragments, ignoring session tokens and whitespace."""
+    digest = hashlib.blake2b(digest_size=16)
+    for region in regions:
+        normalized = _VOLATILE_RE.sub("", region or "")
+        normalized = _WHITESPACE_RE.sub(" ", _TAG_GAP_RE.sub("><", normalized))
+        digest.update(normalized.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def lookup(page_type: str, key: str, fingerprint: str) -> Any | None:
+    """Return a copy of the stored result if ``fingerprint`` matches the last one seen."""
+    with _lock:
+        entry = _entries.get((page_type, key))
+        if entry is None or entry[0] != fingerprint:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end((page_type, key))
+        _stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+
+def last(page_type: str, key: str) -> Any | None:
+    """Return a copy of the stored result without comparing fingerprints, for a page the server said is unchanged."""
+    with _lock:
+        entry = _entries.get((page_type, key))
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end((page_type, key))
+        _stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+
+def remember(page_type: str, key: str, fingerprint: str, result: Any) -> None:
+    with _lock:
+        _entries[(page_type, key)] = (fingerprint, copy.deepcopy(result))
+        _entries.move_to_end((page_type, key))
+        while len(_entries) > FINGERPRINT_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def forget(page_type: str, key: str) -> None:
+    with _lock:
+        _entries.pop((page_type, key), None)
+
+
+def account_key(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def get_stats() -> dict[str, int]:
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
+
+
+def reset() -> None:
+    with _lock:
+        _entries.clear()
+        _stats.update(hits=0, misses=0)
@@ -1,113 +1,282 @@
 import contextlib
+import json
+from collections.abc import Callable
+from typing import Any
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from chrome_options import get_chrome_options
+import cancellation
+import dom_extract
+import fingerprint
+import price_history
+import selector_stats
+import structured_data
+from browser_pool import new_driver
+from cancellation import Cancelled
+from panini_session import click_cookie_consent
+from queue_it import (
+    QueueItActive,
+    check_queue_it,
+    release_admission,
+    wait_for_admission,
+)
 
+_PRICE_STRATEGIES = [
+    (By.XPATH, "//span[@class='price']", 20),
+    (By.XPATH, "//*[contains(@class, 'price')]", 5),
+]
+
+_TABLE_STRATEGIES = [
+    (By.XPATH, "//div[@class='additional-attributes-wrapper']", 20),
+    (By.XPATH, "//*[contains(@class, 'product-info-main')]", 5),
+]
+
+# Every list starts with the page's specific selector. It stays first (see
+# selector_stats.order): the broad fallbacks also match pages they cannot read.
+_TITLE_STRATEGIES = [
+    (By.XPATH, "//h1[@class='page-title']/span"),
+    (By.CSS_SELECTOR, "span.base[data-ui-id='page-title-wrapper']"),
+    (By.CSS_SELECTOR, "h1.product-name"),
+    (By.CSS_SELECTOR, ".product-name, .product-title, .item-title"),
+]
+
+
+def _price_text(element: Any) -> bool:
+    return bool(element.text.strip())
+
+
+def _attribute_rows(element: Any) -> bool:
+    return bool(element.find_elements(By.XPATH, _ATTRIBUTE_ROWS_XPATH))
+
+
+_ATTRIBUTE_ROWS_XPATH = ".//ul[@class='items']/li"
+_HAS_DATA: dict[str, Callable[[Any], bool]] = {"price": _price_text, "attribute_table": _attribute_rows}
+
+
+def _ordered(field: str, strategies: list[Any]) -> list[Any]:
+    return selector_stats.order("product", field, strategies, key=lambda s: s[1], pinned=1)
 
-def get_information(url: str) -> dict[str, str]:
-    driver = None
-    try:
-        print(f"Starting selenium for URL: {url}")
-        driver = webdriver.Chrome(options=get_chrome_options())
-        driver.get(url)
 
+def _wait_for_first(driver: Any, field: str, strategies: list[tuple[str, str, int]]) -> Any:
+    """Wait for the first visible match that has data, the specific selector first, then fallbacks by success rate."""
+    for by, selector, timeout in _ordered(field, strategies):
         try:
-            WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Nur technische Cookies verwenden')]"))
-            ).click()
-            print("Clicked on cookie consent button")
+            element = WebDriverWait(driver, selector_stats.timeout_for("product", field, selector, timeout)).until(
+                EC.visibility_of_element_located((by, selector))
+            )
+            found = _HAS_DATA[field](element)
         except Exception:
-            pass
+            cancellation.checkpoint()  # a killed browser is not a selector miss
+            found = False
+        selector_stats.record("product", field, selector, found)
+        if found:
+            return element
+    return None
+
+
+def parse_product_html(html: str, url: str) -> dict[str, str]:
+    """Parse a product page fetched without a browser into the get_information result."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    price = soup.select_one("div.product-info-main span.price") or soup.select_one("span.price")
+    title = soup.select_one("h1.page-title span") or soup.select_one("h1.product-name")
+    data = {
+        "price": price.get_text(strip=True) if price else "",
+        "url": url,
+        "title": title.get_text(strip=True) if title else "Unknown Title",
+        "name": title.get_text(strip=True) if title else "Unknown Comic",
+    }
+    for item in soup.select("div.additional-attributes-wrapper ul.items li"):
+        label = item.select_one("strong.label")
+        value = item.select_one("span.data")
+        if label and value:
+            data[label.get_text(strip=True).strip(":")] = value.get_text(strip=True)
+    data = structured_data.merge(structured_data.extract(structured_data.blocks_from_soup(soup)), data)
+    if data["price"] == "":
+        data["price"] = "Price unavailable"
+    return data
+
+
+def _outer_html(element: Any) -> str:
+    try:
+        return element.get_attribute("outerHTML") or ""
+    except Exception:
+        return ""
+
+
+def _structured_blocks(driver: Any) -> dict[str, Any]:
+    from bs4 import BeautifulSoup
+
+    try:
+        return structured_data.blocks_from_soup(BeautifulSoup(driver.page_source, "lxml"))
+    except Exception as e:
+        cancellation.checkpoint()
+        print(f"Could not read embedded product data: {e}")
+        return {}
+
+
+def _locate_elements(driver: Any, wait_for_price: bool = True) -> tuple[Any, Any]:
+    priceField = _wait_for_first(driver, "price", _PRICE_STRATEGIES) if wait_for_price else None
+    if priceField is None:
+        class DummyElement:
+            text = "Price unavailable"
+        priceField = DummyElement()
 
+    informationTable = _wait_for_first(driver, "attribute_table", _TABLE_STRATEGIES)
+    if informationTable is None:
+        class DummyElement:
+            def find_elements(self, *args: object, **kwargs: object) -> list[object]:
+                return []
+        informationTable = DummyElement()
+    return priceField, informationTable
+
+
+def _read_elements(driver: Any, url: str, priceField: Any, informationTable: Any) -> dict[str, str]:
+    data: dict[str, str] = {
+        "price": priceField.text.strip(),
+        "url": url
+    }
+
+    for by, selector in _ordered("title", _TITLE_STRATEGIES):
         try:
-            priceField = WebDriverWait(driver, 20).until(
-                EC.visibility_of_element_located((By.XPATH, "//span[@class='price']"))
-            )
+            title = driver.find_element(by, selector).text.strip()
         except Exception:
-            try:
-                priceField = WebDriverWait(driver, 5).until(
-                    EC.visibility_of_element_located((By.XPATH, "//*[contains(@class, 'price')]"))
-                )
-            except Exception:
-                class DummyElement:
-                    text = "Price unavailable"
-                priceField = DummyElement()
+            title = ""
+        selector_stats.record("product", "title", selector, bool(title))
+        if not title:
+            continue
+        data["title"] = title
+        data["name"] = title
+        print(f"Found title with {selector}: {data['title']}")
+        break
+    else:
+        data["title"] = "Unknown Title"
+        data["name"] = "Unknown Comic"
 
+    list_items = informationTable.find_elements(By.XPATH, _ATTRIBUTE_ROWS_XPATH)
+    print(f"Found {len(list_items)} information items")
+
+    for item in list_items:
         try:
-            informationTable = WebDriverWait(driver, 20).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@class='additional-attributes-wrapper']"))
-            )
+            label = item.find_element(By.XPATH, ".//strong[@class='label']").text.strip(':')
+            value = item.find_element(By.XPATH, ".//span[@class='data']").text.strip()
+            data[label] = value
         except Exception:
-            try:
-                informationTable = WebDriverWait(driver, 5).until(
-                    EC.visibility_of_element_located((By.XPATH, "//*[contains(@class, 'product-info-main')]"))
-                )
-            except Exception:
-                class DummyElement:
-                    def find_elements(self, *args: object, **kwargs: object) -> list[object]:
-                        return []
-                informationTable = DummyElement()
-
-        data: dict[str, str] = {
-            "price": priceField.text.strip(),
-            "url": url
-        }
+            pass
+    return data
+
+
+def _read_snapshot(url: str, snapshot: dict[str, Any]) -> dict[str, str]:
+    data: dict[str, str] = {
+        "price": snapshot["price"] if snapshot["priceIndex"] >= 0 else "Price unavailable",
+        "url": url,
+        "title": snapshot["title"] if snapshot["title"] is not None else "Unknown Title",
+        "name": snapshot["title"] if snapshot["title"] is not None else "Unknown Comic",
+    }
+    print(f"Found {len(snapshot['attributes'])} information items")
+    for label, value in snapshot["attributes"]:
+        data[label] = value
+    return data
+
+
+def _fill_structured(data: dict[str, str], structured: dict[str, str]) -> dict[str, str]:
+    if structured:
+        print(f"Embedded product data provided {', '.join(structured)}")
+    return structured_data.merge(structured, data)
+
+
+def _product_snapshot(driver: Any) -> dict[str, Any] | None:
+    if not dom_extract.enabled():
+        return None
+    try:
+        return dom_extract.product_snapshot(
+            driver,
+            _ordered("price", _PRICE_STRATEGIES),
+            _ordered("attribute_table", _TABLE_STRATEGIES),
+            _ordered("title", _TITLE_STRATEGIES),
+        )
+    except (QueueItActive, Cancelled):
+        raise
+    except Exception as e:
+        cancellation.checkpoint()
+        print(f"In-page extraction failed ({e}), reading elements one by one")
+        return None
+
+
+def read_product(driver: Any, url: str) -> dict[str, str]:
+    """Extract the product fields from the loaded page in ``driver``.
+
+    Fields in the embedded JSON-LD / Magento price-box data come from there,
+    the rest from the visible DOM. Returns the previous result when price,
+    attribute table and embedded data are unchanged.
+    """
+    snapshot = _product_snapshot(driver)
+    if snapshot is not None:
+        blocks = snapshot["structured"]
+        structured = structured_data.extract(blocks)
+        regions = (snapshot["priceHtml"], snapshot["tableHtml"])
+    else:
+        blocks = _structured_blocks(driver)
+        structured = structured_data.extract(blocks)
+        priceField, informationTable = _locate_elements(driver, wait_for_price="price" not in structured)
+        regions = (_outer_html(priceField), _outer_html(informationTable))
+    regions += (json.dumps(blocks, sort_keys=True),)
+
+    page_fingerprint = fingerprint.compute(*regions)
+    unchanged = fingerprint.lookup("product", url, page_fingerprint)
+    if unchanged is not None:
+        print(f"Price and attributes unchanged for {url}, reusing previous result")
+        return unchanged
+
+    if snapshot is not None:
+        data = _read_snapshot(url, snapshot)
+    else:
+        data = _read_elements(driver, url, priceField, informationTable)
+    data = _fill_structured(data, structured)
+
+    if data["price"] == "":
+        data["price"] = "Price unavailable"
+
+    if data["price"] != "Price unavailable":
+        price_history.observe(url, data["price"])
+        fingerprint.remember("product", url, page_fingerprint, data)
+    return data
+
+
+def get_information(url: str) -> dict[str, str]:
+    driver = None
+    try:
+        wait_for_admission()
+        print(f"Starting selenium for URL: {url}")
+        driver = new_driver()
+        driver.get(url)
+        cancellation.checkpoint()
+        check_queue_it(driver)
 
-        for selector in [
-            "//h1[@class='page-title']/span",
-        ]:
-            try:
-                titleElement = driver.find_element(By.XPATH, selector)
-                data["title"] = titleElement.text.strip()
-                data["name"] = titleElement.text.strip()
-                print(f"Found title/name: {data['title']}")
-                break
-            except Exception:
-                continue
-        else:
-            for css_selector in ["span.base[data-ui-id='page-title-wrapper']", "h1.product-name", ".product-name, .product-title, .item-title"]:
-                try:
-                    titleElement = driver.find_element(By.CSS_SELECTOR, css_selector)
-                    data["title"] = titleElement.text.strip()
-                    data["name"] = titleElement.text.strip()
-                    print(f"Found title with {css_selector}: {data['title']}")
-                    break
-                except Exception:
-                    continue
-            else:
-                data["title"] = "Unknown Title"
-                data["name"] = "Unknown Comic"
-
-        list_items = informationTable.find_elements(By.XPATH, ".//ul[@class='items']/li")
-        print(f"Found {len(list_items)} information items")
-
-        for item in list_items:
-            try:
-                label = item.find_element(By.XPATH, ".//strong[@class='label']").text.strip(':')
-                value = item.find_element(By.XPATH, ".//span[@class='data']").text.strip()
-                data[label] = value
-            except Exception:
-                pass
-
-        if data["price"] == "":
-            data["price"] = "Price unavailable"
+        click_cookie_consent(driver, timeout=10)
+        cancellation.checkpoint()
 
+        data = read_product(driver, url)
         print(f"Successfully extracted data for {url}")
         return data
 
+    except (QueueItActive, Cancelled):
+        raise
     except Exception as e:
+        cancellation.checkpoint()
         print(f"Error in get_information: {e}")
         return {
             "price": "Price unavailable",
             "url": url,
             "title": "Unknown Title",
-            "name": "Unknown Comic"
+            "name": "Unknown Comic",
+            "scrape_failed": True,  # a placeholder, unlike a real page without a price
         }
     finally:
         if driver:
             with contextlib.suppress(Exception):
                 driver.quit()
+        release_admission()
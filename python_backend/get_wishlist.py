@@ -1,175 +1,323 @@
 import contextlib
 import traceback
-from time import sleep
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from chrome_options import get_chrome_options
-
-
-def _click_cookie_consent(driver: webdriver.Chrome) -> None:
+import cancellation
+import dom_extract
+import fingerprint
+import login_sessions
+import price_history
+import selector_stats
+from browser_pool import adopt, new_driver
+from cancellation import Cancelled
+from normalize import normalize_item
+from panini_session import (
+    LOGIN_URL,
+    SHARED_WISHLIST_URL,
+    click_cookie_consent,
+    gigya_login,
+)
+from queue_it import (
+    QueueItActive,
+    check_queue_it,
+    release_admission,
+    wait_for_admission,
+)
+from thumbnails import canonical_image_url, thumbnail_path
+
+_ITEM_SELECTORS = ["li.product-item", ".product-item", ".product-items li"]
+_LINK_SELECTORS = ["a.product-item-link", "a.product-item-name", "a[href]"]
+_IMAGE_SELECTORS = ["img.product-image-photo", "img"]
+_PRODUCT_LIST_SELECTOR = "ol.product-items"
+_PRODUCT_LIST_TIMEOUT = 15
+_RELEASE_DATE_SELECTORS = [
+    "div.product-item-attribute-release-date small",
+    ".release-date",
+    "[data-role='release-date']",
+]
+
+
+def _has_text(element: Any) -> bool:
+    return bool(element.get_text(strip=True))
+
+
+def _has_link(element: Any) -> bool:
+    return bool(element.get_text(strip=True) and element.get("href"))
+
+
+def _has_src(element: Any) -> bool:
+    return bool(element.get("src"))
+
+
+def _select_first(item: Any, field: str, selectors: list[str], has_data: Callable[[Any], bool]) -> Any:
+    """select_one() for the first selector whose match has data.
+
+    The specific selector is always tried first, then the fallbacks in order of recent success.
+    """
+    for selector in selector_stats.order("wishlist", field, selectors, pinned=1):
+        element = item.select_one(selector)
+        found = element is not None and has_data(element)
+        selector_stats.record("wishlist", field, selector, found)
+        if found:
+            return element
+    return None
+
+
+def _select_product_items(soup: Any) -> list[Any]:
+    for selector in selector_stats.order("wishlist", "items", _ITEM_SELECTORS, pinned=1):
+        product_items = soup.select(selector)
+        selector_stats.record("wishlist", "items", selector, bool(product_items))
+        if product_items:
+            return product_items
+    return []
+
+
+def _parse_product_item(item: Any) -> dict[str, str]:
+    product_link_elem = _select_first(item, "link", _LINK_SELECTORS, _has_link)
+
+    name = product_link_elem.get_text(strip=True) if product_link_elem else "Unknown Product"
+    link = product_link_elem.get("href", "") if product_link_elem else ""
+
+    img_tag = _select_first(item, "image", _IMAGE_SELECTORS, _has_src)
+
+    img_url = canonical_image_url(img_tag.get("src", "")) if img_tag else ""
+
+    price_elem = item.select_one("span.price")
+    price = price_elem.get_text(strip=True) if price_elem else "Price not available"
+
+    release_date_elem = _select_first(item, "release_date", _RELEASE_DATE_SELECTORS, _has_text)
+
+    release_date = release_date_elem.get_text(strip=True) if release_date_elem else "Date not available"
+
+    return {
+        "name": name,
+        "link": link,
+        "image": img_url,
+        "price": price,
+        "release_date": release_date
+    }
+
+
+def _wishlist_snapshot(driver: Any) -> dict[str, Any] | None:
+    if not dom_extract.enabled():
+        return None
     try:
-        WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Nur technische Cookies verwenden')]"))
-        ).click()
-        print("Clicked cookie consent button")
-    except Exception:
-        pass
+        return dom_extract.wishlist_snapshot(driver, _PRODUCT_LIST_SELECTOR, _PRODUCT_LIST_TIMEOUT)
+    except (QueueItActive, Cancelled):
+        raise
+    except Exception as e:
+        cancellation.checkpoint()
+        print(f"In-page extraction failed ({e}), reading elements one by one")
+        return None
 
 
-def _gigya_login(driver: webdriver.Chrome, email: str, password: str) -> None:
-    """Login using Gigya SDK on Panini's site."""
-    # Check for queue-it redirect
-    if "queue-it.net" in driver.current_url:
-        print("Redirected to queue-it, waiting...")
-        WebDriverWait(driver, 120).until(
-            lambda d: "queue-it.net" not in d.current_url
+def _wait_for_product_list(driver: Any) -> tuple[str, list[str]]:
+    """(product list HTML, status message texts) using separate WebDriver calls."""
+    try:
+        WebDriverWait(driver, _PRODUCT_LIST_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, _PRODUCT_LIST_SELECTOR))
         )
-
-    _click_cookie_consent(driver)
-
-    print("Filling Gigya login form...")
-    username_fields = WebDriverWait(driver, 20).until(
-        lambda d: [el for el in d.find_elements(By.CSS_SELECTOR, "input.gigya-input-text[name='username']") if el.is_displayed()]
-    )
-    username_fields[0].send_keys(email)
-
-    password_fields = WebDriverWait(driver, 10).until(
-        lambda d: [el for el in d.find_elements(By.CSS_SELECTOR, "input.gigya-input-password[name='password']") if el.is_displayed()]
-    )
-    password_fields[0].send_keys(password)
-
-    submit_buttons = driver.find_elements(By.CSS_SELECTOR, "input.gigya-input-submit[type='submit']")
-    visible_buttons = [b for b in submit_buttons if b.is_displayed()]
-    if visible_buttons:
-        driver.execute_script("arguments[0].click();", visible_buttons[0])
-
-    print("Waiting for login to complete...")
-    WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.XPATH, "//*[contains(text(),'Mein Konto')]"))
-    )
-    print("Login successful")
-
-
-def get_wishlist(email: str, password: str | None = None) -> dict[str, str | list[dict[str, str]]]:
+        return driver.find_element(By.CSS_SELECTOR, _PRODUCT_LIST_SELECTOR).get_attribute("outerHTML") or "", []
+    except Exception:
+        cancellation.checkpoint()
+        messages = BeautifulSoup(driver.page_source, "lxml").select(".message")
+        return "", [msg.get_text(strip=True) for msg in messages]
+
+
+def iter_wishlist_page(email: str, load_html: Callable[[], str],
+                       product_list_html: str = "") -> Iterator[dict[str, Any]]:
+    """Yield the ``item`` events and the final ``done`` event for a loaded wishlist page.
+
+    ``product_list_html`` is the region that is fingerprinted; when it matches
+    the previous scrape of this account, the stored items are replayed and
+    ``load_html`` is never called.
+    """
+    account = fingerprint.account_key(email)
+    list_fingerprint = fingerprint.compute(product_list_html) if product_list_html else ""
+    unchanged = fingerprint.lookup("wishlist", account, list_fingerprint) if list_fingerprint else None
+    if unchanged is not None:
+        print(f"Wishlist unchanged since last scrape, reusing {len(unchanged)} parsed items")
+        for data in unchanged:
+            yield {"event": "item", "data": data}
+        yield {"event": "done", "message": f"Wishlist for {email}", "count": len(unchanged)}
+        return
+
+    print("Getting page content...")
+    soup = BeautifulSoup(load_html(), "lxml")
+
+    product_items = _select_product_items(soup)
+
+    if not product_items:
+        empty_wishlist = soup.select_one(".message.info.empty")
+        if empty_wishlist:
+            yield {"event": "done", "message": f"Wishlist for {email} is empty", "count": 0}
+            return
+        yield {"event": "done", "message": "No wishlist items found", "count": 0}
+        return
+
+    print(f"Found {len(product_items)} product items")
+    parsed_items = []
+    for item in product_items:
+        try:
+            data = normalize_item(_parse_product_item(item))
+        except Exception as e:
+            print(f"Error parsing product item: {e}")
+            traceback.print_exc()
+            continue
+        print(f"Found product: {data['name']}")
+        price_history.observe(data["link"], data["price"])
+        data["thumbnail"] = thumbnail_path(data["image"])
+        parsed_items.append(data)
+        yield {"event": "item", "data": data}
+
+    if list_fingerprint:
+        fingerprint.remember("wishlist", account, list_fingerprint, parsed_items)
+    print(f"Successfully processed wishlist with {len(parsed_items)} items")
+    yield {"event": "done", "message": f"Wishlist for {email}", "count": len(parsed_items)}
+
+
+def iter_wishlist(email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+    """Scrape a wishlist, yielding progress events and items as they are parsed.
+
+    Every event is a dict with an ``event`` key: ``queued``, ``browser_started``,
+    ``logged_in`` (only with a password), ``page_loaded``, one ``item`` per
+    product and a final ``done`` carrying the summary ``message``. A failed
+    login ends with ``done`` carrying ``login_failed``.
+
+    With a password, a session parked by a just-finished login check for the
+    same credentials (see login_sessions) is reused instead of logging in again.
+    """
     driver = None
     try:
-        print(f"Starting Chrome WebDriver for {email[:3]}...")
-        driver = webdriver.Chrome(options=get_chrome_options())
-        driver.set_page_load_timeout(30)
+        yield {"event": "queued"}
+        wait_for_admission()
+        driver = login_sessions.take(email, password) if password else None
+        reused = driver is not None
+        if reused:
+            adopt(driver)
+        else:
+            print(f"Starting Chrome WebDriver for {email[:3]}...")
+            driver = new_driver()
+            driver.set_page_load_timeout(30)
+        yield {"event": "browser_started", "reused": reused}
 
         if password:
-            print("Logging in to access user's wishlist...")
-            driver.get("https://www.panini.de/shp_deu_de/customer/account/login/")
-            _gigya_login(driver, email, password)
+            if reused:
+                print("Reusing the logged-in session from the login check")
+            else:
+                print("Logging in to access user's wishlist...")
+                driver.get(LOGIN_URL)
+                try:
+                    gigya_login(driver, email, password)
+                except (QueueItActive, Cancelled):
+                    raise
+                except Exception as e:
+                    cancellation.checkpoint()
+                    print(f"Login failed: {e}")
+                    yield {"event": "done", "message": "Login failed", "error": True, "login_failed": True}
+                    return
+            yield {"event": "logged_in"}
 
             print("Navigating to wishlist page...")
-            driver.get("https://www.panini.de/shp_deu_de/wishlist/shared/")
-            sleep(3)
+            driver.get(SHARED_WISHLIST_URL)
+            cancellation.checkpoint()
+            check_queue_it(driver)
+            cancellation.sleep(3)
         else:
             print("No password provided, accessing shared wishlist page...")
-            driver.get("https://www.panini.de/shp_deu_de/wishlist/shared/")
-            _click_cookie_consent(driver)
-            sleep(3)
+            driver.get(SHARED_WISHLIST_URL)
+            cancellation.checkpoint()
+            check_queue_it(driver)
+            click_cookie_consent(driver)
+            cancellation.sleep(3)
 
         print("Waiting for product items to load...")
-        try:
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "ol.product-items"))
-            )
-            print("Product items loaded successfully")
-        except Exception:
+        snapshot = _wishlist_snapshot(driver)
+        if snapshot is not None:
+            product_list_html = snapshot["listHtml"]
+            messages = snapshot["messages"]
+        else:
+            product_list_html, messages = _wait_for_product_list(driver)
+
+        if not product_list_html:
             print("Error waiting for product items")
 
             if password:
-                message_elements = BeautifulSoup(driver.page_source, "lxml").select(".message")
-                for msg in message_elements:
-                    text = msg.get_text(strip=True)
+                for text in messages:
                     if "leer" in text.lower() or "empty" in text.lower():
                         print("Empty wishlist detected")
-                        return {"message": f"Wishlist for {email} is empty", "data": []}
-
-            return {"message": f"No wishlist items found for {email}", "data": []}
-
-        print("Getting page content...")
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, "lxml")
-
-        product_items = soup.select("li.product-item")
-
-        if not product_items:
-            product_items = soup.select(".product-item")
-
-        if not product_items:
-            product_items = soup.select(".product-items li")
-
-        if not product_items:
-            empty_wishlist = soup.select_one(".message.info.empty")
-            if empty_wishlist:
-                return {"message": f"Wishlist for {email} is empty", "data": []}
-            return {"message": "No wishlist items found", "data": []}
-
-        print(f"Found {len(product_items)} product items")
-        datas: list[dict[str, str]] = []
-        for _idx, item in enumerate(product_items):
-            try:
-                product_link_elem = item.select_one("a.product-item-link")
-                if not product_link_elem:
-                    product_link_elem = item.select_one("a.product-item-name")
-                if not product_link_elem:
-                    product_link_elem = item.select_one("a[href]")
-
-                name = product_link_elem.get_text(strip=True) if product_link_elem else "Unknown Product"
-                link = product_link_elem.get("href", "") if product_link_elem else ""
-
-                img_tag = item.select_one("img.product-image-photo")
-                if not img_tag:
-                    img_tag = item.select_one("img")
-
-                img_url = img_tag.get("src", "") if img_tag else ""
-
-                if "/cache/" in img_url:
-                    new_url = img_url.split("/cache/")[1]
-                    img_url = img_url.split("/cache/")[0] + "/" + "/".join(new_url.split("/")[1:])
-
-                price_elem = item.select_one("span.price")
-                price = price_elem.get_text(strip=True) if price_elem else "Price not available"
-
-                release_date_elem = item.select_one("div.product-item-attribute-release-date small")
-                if not release_date_elem:
-                    release_date_elem = item.select_one(".release-date")
-                if not release_date_elem:
-                    release_date_elem = item.select_one("[data-role='release-date']")
-
-                release_date = release_date_elem.get_text(strip=True) if release_date_elem else "Date not available"
-
-                print(f"Found product: {name}")
-                datas.append({
-                    "name": name,
-                    "link": link,
-                    "image": img_url,
-                    "price": price,
-                    "release_date": release_date
-                })
-            except Exception as e:
-                print(f"Error parsing product item: {e}")
-                traceback.print_exc()
-                continue
-
-        message = f"Wishlist for {email}"
-        print(f"Successfully processed wishlist with {len(datas)} items")
-        return {"message": message, "data": datas}
+                        yield {"event": "done", "message": f"Wishlist for {email} is empty", "count": 0}
+                        return
+
+            yield {"event": "done", "message": f"No wishlist items found for {email}", "count": 0}
+            return
+
+        print("Product items loaded successfully")
+        yield {"event": "page_loaded"}
+        # The items all live in the product list, so the list HTML is all the parser needs.
+        yield from iter_wishlist_page(email, lambda: product_list_html, product_list_html)
 
+    except (QueueItActive, Cancelled):
+        raise
     except Exception as e:
+        cancellation.checkpoint()
         print(f"Error getting wishlist: {e}")
         traceback.print_exc()
-        return {"message": "Failed to get wishlist. Please try again later.", "data": []}
+        yield {"event": "done", "message": "Failed to get wishlist. Please try again later.", "error": True}
 
     finally:
         if driver:
             print("Closing WebDriver...")
-            driver.quit()
\ No newline at end of file
+            with contextlib.suppress(Exception):
+                driver.quit()
+        release_admission()
+
+
+def login_and_get_wishlist(email: str, password: str) -> dict[str, Any]:
+    """Log in once and scrape the wishlist in the same browser session.
+
+    Returns the get_wishlist result plus ``login``: ``"Login successful"`` or
+    ``"Login failed"``, as handle_login reports it.
+    """
+    return collect_login_and_wishlist(iter_wishlist(email, password))
+
+
+def collect_login_and_wishlist(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    logged_in = False
+
+    def watch() -> Iterator[dict[str, Any]]:
+        nonlocal logged_in
+        for event in events:
+            logged_in = logged_in or event["event"] == "logged_in"
+            yield event
+
+    result = collect_wishlist(watch())
+    return {"login": "Login successful" if logged_in else "Login failed", **result}
+
+
+def collect_wishlist(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Fold wishlist events into the ``{"message", "data"}`` result of get_wishlist.
+
+    A failed scrape also carries ``"error": True``, and a failed login ``"login_failed": True``.
+    """
+    datas: list[dict[str, Any]] = []
+    result: dict[str, Any] = {"message": "No wishlist items found"}
+    for event in events:
+        if event["event"] == "item":
+            datas.append(event["data"])
+        elif event["event"] == "done":
+            result["message"] = event["message"]
+            if event.get("error"):
+                datas = []
+                result.update({flag: True for flag in ("error", "login_failed") if event.get(flag)})
+    return {**result, "data": datas}
+
+
+def get_wishlist(email: str, password: str | None = None) -> dict[str, Any]:
+    return collect_wishlist(iter_wishlist(email, password))
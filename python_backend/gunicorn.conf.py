@@ -10,3 +10,20 @@ loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
 worker_class = "gthread"
 keepalive = 5
 preload_app = True
+
+_warmup = os.environ.get("GUNICORN_WARMUP", "").lower() in ("1", "true", "yes")
+_warmup_browsers = int(os.environ.get("GUNICORN_WARMUP_BROWSERS", "0"))
+
+
+def post_worker_init(worker):
+    if not _warmup:
+        return
+    from warmup import warm_worker
+
+    try:
+        timings = warm_worker(_warmup_browsers)
+    except Exception as e:
+        worker.log.warning(f"Worker warm-up failed: {e}")
+        return
+    summary = ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items())
+    worker.log.info(f"Worker {worker.pid} warmed up: {summary}")
@@ -0,0 +1,146 @@
+"""Hedged comic lookups: a second attempt for a lookup stuck in the latency tail.
+
+A Hedger runs each lookup on a worker thread under its own cancel token. If
+it has not finished after HEDGE_PERCENTILE of recent lookup latency, a
+second attempt starts on another browser session. The first attempt to
+return a successful result wins, and the other one is cancelled, which kills
+its browser (see cancellation). An attempt that raised or returned a result
+``is_success`` rejects (a scraper's placeholder record) does not win while
+the other one is still running.
+
+Hedges are limited so that a slow site does not get twice the load. Every
+lookup earns HEDGE_BUDGET_PERCENT / 100 of a hedge, and each hedge spends
+one. At most HEDGE_MAX_IN_FLIGHT hedges run at once. No hedge starts while
+the site is queued (queue_it); a second session would only join the queue.
+Off unless HEDGE_ENABLED is set.
+"""
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future
+from concurrent.futures import wait as wait_futures
+from typing import Any
+
+import cancellation
+import queue_it
+
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "2"))
+HEDGE_BUDGET_PERCENT = float(os.environ.get("HEDGE_BUDGET_PERCENT", "10"))
+HEDGE_MAX_IN_FLIGHT = int(os.environ.get("HEDGE_MAX_IN_FLIGHT", "2"))
+HEDGE_WINDOW = 200
+# Until this many lookups have been timed, hedge after HEDGE_MIN_DELAY.
+_MIN_SAMPLES = 20
+_MAX_CREDIT = 10.0
+
+
+class Hedger:
+    def __init__(self, fn: Callable[[str], Any], percentile: float = HEDGE_PERCENTILE,
+                 min_delay: float = HEDGE_MIN_DELAY, budget_percent: float = HEDGE_BUDGET_PERCENT,
+                 max_in_flight: int = HEDGE_MAX_IN_FLIGHT,
+                 is_success: Callable[[Any], bool] = lambda result: True) -> None:
+        self._fn = fn
+        self._is_success = is_success
+        self._percentile = percentile
+        self._min_delay = min_delay
+        self._budget = budget_percent / 100
+        self._max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self._credit = 1.0
+        self._in_flight = 0
+        self._counts = {"lookups": 0, "hedged": 0, "hedge_won": 0, "over_budget": 0}
+
+    def delay(self) -> float:
+        """Seconds after which a lookup is hedged: the configured percentile of recent latency."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < _MIN_SAMPLES:
+            return self._min_delay
+        index = min(len(samples) - 1, int(len(samples) * self._percentile / 100))
+        return max(samples[index], self._min_delay)
+
+    def _attempt(self, url: str, token: cancellation.CancelToken) -> Future[Any]:
+        future: Future[Any] = Future()
+
+        def run() -> None:
+            start = time.monotonic()
+            with cancellation.scope(token):
+                try:
+                    future.set_result(self._fn(url))
+                except BaseException as e:
+                    future.set_exception(e)
+            if token.reason in (None, "hedge_lost"):  # a lost attempt's time is a lower bound, but still tail
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start)
+
+        threading.Thread(target=run, name="comic-lookup", daemon=True).start()
+        return future
+
+    def _take_hedge(self) -> bool:
+        if queue_it.get_status()["active"]:
+            return False
+        with self._lock:
+            if self._credit < 1 or self._in_flight >= self._max_in_flight:
+                self._counts["over_budget"] += 1
+                return False
+            self._credit -= 1
+            self._in_flight += 1
+            self._counts["hedged"] += 1
+            return True
+
+    def call(self, url: str) -> Any:
+        """``fn(url)``, hedged once if it runs past ``delay()``; raises like ``fn``."""
+        with self._lock:
+            self._counts["lookups"] += 1
+            self._credit = min(self._credit + self._budget, _MAX_CREDIT)
+        parent = cancellation.current()
+        deadline = parent.deadline if parent is not None else None
+        tokens = [cancellation.CancelToken(deadline)]
+        attempts = {self._attempt(url, tokens[0]): tokens[0]}
+        hedged = False
+
+        def cancel_all() -> None:
+            for token in tokens:
+                token.cancel("request_cancelled")
+
+        key = object()
+        cancellation.on_cancel(key, cancel_all)
+        try:
+            done, _ = wait_futures(attempts, timeout=self.delay())
+            if not done and self._take_hedge():
+                hedged = True
+                tokens.append(cancellation.CancelToken(deadline))
+                attempts[self._attempt(url, tokens[1])] = tokens[1]
+                print(f"Comic lookup for {url} is slow, starting a hedged attempt")
+            pending = set(attempts)
+            finished: list[Future[Any]] = []  # in completion order, across rounds
+            while True:
+                done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                finished.extend(done)
+                winner = next((f for f in done if f.exception() is None and self._is_success(f.result())), None)
+                if winner is not None or not pending:
+                    break
+            # Nothing succeeded: prefer a returned placeholder over an exception.
+            winner = winner or next((f for f in finished if f.exception() is None), finished[0])
+            for future, token in attempts.items():
+                if future is not winner:
+                    token.cancel("hedge_lost")
+            if hedged and winner is not next(iter(attempts)):
+                with self._lock:
+                    self._counts["hedge_won"] += 1
+            cancellation.checkpoint()
+            return winner.result()
+        finally:
+            cancellation.discard(key)
+            if hedged:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = {**self._counts, "in_flight": self._in_flight, "credit": round(self._credit, 2)}
+        return {**stats, "enabled": HEDGE_ENABLED, "delay_seconds": round(self.delay(), 2)}
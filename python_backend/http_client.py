@@ -0,0 +1,81 @@
+"""Shared pooled HTTP client for the plain-HTTP (non-browser) code paths.
+
+Requests are paced per host (see pacing); 429 and 503 answers slow the host down.
+Pass ``background=True`` for requests nobody is waiting on, so they yield to the scrapes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import urllib3
+
+import pacing
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36"
+)
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "8"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "15"))
+
+_pool = urllib3.PoolManager(
+    num_pools=16,
+    maxsize=HTTP_POOL_SIZE,
+    block=False,
+    headers={"User-Agent": USER_AGENT},
+    timeout=urllib3.Timeout(connect=5, read=HTTP_TIMEOUT),
+    retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), redirect=5),
+)
+
+
+def request(method: str, url: str, background: bool = False, **kwargs: Any) -> urllib3.BaseHTTPResponse:
+    with pacing.slot(url, background=background) as slot:
+        response = _pool.request(method, url, **kwargs)
+        if response.status in (429, 503):
+            slot.throttle(pacing.parse_retry_after(response.headers.get("Retry-After")))
+    return response
+
+
+HTTP_VALIDATOR_CACHE_ENTRIES = int(os.environ.get("HTTP_VALIDATOR_CACHE_ENTRIES", "500"))
+
+_validator_lock = threading.Lock()
+# url -> (ETag, Last-Modified, body) of the last 200 response that carried a validator
+_validators: OrderedDict[str, tuple[str | None, str | None, bytes]] = OrderedDict()
+
+
+def conditional_get(url: str, **kwargs: Any) -> tuple[int, bytes, bool]:
+    """GET ``url``, revalidating with If-None-Match / If-Modified-Since when possible.
+
+    Returns ``(status, body, changed)``. On a 304 the body of the previous
+    response is returned with ``changed=False`` so callers can skip re-parsing.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    with _validator_lock:
+        cached = _validators.get(url)
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    response = request("GET", url, headers=headers, **kwargs)
+    if response.status == 304 and cached is not None:
+        with _validator_lock:
+            if url in _validators:
+                _validators.move_to_end(url)
+        return 200, cached[2], False
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    with _validator_lock:
+        if response.status == 200 and (etag or last_modified):
+            _validators[url] = (etag, last_modified, response.data)
+            _validators.move_to_end(url)
+            while len(_validators) > HTTP_VALIDATOR_CACHE_ENTRIES:
+                _validators.popitem(last=False)
+        else:
+            _validators.pop(url, None)
+    return response.status, response.data, True
@@ -0,0 +1,49 @@
+"""Deferred imports for the heavy scraper modules.
+
+Importing selenium, bs4/lxml and the scrapers costs more than the whole Flask
+app, so main.py binds the scraper entry points through LazyCallable and only
+pays that price on the first request that actually scrapes.
+"""
+import importlib
+import time
+from collections.abc import Callable
+from typing import Any
+
+SCRAPER_MODULES = (
+    "scraper_backend",
+    "get_comic_information",
+    "get_wishlist",
+    "send_wishlist",
+    "test_account",
+)
+
+
+class LazyCallable:
+    """Callable proxy that imports ``module.attr`` on first call."""
+
+    _target: Callable[..., Any] | None
+
+    def __init__(self, module: str, attr: str) -> None:
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        target = self._target
+        if target is None:
+            target = getattr(importlib.import_module(self._module), self._attr)
+            self._target = target
+        return target(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyCallable {self._module}.{self._attr}>"
+
+
+def preload(modules: tuple[str, ...] = SCRAPER_MODULES) -> dict[str, float]:
+    """Import ``modules`` now and return the import time of each in seconds."""
+    timings: dict[str, float] = {}
+    for module in modules:
+        start = time.perf_counter()
+        importlib.import_module(module)
+        timings[module] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,325 @@
+"""Load test for the Flask API with the scraper layer replaced by fakes.
+
+Starts the real ``main:app`` under gunicorn (gthread) for every worker/thread
+combination, swaps ``get_information``, ``get_wishlist``, ``handle_login`` and
+``send_wishlist`` for fakes with configurable latency and failure rates, and
+drives it at increasing client concurrency. For each point it reports
+throughput, latency percentiles and error rate.
+
+    python load_test.py --workers 1,2 --threads 4,8 --concurrency 1,8,32 --duration 10
+    python load_test.py --latency lognormal:0.8,0.5 --latency get_wishlist=lognormal:4,0.3 \\
+        --failure-rate 0.02 --mix get_comic_information=6,get_wishlist=3,test_account=1 --json
+
+Latency specs: ``fixed:S``, ``uniform:LO,HI``, ``lognormal:MEDIAN,SIGMA``, ``exp:MEAN``
+(seconds). A ``ROUTE=SPEC`` form overrides a single route.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+os.environ.setdefault('SECRET_KEY', '0123456789abcdef0123456789abcdef')
+os.environ.setdefault('FLASK_API_KEY', 'load-test-api-key')
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+ROUTES = {
+    "get_comic_information": "/get_comic_information",
+    "get_wishlist": "/get_wishlist",
+    "test_account": "/test_account",
+    "send_wishlist": "/send_wishlist",
+}
+DEFAULT_MIX = {"get_comic_information": 6, "get_wishlist": 2, "test_account": 1, "send_wishlist": 1}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec like ``lognormal:0.8,0.5`` into a sampler returning seconds."""
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(",")] if args else []
+    except ValueError as e:
+        raise ValueError(f"Invalid latency spec: {spec}") from e
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+class FakeScrapers:
+    """Stand-ins for the Selenium scrapers with sampled latency and failures."""
+
+    def __init__(self, latency: dict[str, str], failure_rate: float = 0.0,
+                 wishlist_items: int = 25, seed: int | None = None) -> None:
+        self._samplers = {route: parse_latency(latency.get(route, latency["default"])) for route in ROUTES}
+        self.failure_rate = failure_rate
+        self.wishlist_items = wishlist_items
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _work(self, route: str) -> None:
+        with self._rng_lock:
+            delay = max(self._samplers[route](self._rng), 0.0)
+            failed = self._rng.random() < self.failure_rate
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError(f"Injected {route} failure")
+
+    def get_information(self, url: str) -> dict[str, str]:
+        self._work("get_comic_information")
+        return {"url": url, "title": "Load Test Comic", "name": "Load Test Comic", "price": "12,00 €",
+                "Autor": "Jeph Loeb", "ISBN": "978-3-7416-0000-0"}
+
+    def get_wishlist(self, email: str, password: str | None = None) -> dict[str, Any]:
+        from normalize import normalize_item
+
+        self._work("get_wishlist")
+        items = [normalize_item({
+            "name": f"Comic {i}", "link": f"https://www.panini.de/shp_deu_de/comic-{i}.html",
+            "image": "", "price": f"{5 + i % 20},99 €", "release_date": "15.03.2024",
+        }) for i in range(self.wishlist_items)]
+        return {"message": f"Wishlist for {email}", "data": items}
+
+    def handle_login(self, email: str, password: str, keep_session: bool = False) -> str:
+        self._work("test_account")
+        return "Login successful"
+
+    def send_wishlist(self, email: str, password: str) -> str:
+        self._work("send_wishlist")
+        return "Wishlist send successfully."
+
+    def install(self, main_module: Any) -> None:
+        main_module.get_information = self.get_information
+        main_module.get_wishlist = self.get_wishlist
+        main_module.handle_login = self.handle_login
+        main_module.send_wishlist = self.send_wishlist
+
+
+def serve(config: dict[str, Any]) -> None:
+    """Run main:app under gunicorn with the fake scrapers installed. Blocks."""
+    from gunicorn.app.base import BaseApplication
+
+    class LoadTestApplication(BaseApplication):
+        def load_config(self) -> None:
+            self.cfg.set("bind", config["bind"])
+            self.cfg.set("workers", config["workers"])
+            self.cfg.set("threads", config["threads"])
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", 120)
+            self.cfg.set("keepalive", 5)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("loglevel", "warning")
+
+        def load(self) -> Any:
+            import main
+
+            FakeScrapers(config["latency"], config["failure_rate"], config["wishlist_items"]).install(main)
+            return main.app
+
+    LoadTestApplication().run()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, threads: int, args: argparse.Namespace) -> tuple[subprocess.Popen[bytes], str]:
+    port = _free_port()
+    config = {
+        "bind": f"127.0.0.1:{port}", "workers": workers, "threads": threads,
+        "latency": args.latency, "failure_rate": args.failure_rate, "wishlist_items": args.wishlist_items,
+    }
+    process = subprocess.Popen([sys.executable, __file__, "--serve", json.dumps(config)], cwd=_HERE)
+    base_url = f"http://127.0.0.1:{port}"
+    _wait_until_ready(base_url, process)
+    return process, base_url
+
+
+def _wait_until_ready(base_url: str, process: subprocess.Popen[bytes], timeout: float = 30) -> None:
+    import urllib3
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during start-up")
+        try:
+            response = urllib3.request("GET", base_url + "/queue_status", timeout=1, retries=False,
+                                       headers={"X-API-Key": os.environ["FLASK_API_KEY"]})
+            if response.status == 200:
+                return
+        except urllib3.exceptions.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def _stop_server(process: subprocess.Popen[bytes]) -> None:
+    process.send_signal(signal.SIGINT)  # quick shutdown; SIGTERM waits for keep-alive connections
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _request_bodies() -> dict[str, Callable[[int], dict[str, str]]]:
+    from encrypt import encrypt
+
+    email = encrypt("load-test@example.com")
+    password = encrypt("load-test-password")
+    return {
+        "get_comic_information": lambda n: {"url": f"https://www.panini.de/shp_deu_de/load-test-{n}.html"},
+        "get_wishlist": lambda n: {"email": email, "password": password},
+        "test_account": lambda n: {"email": email, "password": password},
+        "send_wishlist": lambda n: {"email": email, "password": password},
+    }
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def drive(base_url: str, concurrency: int, duration: float, mix: dict[str, int]) -> dict[str, Any]:
+    """Keep ``concurrency`` requests in flight for ``duration`` seconds and summarize them."""
+    import urllib3
+
+    pool = urllib3.PoolManager(maxsize=concurrency, timeout=urllib3.Timeout(total=150), retries=False)
+    bodies = _request_bodies()
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    counter = itertools.count()
+    headers = {"X-API-Key": os.environ["FLASK_API_KEY"], "Content-Type": "application/json"}
+    samples: list[tuple[str, float, int]] = []
+    samples_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            route = rng.choices(routes, weights)[0]
+            body = json.dumps(bodies[route](next(counter)))
+            start = time.perf_counter()
+            try:
+                status = pool.request("POST", base_url + ROUTES[route], body=body, headers=headers).status
+            except urllib3.exceptions.HTTPError:
+                status = 0
+            elapsed = (time.perf_counter() - start) * 1000
+            with samples_lock:
+                samples.append((route, elapsed, status))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+    pool.clear()
+
+    latencies = sorted(ms for _, ms, _ in samples)
+    errors = sum(1 for _, _, status in samples if status == 0 or status >= 500)
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "throughput_rps": len(samples) / wall if wall else 0.0,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p90_ms": _percentile(latencies, 0.90),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "error_rate": errors / len(samples) if samples else 0.0,
+    }
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for workers, threads in itertools.product(args.workers, args.threads):
+        process, base_url = _start_server(workers, threads, args)
+        try:
+            for concurrency in args.concurrency:
+                point = drive(base_url, concurrency, args.duration, args.mix)
+                results.append({"workers": workers, "threads": threads, **point})
+                if not args.json:
+                    print(f"workers={workers:<3} threads={threads:<3} concurrency={concurrency:<4} "
+                          f"rps={point['throughput_rps']:8.1f}  p50={point['p50_ms']:8.1f}ms  "
+                          f"p90={point['p90_ms']:8.1f}ms  p99={point['p99_ms']:8.1f}ms  "
+                          f"errors={point['error_rate']:6.1%}", flush=True)
+        finally:
+            _stop_server(process)
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route in mix: {route}")
+        mix[route] = int(weight or 1)
+    return mix
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--workers", type=_int_list, default=[1], help="comma-separated gunicorn worker counts")
+    parser.add_argument("--threads", type=_int_list, default=[4], help="comma-separated gunicorn thread counts")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16, 32],
+                        help="comma-separated client concurrency levels")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="fake scraper latency spec, optionally ROUTE=SPEC (default lognormal:0.5,0.5)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of scraper calls that raise")
+    parser.add_argument("--wishlist-items", type=int, default=25, help="items per fake wishlist")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX, help="route weights, e.g. get_wishlist=3,test_account=1")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(json.loads(args.serve))
+        return 0
+
+    latency = {"default": "lognormal:0.5,0.5"}
+    for spec in args.latency:
+        route, sep, rest = spec.partition("=")
+        if sep and route not in ROUTES:
+            parser.error(f"unknown route in --latency: {route}")
+        latency[route if sep else "default"] = rest if sep else spec
+    try:
+        for spec in latency.values():
+            parse_latency(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    args.latency = latency
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Logged-in browser sessions kept briefly for an immediate follow-up scrape.
+
+``/test_account`` with ``keep_session`` parks its Chrome after a successful
+login instead of quitting it; a wishlist scrape for the same credentials
+within LOGIN_SESSION_TTL seconds takes it over and skips the second Gigya
+login. Sessions are keyed by an HMAC of email and password under a key that
+never leaves this process, so neither is stored. At most LOGIN_SESSION_MAX
+sessions are parked; the oldest is quit to make room, and expired ones are
+quit by a background sweep.
+"""
+import atexit
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+LOGIN_SESSION_TTL = float(os.environ.get("LOGIN_SESSION_TTL", "60"))
+LOGIN_SESSION_MAX = int(os.environ.get("LOGIN_SESSION_MAX", "2"))
+
+_KEY = secrets.token_bytes(32)
+
+_lock = threading.Lock()
+# credentials key -> (parked at, driver), oldest first
+_parked: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+_counts = {"parked": 0, "reused": 0, "expired": 0}
+_sweeper: threading.Timer | None = None
+
+
+def credentials_key(email: str, password: str) -> str:
+    return hmac.new(_KEY, f"{email.strip().lower()}\0{password}".encode(), hashlib.sha256).hexdigest()
+
+
+def _quit(driver: Any) -> None:
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Error quitting parked browser session: {e}")
+
+
+def park(email: str, password: str, driver: Any) -> bool:
+    """Keep ``driver`` (logged in as ``email``) for a follow-up; False if sessions are disabled."""
+    if LOGIN_SESSION_TTL <= 0 or LOGIN_SESSION_MAX <= 0:
+        return False
+    key = credentials_key(email, password)
+    evicted = []
+    with _lock:
+        if key in _parked:
+            evicted.append(_parked.pop(key)[1])
+        _parked[key] = (time.monotonic(), driver)
+        _counts["parked"] += 1
+        while len(_parked) > LOGIN_SESSION_MAX:
+            evicted.append(_parked.popitem(last=False)[1][1])
+    for old in evicted:
+        _quit(old)
+    _schedule_sweep()
+    return True
+
+
+def take(email: str, password: str) -> Any | None:
+    """The parked session for these credentials, if one is still fresh; the caller owns it now."""
+    key = credentials_key(email, password)
+    with _lock:
+        entry = _parked.pop(key, None)
+        if entry is not None and time.monotonic() - entry[0] <= LOGIN_SESSION_TTL:
+            _counts["reused"] += 1
+            return entry[1]
+        if entry is not None:
+            _counts["expired"] += 1
+    if entry is not None:
+        _quit(entry[1])
+    return None
+
+
+def sweep(now: float | None = None) -> int:
+    """Quit sessions parked longer than LOGIN_SESSION_TTL; returns how many."""
+    now = time.monotonic() if now is None else now
+    with _lock:
+        expired = [key for key, (parked_at, _) in _parked.items() if now - parked_at > LOGIN_SESSION_TTL]
+        drivers = [_parked.pop(key)[1] for key in expired]
+        _counts["expired"] += len(drivers)
+    for driver in drivers:
+        _quit(driver)
+    return len(drivers)
+
+
+def _run_sweep() -> None:
+    global _sweeper
+    sweep()
+    with _lock:
+        _sweeper = None
+        remaining = bool(_parked)
+    if remaining:
+        _schedule_sweep()
+
+
+def _schedule_sweep() -> None:
+    global _sweeper
+    with _lock:
+        if _sweeper is not None:
+            return
+        _sweeper = threading.Timer(LOGIN_SESSION_TTL + 1, _run_sweep)
+        _sweeper.daemon = True
+        _sweeper.start()
+
+
+def clear() -> None:
+    with _lock:
+        drivers = [driver for _, driver in _parked.values()]
+        _parked.clear()
+    for driver in drivers:
+        _quit(driver)
+
+
+atexit.register(clear)
+
+
+def get_stats() -> dict[str, Any]:
+    with _lock:
+        return {**_counts, "active": len(_parked), "ttl_seconds": LOGIN_SESSION_TTL}
@@ -0,0 +1,130 @@
+"""Client for the Magento storefront GraphQL API behind panini.de.
+
+``get_many`` resolves any number of product URLs with one ``products``
+query per MAGENTO_BATCH_SIZE URL keys, over the pooled http_client
+connections, and normalizes each product into the same dict get_information
+scrapes from the page ("price", "url", "title", "name", "ISBN", ...).
+
+Which custom attribute codes hold author, ISBN etc. is store configuration;
+MAGENTO_ATTRIBUTE_LABELS maps them onto the labels of the product page's
+attribute table. magento_mock serves recorded responses for offline tests.
+"""
+import json
+import os
+from typing import Any
+
+import http_client
+from normalize import product_id
+from structured_data import format_date, format_price
+
+MAGENTO_GRAPHQL_URL = os.environ.get("MAGENTO_GRAPHQL_URL", "https://www.panini.de/graphql")
+MAGENTO_STORE_CODE = os.environ.get("MAGENTO_STORE_CODE", "shp_deu_de")
+MAGENTO_BATCH_SIZE = int(os.environ.get("MAGENTO_BATCH_SIZE", "50"))
+MAGENTO_ATTRIBUTE_LABELS = {
+    "author": "Autor",
+    "drawer": "Zeichner",
+    "illustrator": "Zeichner",
+    "series": "Serie",
+    "isbn": "ISBN",
+    "page_count": "Seitenzahl",
+    "release_date": "Erscheinungsdatum",
+    **json.loads(os.environ.get("MAGENTO_ATTRIBUTE_LABELS", "{}")),
+}
+
+PRODUCTS_QUERY = """
+query ProductsByUrlKey($keys: [String], $size: Int) {
+  products(filter: {url_key: {in: $keys}}, pageSize: $size) {
+    items {
+      name
+      sku
+      url_key
+      url_suffix
+      stock_status
+      price_range { minimum_price { final_price { value currency } } }
+      custom_attributesV2 {
+        items {
+          code
+          ... on AttributeValue { value }
+          ... on AttributeSelectedOptions { selected_options { label } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class MagentoApiError(Exception):
+    """The storefront API answered with an error or something that is not GraphQL."""
+
+
+def _post(query: str, variables: dict[str, Any]) -> dict[str, Any]:
+    response = http_client.request(
+        "POST", MAGENTO_GRAPHQL_URL,
+        body=json.dumps({"query": query, "variables": variables}).encode(),
+        headers={"Content-Type": "application/json", "Store": MAGENTO_STORE_CODE},
+    )
+    if response.status != 200:
+        raise MagentoApiError(f"GraphQL request returned HTTP {response.status}")
+    try:
+        payload = json.loads(response.data)
+    except ValueError as e:
+        raise MagentoApiError(f"GraphQL response is not JSON: {e}") from e
+    if payload.get("errors"):
+        raise MagentoApiError("; ".join(error.get("message", "?") for error in payload["errors"]))
+    return payload.get("data") or {}
+
+
+def _attribute_value(attribute: dict[str, Any]) -> str:
+    if "selected_options" in attribute:
+        return ", ".join(option["label"] for option in attribute["selected_options"] or [] if option.get("label"))
+    return str(attribute.get("value") or "").strip()
+
+
+def normalize_product(item: dict[str, Any], url: str) -> dict[str, str]:
+    """A GraphQL product item as a get_information result."""
+    name = (item.get("name") or "").strip()
+    final_price = ((item.get("price_range") or {}).get("minimum_price") or {}).get("final_price") or {}
+    data = {
+        "price": (format_price(final_price["value"], final_price.get("currency") or "EUR")
+                  if final_price.get("value") is not None else "Price unavailable"),
+        "url": url,
+        "title": name or "Unknown Title",
+        "name": name or "Unknown Comic",
+    }
+    for attribute in (item.get("custom_attributesV2") or {}).get("items") or []:
+        label = MAGENTO_ATTRIBUTE_LABELS.get(attribute.get("code", ""))
+        value = _attribute_value(attribute)
+        if label and value:
+            data[label] = format_date(value) if label == "Erscheinungsdatum" else value
+    if item.get("sku"):
+        data["Artikelnummer"] = item["sku"]
+    return data
+
+
+def get_many(urls: list[str]) -> dict[str, dict[str, str]]:
+    """Resolve product URLs to comic dicts; URLs the store does not know are left out."""
+    by_key: dict[str, list[str]] = {}
+    for url in urls:
+        by_key.setdefault(product_id(url), []).append(url)
+    keys = list(by_key)
+
+    results: dict[str, dict[str, str]] = {}
+    for start in range(0, len(keys), MAGENTO_BATCH_SIZE):
+        batch = keys[start:start + MAGENTO_BATCH_SIZE]
+        data = _post(PRODUCTS_QUERY, {"keys": batch, "size": len(batch)})
+        for item in (data.get("products") or {}).get("items") or []:
+            for url in by_key.get((item.get("url_key") or "").lower(), []):
+                results[url] = normalize_product(item, url)
+    return results
+
+
+def get_information(url: str) -> dict[str, str]:
+    try:
+        result = get_many([url]).get(url)
+    except Exception as e:
+        print(f"Error looking up {url} in the storefront API: {e}")
+        return {"error": f"Failed to fetch comic information: {e}"}
+    if result is None:
+        return {"error": f"Product not found in storefront API: {url}"}
+    return result
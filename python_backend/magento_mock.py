@@ -0,0 +1,103 @@
+"""Local stand-in for the Magento storefront GraphQL API.
+
+Replays recorded ``products`` responses from fixtures/magento/*.json: every
+product item in them is indexed by ``url_key``, and a products query is
+answered with the recorded items whose key is in ``$keys``, in the shape the
+real endpoint returns. Used by the tests and for running the ``api`` scraper
+backend offline:
+
+    python magento_mock.py --port 8089
+    MAGENTO_GRAPHQL_URL=http://127.0.0.1:8089/graphql SCRAPER_BACKEND=api gunicorn ...
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "magento")
+
+
+def load_recorded(directory: str = FIXTURES_DIR) -> dict[str, dict[str, Any]]:
+    """url_key -> recorded product item, from every recorded response in ``directory``."""
+    products = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            recorded = json.load(f)
+        for item in recorded.get("data", {}).get("products", {}).get("items", []):
+            products[item["url_key"]] = item
+    return products
+
+
+class MockStorefront(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], products: dict[str, dict[str, Any]]) -> None:
+        super().__init__(address, _Handler)
+        self.products = products
+        self.queries: list[dict[str, Any]] = []  # variables of every query served, for tests
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockStorefront
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/graphql":
+            self._send(404, {"errors": [{"message": "Not found"}]})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+        except ValueError:
+            self._send(400, {"errors": [{"message": "Request body is not JSON"}]})
+            return
+        if "products" not in request.get("query", ""):
+            self._send(200, {"errors": [{"message": "Only products queries are recorded"}]})
+            return
+        variables = request.get("variables") or {}
+        self.server.queries.append(variables)
+        keys = variables.get("keys") or []
+        items = [self.server.products[key] for key in keys if key in self.server.products]
+        self._send(200, {"data": {"products": {"items": items, "total_count": len(items)}}})
+
+    def _send(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start(port: int = 0, directory: str = FIXTURES_DIR) -> MockStorefront:
+    """Serve the recorded responses on 127.0.0.1 from a background thread; ``shutdown()`` to stop."""
+    server = MockStorefront(("127.0.0.1", port), load_recorded(directory))
+    threading.Thread(target=server.serve_forever, name="magento-mock", daemon=True).start()
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of recorded responses")
+    args = parser.parse_args(argv)
+
+    server = MockStorefront(("127.0.0.1", args.port), load_recorded(args.fixtures))
+    print(f"Serving {len(server.products)} recorded products at {server.url}")
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,5 @@
 import contextlib
+import functools
 import json
 import os
 import threading
@@ -6,18 +7,40 @@ import time
 from typing import Any
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, send_file
 from flask_cors import CORS
 from urllib.parse import urlparse
 
+import asset_proxy
+import cancellation
+import comic_index
+import comic_prefetch
+import hedging
+import pacing
+import price_history
+import response_encoding
+import selector_stats
+import thumbnails
+from cancellation import Cancelled
 from decrypt_string import decrypt_string
-from get_comic_information import get_information
-from get_wishlist import get_wishlist
-from send_wishlist import send_wishlist
-from test_account import handle_login
+from lazy_import import LazyCallable
+from queue_it import QueueItActive
+from queue_it import get_status as get_queue_status
+from wishlist_query import apply_query, parse_query_params
 
 load_dotenv()
 
+# Scrapers pull in selenium and bs4/lxml; defer that until a route needs them.
+get_information = LazyCallable('scraper_backend', 'get_information')
+get_wishlist = LazyCallable('scraper_backend', 'get_wishlist')
+iter_wishlist = LazyCallable('scraper_backend', 'iter_wishlist')
+send_wishlist = LazyCallable('scraper_backend', 'send_wishlist')
+handle_login = LazyCallable('scraper_backend', 'handle_login')
+login_and_get_wishlist = LazyCallable('scraper_backend', 'login_and_get_wishlist')
+get_information_many = LazyCallable('scraper_backend', 'get_information_many')
+supports_get_many = LazyCallable('scraper_backend', 'supports_get_many')
+collect_wishlist = LazyCallable('get_wishlist', 'collect_wishlist')
+
 port = os.getenv('BACKEND_PORT')
 flask_api_key = os.getenv('FLASK_API_KEY')
 
@@ -38,6 +61,14 @@ _cache_lock = threading.Lock()
 comic_cache: dict[str, tuple[float, dict[str, Any]]] = {}
 CACHE_MAX_ENTRIES = 500
 CACHE_TTL_SECONDS = 86400  # 24 hours
+BATCH_MAX_URLS = 100
+# How long an enriched wishlist response waits for its comic prefetches before
+# answering with the rest flagged comic_pending.
+ENRICH_WAIT_SECONDS = float(os.getenv('ENRICH_WAIT_SECONDS', '0'))
+
+# Wishlist routes used to return "result" as a JSON-encoded string; set this
+# (or send ?result_format=string / X-Result-Format: string) for old clients.
+WISHLIST_RESULT_AS_STRING = os.getenv('WISHLIST_RESULT_AS_STRING', '0').lower() in ('1', 'true', 'yes')
 
 
 def _check_rate_limit(client_ip: str) -> bool:
@@ -60,6 +91,7 @@ def _get_cached_comic(url: str) -> dict[str, Any] | None:
             if time.time() - cache_time < CACHE_TTL_SECONDS:
                 return cache_data
             del comic_cache[url]
+            comic_index.remove(url)
     return None
 
 
@@ -70,7 +102,10 @@ def _set_cached_comic(url: str, data: dict[str, Any]) -> None:
             sorted_entries = sorted(comic_cache.items(), key=lambda x: x[1][0])
             for key, _ in sorted_entries[: len(comic_cache) - CACHE_MAX_ENTRIES + 50]:
                 del comic_cache[key]
+                comic_index.remove(key)
         comic_cache[url] = (time.time(), data)
+        if isinstance(data, dict):
+            comic_index.add(url, data)
 
 
 def _validate_json_body(required_fields: list[str]) -> tuple[dict[str, Any] | None, str | None]:
@@ -90,6 +125,128 @@ def _safe_decrypt(encrypted: str) -> str | None:
         return None
 
 
+def _query_wishlist(result: dict[str, Any], params: dict[str, Any]) -> dict[str, Any]:
+    items, meta = apply_query(result.get("data", []), params)
+    return {**result, "data": items, **meta}
+
+
+def _comic_cache_key(link: str) -> str | None:
+    """The comic cache key the comic information routes use for ``link``; None if not allowed."""
+    url = link.strip().lower()
+    if not url:
+        return None
+    if not url.startswith('http'):
+        url = 'https://' + url
+    return url if _validate_comic_url(url) else None
+
+
+def _is_complete_comic(result: Any) -> bool:
+    """False for an error, or for the placeholder record a failed scrape returns; neither is cached."""
+    return isinstance(result, dict) and "error" not in result and not result.get("scrape_failed")
+
+
+def _fetch_comic(url: str) -> dict[str, Any]:
+    result = get_information(url)
+    if _is_complete_comic(result):
+        _set_cached_comic(url, result)
+    return result
+
+
+_prefetcher = comic_prefetch.Prefetcher(_get_cached_comic, _fetch_comic)
+
+
+# Late-bound, so the lookup goes through whatever get_information currently is.
+_hedger = hedging.Hedger(lambda url: get_information(url), is_success=_is_complete_comic)
+
+
+def _lookup_comic(url: str) -> Any:
+    """get_information for a cache miss a client is waiting on, hedged when HEDGE_ENABLED."""
+    return _hedger.call(url) if hedging.HEDGE_ENABLED else get_information(url)
+
+
+def _wants_enrichment() -> bool:
+    return request.args.get('enrich', '').lower() in ('1', 'true', 'yes')
+
+
+def _prefetching(events: Any) -> Any:
+    """Pass wishlist events through, starting a comic prefetch for every item as it is parsed."""
+    for event in events:
+        if event["event"] == "item":
+            url = _comic_cache_key(event["data"].get("link", ""))
+            if url:
+                _prefetcher.submit(url)
+        yield event
+
+
+def _load_wishlist(email: str, password: str | None) -> dict[str, Any]:
+    if not _wants_enrichment():
+        return get_wishlist(email, password) if password else get_wishlist(email)
+    return collect_wishlist(_prefetching(iter_wishlist(email, password)))
+
+
+def _join_comic(item: dict[str, Any]) -> dict[str, Any]:
+    url = _comic_cache_key(item.get("link", ""))
+    comic = _get_cached_comic(url) if url else None
+    return {**item, "comic": comic, "comic_pending": comic is None and url is not None and _prefetcher.pending(url)}
+
+
+def _join_comics(result: dict[str, Any]) -> dict[str, Any]:
+    """Attach cached comic information to every item; ``comic_pending`` marks fetches still running."""
+    urls = [url for url in (_comic_cache_key(item.get("link", "")) for item in result.get("data", [])) if url]
+    _prefetcher.wait(urls, ENRICH_WAIT_SECONDS)
+    items = [_join_comic(item) for item in result.get("data", [])]
+    return {**result, "data": items, "comics_pending": sum(item["comic_pending"] for item in items)}
+
+
+def _queue_it_response() -> tuple[Any, int]:
+    status = get_queue_status()
+    response = jsonify({"error": "Panini is currently queued, please retry later", "queue": status})
+    response.headers['Retry-After'] = str(status["retry_after"] or 1)
+    return response, 503
+
+
+def _cancel_token() -> cancellation.CancelToken:
+    """Cancelled at the X-Request-Deadline or when the client hangs up (detectable under gunicorn)."""
+    sock = request.environ.get('gunicorn.socket')
+    return cancellation.CancelToken(cancellation.parse_deadline(request.headers.get('X-Request-Deadline', '')),
+                                    cancellation.peer_closed(sock) if sock is not None else None)
+
+
+def _cancellable(view: Any) -> Any:
+    """Run a scraping route under a cancel token, so its browser is killed once nobody waits for it."""
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with cancellation.scope(_cancel_token()):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def _cancelled_response() -> tuple[Any, int]:
+    token = cancellation.current()
+    reason = token.reason if token is not None else None
+    return jsonify({"error": "Request cancelled", "reason": reason}), 504
+
+
+def _wants_msgpack() -> bool:
+    if not response_encoding.msgpack_available():
+        return False
+    if request.args.get('format') == 'msgpack':
+        return True
+    accept = request.accept_mimetypes
+    return accept.quality(response_encoding.MSGPACK_MIMETYPE) > accept.quality('application/json')
+
+
+def _wishlist_response(message: str, result: dict[str, Any]) -> tuple[Any, int]:
+    legacy = (WISHLIST_RESULT_AS_STRING or request.args.get('result_format') == 'string'
+              or request.headers.get('X-Result-Format') == 'string')
+    if legacy:
+        return jsonify({"message": message, "result": json.dumps(result)}), 200
+    payload = {"message": message, "result": result}
+    if _wants_msgpack():
+        return Response(response_encoding.packb(payload), mimetype=response_encoding.MSGPACK_MIMETYPE), 200
+    return jsonify(payload), 200
+
+
 _BOT_PATHS = frozenset({
     '/wp-includes', '/xmlrpc.php', '/wp-admin', '/wp-content',
     '/wordpress', '/blog', '/web', '/news', '/cms', '/sito',
@@ -97,6 +254,7 @@ _BOT_PATHS = frozenset({
 })
 
 _PUBLIC_PATHS = frozenset({'/get_shared_wishlist'})
+_PUBLIC_PREFIXES = ('/thumbnail/',)
 
 _ALLOWED_COMIC_DOMAINS = frozenset({'panini.de', 'www.panini.de', 'comicguide.de', 'www.comicguide.de'})
 
@@ -119,7 +277,7 @@ def verify_api_key() -> tuple[str, int] | None:
     path = request.path.lower()
     if path in _BOT_PATHS or any(path.startswith(p + '/') for p in _BOT_PATHS):
         return '', 404
-    if path in _PUBLIC_PATHS:
+    if path in _PUBLIC_PATHS or path.startswith(_PUBLIC_PREFIXES):
         return None
     if not flask_api_key:
         return jsonify({"error": "Server configuration error: API key not set"}), 500
@@ -137,7 +295,27 @@ def add_security_headers(response: Any) -> Any:
     return response
 
 
+@app.after_request
+def compress_response(response: Any) -> Any:
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300 or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in response_encoding.COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(response_encoding.supported_encodings())
+    if not encoding:
+        return response
+    body = response.get_data()
+    if len(body) < response_encoding.COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(response_encoding.compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
 @app.route('/test_account', methods=['POST'])
+@_cancellable
 def login() -> tuple[str, int]:
     data, error = _validate_json_body(['email', 'password'])
     if error:
@@ -148,17 +326,57 @@ def login() -> tuple[str, int]:
 
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
+    # Keep the logged-in browser for a wishlist scrape that is about to follow.
+    keep_session = bool(data.get('keep_session')) or request.args.get('keep_session', '').lower() in ('1', 'true', 'yes')
 
     try:
-        result = handle_login(email, password)
+        result = handle_login(email, password, keep_session)
         if result == "Login failed":
             return jsonify({"message": "Login failed"}), 400
         return jsonify({"message": "Login successful"}), 200
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error in login: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
+@app.route('/login_and_get_wishlist', methods=['POST'])
+@_cancellable
+def login_and_get_wishlist_api() -> tuple[str, int]:
+    """Check the credentials and scrape the wishlist in the same browser session."""
+    data, error = _validate_json_body(['email', 'password'])
+    if error:
+        return jsonify({"error": error}), 400
+    params, error = parse_query_params(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    email = _safe_decrypt(data['email'])
+    password = _safe_decrypt(data['password'])
+
+    if not email or not password:
+        return jsonify({"error": "Email and password are required"}), 400
+
+    try:
+        result = login_and_get_wishlist(email, password)
+        if result.get("login") == "Login failed":
+            return jsonify({"message": "Login failed"}), 400
+        result = _query_wishlist(result, params)
+        if _wants_enrichment():
+            result = _join_comics(result)
+        return _wishlist_response("Login successful", result)
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
+    except Exception as e:
+        app.logger.error(f"Error in login_and_get_wishlist: {e}")
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
 @app.route('/send_wishlist', methods=['POST'])
 def send_wishlist_api() -> tuple[str, int]:
     data, error = _validate_json_body(['email', 'password'])
@@ -176,14 +394,20 @@ def send_wishlist_api() -> tuple[str, int]:
         if result == "Login failed":
             return jsonify({"message": "Login failed"}), 400
         return jsonify({"message": "Wishlist send successful"}), 200
+    except QueueItActive:
+        return _queue_it_response()
     except Exception as e:
         app.logger.error(f"Error in send_wishlist: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
 @app.route('/get_wishlist', methods=['POST'])
+@_cancellable
 def get_wishlist_api() -> tuple[str, int]:
     data, error = _validate_json_body(['email'])
+    if error:
+        return jsonify({"error": error}), 400
+    params, error = parse_query_params(request.args)
     if error:
         return jsonify({"error": error}), 400
 
@@ -194,16 +418,26 @@ def get_wishlist_api() -> tuple[str, int]:
         return jsonify({"error": "Email is required"}), 400
 
     try:
-        result = get_wishlist(email, password) if password else get_wishlist(email)
-        return jsonify({"message": "Got Wishlist successfully", "result": json.dumps(result)}), 200
+        result = _query_wishlist(_load_wishlist(email, password), params)
+        if _wants_enrichment():
+            result = _join_comics(result)
+        return _wishlist_response("Got Wishlist successfully", result)
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error in get_wishlist: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
 @app.route('/get_wishlist_complete', methods=['POST'])
+@_cancellable
 def get_wishlist_complete_api() -> tuple[str, int]:
     data, error = _validate_json_body(['email', 'password'])
+    if error:
+        return jsonify({"error": error}), 400
+    params, error = parse_query_params(request.args)
     if error:
         return jsonify({"error": error}), 400
 
@@ -214,14 +448,70 @@ def get_wishlist_complete_api() -> tuple[str, int]:
         return jsonify({"error": "Email and password are required"}), 400
 
     try:
-        result = get_wishlist(email, password)
-        return jsonify({"message": "Got Wishlist successfully", "result": json.dumps(result)}), 200
+        result = _query_wishlist(_load_wishlist(email, password), params)
+        if _wants_enrichment():
+            result = _join_comics(result)
+        return _wishlist_response("Got Wishlist successfully", result)
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error in get_wishlist_complete: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
+def _encode_stream_event(event: dict[str, Any], sse: bool) -> str:
+    payload = json.dumps(event, separators=(',', ':'))
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _stream_wishlist_events(email: str, password: str, sse: bool, enrich: bool = False,
+                            token: cancellation.CancelToken | None = None) -> Any:
+    # The body is produced after the view returned, so the token is bound here rather than by _cancellable.
+    with cancellation.scope(token or cancellation.CancelToken()):
+        try:
+            events = iter_wishlist(email, password)
+            for event in _prefetching(events) if enrich else events:
+                if enrich and event["event"] == "item":
+                    event = {**event, "data": _join_comic(event["data"])}
+                yield _encode_stream_event(event, sse)
+        except QueueItActive:
+            yield _encode_stream_event({
+                "event": "error",
+                "error": "Panini is currently queued, please retry later",
+                "queue": get_queue_status(),
+            }, sse)
+        except Cancelled as e:
+            yield _encode_stream_event({"event": "error", "error": str(e)}, sse)
+
+
+@app.route('/get_wishlist_stream', methods=['POST'])
+def get_wishlist_stream_api() -> Any:
+    """Stream wishlist progress and items as NDJSON, or as SSE when requested."""
+    data, error = _validate_json_body(['email', 'password'])
+    if error:
+        return jsonify({"error": error}), 400
+
+    email = _safe_decrypt(data['email'])
+    password = _safe_decrypt(data['password'])
+
+    if not email or not password:
+        return jsonify({"error": "Email and password are required"}), 400
+
+    sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    mimetype = 'text/event-stream' if sse else 'application/x-ndjson'
+    events = _stream_wishlist_events(email, password, sse, _wants_enrichment(), _cancel_token())
+    response = Response(events, mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @app.route('/get_comic_information', methods=['POST'])
+@_cancellable
 def get_comic_information_route() -> tuple[str, int]:
     data, error = _validate_json_body(['url'])
     if error:
@@ -239,20 +529,26 @@ def get_comic_information_route() -> tuple[str, int]:
         return jsonify({"message": "Comic information fetched from cache", "result": cached}), 200
 
     try:
-        result = get_information(url)
+        result = _lookup_comic(url)
 
         if isinstance(result, dict) and "error" in result:
             app.logger.error(f"Comic info error: {result['error']}")
             return jsonify({"error": "Failed to fetch comic information"}), 400
 
-        _set_cached_comic(url, result)
+        if _is_complete_comic(result):
+            _set_cached_comic(url, result)
         return jsonify({"message": "Comic information fetched successfully", "result": result}), 200
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error fetching comic information: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
 @app.route('/get_comic_information_api', methods=['POST'])
+@_cancellable
 def get_comic_information_api() -> tuple[str, int]:
     if request.method == 'POST':
         data = request.json
@@ -281,7 +577,7 @@ def get_comic_information_api() -> tuple[str, int]:
         return jsonify({"message": "Comic information fetched from cache", "result": cached}), 200
 
     try:
-        result = get_information(url)
+        result = _lookup_comic(url)
 
         if isinstance(result, dict) and "error" in result:
             app.logger.error(f"Comic info error: {result['error']}")
@@ -291,13 +587,85 @@ def get_comic_information_api() -> tuple[str, int]:
             with contextlib.suppress(json.JSONDecodeError):
                 result = json.loads(result)
 
-        _set_cached_comic(url, result)
+        if _is_complete_comic(result):
+            _set_cached_comic(url, result)
         return jsonify({"message": "Comic information fetched successfully", "result": result}), 200
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error fetching comic information: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
 
 
+@app.route('/get_comic_information_batch', methods=['POST'])
+@_cancellable
+def get_comic_information_batch_api() -> tuple[str, int]:
+    data, error = _validate_json_body(['urls'])
+    if error:
+        return jsonify({"error": error}), 400
+    urls = data['urls']
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return jsonify({"error": "urls must be a list of strings"}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {BATCH_MAX_URLS} urls per request"}), 400
+
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    missing = []
+    for raw_url in urls:
+        url = raw_url.strip().lower()
+        if not url.startswith('http'):
+            url = 'https://' + url
+        if not _validate_comic_url(url):
+            errors[raw_url] = "Domain not allowed"
+            continue
+        cached = _get_cached_comic(url)
+        if cached is not None:
+            results[url] = cached
+        elif url not in missing:
+            missing.append(url)
+
+    if missing and not supports_get_many():
+        # One scrape per URL would hold this worker for minutes. Hand them to the
+        # bounded prefetch pool instead; clients ask again for the pending ones.
+        for url in missing:
+            _prefetcher.submit(url)
+        _prefetcher.wait(missing, ENRICH_WAIT_SECONDS)
+        pending = []
+        for url in missing:
+            cached = _get_cached_comic(url)
+            if cached is not None:
+                results[url] = cached
+            elif _prefetcher.pending(url):
+                pending.append(url)
+            else:
+                errors[url] = "Failed to fetch comic information"
+        return jsonify({"message": "Comic information fetched", "result": results, "errors": errors,
+                        "pending": pending}), 200
+
+    try:
+        fetched = get_information_many(missing) if missing else {}
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
+    except Exception as e:
+        app.logger.error(f"Error fetching comic information batch: {e}")
+        return jsonify({"error": "An internal error occurred"}), 500
+
+    for url, result in fetched.items():
+        if isinstance(result, dict) and "error" in result:
+            errors[url] = "Failed to fetch comic information"
+            continue
+        if _is_complete_comic(result):
+            _set_cached_comic(url, result)
+        results[url] = result
+    return jsonify({"message": "Comic information fetched", "result": results, "errors": errors,
+                    "pending": []}), 200
+
+
 @app.route('/get_comic_information_api/<path:subpath>', methods=['POST'])
 @app.route('/get_comic_information/<path:subpath>', methods=['GET', 'POST'])
 def get_comic_information_wildcard(subpath: str | None = None) -> tuple[str, int]:
@@ -307,13 +675,117 @@ def get_comic_information_wildcard(subpath: str | None = None) -> tuple[str, int
         return get_comic_information_route()
 
 
+@app.route('/queue_status', methods=['GET'])
+def queue_status_api() -> tuple[str, int]:
+    return jsonify(get_queue_status()), 200
+
+
+@app.route('/selector_stats', methods=['GET'])
+def selector_stats_api() -> tuple[str, int]:
+    return jsonify(selector_stats.get_stats()), 200
+
+
+@app.route('/scraper_stats', methods=['GET'])
+def scraper_stats_api() -> tuple[str, int]:
+    from scraper_backend import OPERATIONS, backend_name_for, get_stats
+
+    backends = {operation: backend_name_for(operation) for operation in OPERATIONS}
+    return jsonify({"backends": backends, "stats": get_stats(), "prefetch": _prefetcher.get_stats(),
+                    "cancellation": cancellation.get_stats(), "hedging": _hedger.get_stats(),
+                    "pacing": pacing.get_stats()}), 200
+
+
+@app.route('/browser_stats', methods=['GET'])
+def browser_stats_api() -> tuple[str, int]:
+    import browser_watchdog
+    import login_sessions
+    import profile_template
+
+    return jsonify({**browser_watchdog.get_stats(), "login_sessions": login_sessions.get_stats(),
+                    "profile_template": profile_template.get_stats()}), 200
+
+
+@app.route('/price_history', methods=['GET'])
+def price_history_api() -> tuple[str, int]:
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({"error": "url is required"}), 400
+    if not url.startswith('http'):
+        url = 'https://' + url
+    if not _validate_comic_url(url):
+        return jsonify({"error": "Domain not allowed"}), 400
+
+    try:
+        start = float(request.args['start']) if request.args.get('start') else None
+        end = float(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({"error": "start and end must be unix timestamps"}), 400
+
+    store = price_history.get_store()
+    if request.args.get('resolution', 'raw') == 'day':
+        return jsonify({"url": url, "resolution": "day", "result": store.daily(url, start, end)}), 200
+    return jsonify({"url": url, "resolution": "raw", "result": store.query(url, start, end)}), 200
+
+
+@app.route('/search_comics', methods=['GET'])
+def search_comics_api() -> tuple[str, int]:
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', '20')), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    results = []
+    for url, score in comic_index.search(query, limit):
+        cached = _get_cached_comic(url)  # drops entries that expired since they were indexed
+        if cached is not None:
+            results.append({"url": url, "score": round(score, 2), "result": cached})
+    return jsonify({"query": query, "result": results, "total": len(results)}), 200
+
+
+@app.route('/thumbnail/<thumb_id>', methods=['GET'])
+def thumbnail_api(thumb_id: str) -> Any:
+    if len(thumb_id) != 32 or any(c not in '0123456789abcdef' for c in thumb_id):
+        return jsonify({"error": "Invalid thumbnail id"}), 400
+
+    try:
+        entry = thumbnails.get_cache().get(thumb_id)
+    except Exception as e:
+        app.logger.error(f"Error fetching thumbnail {thumb_id}: {str(e)}")
+        return jsonify({"error": "Failed to fetch image"}), 502
+    if entry is None:
+        return jsonify({"error": "Unknown thumbnail"}), 404
+
+    # The id names the image URL, not its bytes: panini.de can replace the image, so
+    # clients revalidate daily against the ETag, the SHA-256 of the cached bytes.
+    return send_file(entry["path"], mimetype=entry["mimetype"], conditional=True,
+                     etag=entry["sha256"], max_age=86400)
+
+
+@app.route('/thumbnail_stats', methods=['GET'])
+def thumbnail_stats_api() -> tuple[str, int]:
+    return jsonify(thumbnails.get_cache().get_stats()), 200
+
+
+@app.route('/asset_proxy_stats', methods=['GET'])
+def asset_proxy_stats_api() -> tuple[str, int]:
+    return jsonify(asset_proxy.get_stats()), 200
+
+
 @app.route('/get_shared_wishlist', methods=['GET'])
+@_cancellable
 def get_shared_wishlist_api() -> tuple[str, int]:
     client_ip = request.remote_addr or 'unknown'
 
     if not _check_rate_limit(client_ip):
         return jsonify({"error": "Rate limit exceeded"}), 429
 
+    params, error = parse_query_params(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
     try:
         shared_email = os.getenv("SHARED_EMAIL")
         shared_password = os.getenv("SHARED_PASSWORD")
@@ -321,12 +793,19 @@ def get_shared_wishlist_api() -> tuple[str, int]:
         if not shared_email or not shared_password:
             return jsonify({"error": "Shared wishlist access not configured"}), 500
 
-        result = get_wishlist(shared_email, shared_password)
+        result = _load_wishlist(shared_email, shared_password)
 
         if result.get("data"):
             result["message"] = "Shared Wishlist"
-
-        return jsonify({"message": "Got shared wishlist successfully", "result": json.dumps(result)}), 200
+        result = _query_wishlist(result, params)
+        if _wants_enrichment():
+            result = _join_comics(result)
+
+        return _wishlist_response("Got shared wishlist successfully", result)
+    except QueueItActive:
+        return _queue_it_response()
+    except Cancelled:
+        return _cancelled_response()
     except Exception as e:
         app.logger.error(f"Error getting shared wishlist: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
@@ -0,0 +1,90 @@
+"""Normalization of scraped wishlist fields into sortable values.
+
+Raw strings from the site ("12,00 €", "Erscheint am 02.10.2024") are turned
+into integer cents, ISO dates and a stable product id. The same strings
+repeat constantly across wishlists, so each parser is memoized on its input.
+"""
+import datetime
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any
+from urllib.parse import urlparse
+
+# Euros with "." thousands separators or none, then cents after "," (or "." when
+# there are no thousands groups): "1.234,99 €", "1234,99 €", "12.50 €".
+_PRICE_RE = re.compile(r"(\d{1,3}(?:\.\d{3})+(?![\d.])|\d+)(?:[,.](\d{1,2})(?!\d))?")
+_DAY_DATE_RE = re.compile(r"(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})")
+_MONTH_YEAR_RE = re.compile(r"(?<!\w)(\d{1,2})\s*/\s*(\d{4})")  # not "Q3/2024"
+_YEAR_RE = re.compile(r"\b(19|20)(\d{2})\b")
+
+_GERMAN_MONTHS = {
+    "januar": 1, "jan": 1, "februar": 2, "feb": 2, "märz": 3, "maerz": 3, "mär": 3,
+    "april": 4, "apr": 4, "mai": 5, "juni": 6, "jun": 6, "juli": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9, "oktober": 10,
+    "okt": 10, "november": 11, "nov": 11, "dezember": 12, "dez": 12,
+}
+_MONTH_NAME_RE = re.compile(r"([a-zä]+)\.?\s+(\d{4})")
+
+
+@lru_cache(maxsize=4096)
+def parse_price_cents(price: str | None) -> int | None:
+    """Parse a German price string like ``"1.234,99 €"`` into cents."""
+    if not price:
+        return None
+    match = _PRICE_RE.search(price)
+    if not match:
+        return None
+    euros = int(match.group(1).replace(".", ""))
+    cents = int((match.group(2) or "0").ljust(2, "0"))
+    return euros * 100 + cents
+
+
+@lru_cache(maxsize=4096)
+def parse_release_date(text: str | None) -> str | None:
+    """Parse a release date into ISO 8601, keeping only the precision given.
+
+    ``"15.03.2024"`` -> ``"2024-03-15"``, ``"März 2024"`` -> ``"2024-03"``,
+    ``"2025"`` -> ``"2025"``; anything unparseable -> None.
+    """
+    if not text:
+        return None
+    match = _DAY_DATE_RE.search(text)
+    if match:
+        try:
+            return datetime.date(int(match.group(3)), int(match.group(2)), int(match.group(1))).isoformat()
+        except ValueError:
+            pass  # 31.02.2024 is not a date
+    match = _MONTH_YEAR_RE.search(text)
+    if match and 1 <= int(match.group(1)) <= 12:
+        return f"{int(match.group(2)):04d}-{int(match.group(1)):02d}"
+    for name, year in _MONTH_NAME_RE.findall(text.lower()):
+        month = _GERMAN_MONTHS.get(name)
+        if month:
+            return f"{int(year):04d}-{month:02d}"
+    match = _YEAR_RE.search(text)
+    if match:
+        return match.group(1) + match.group(2)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def product_id(link: str | None) -> str:
+    """Stable product id: the Magento URL key of the product link."""
+    if not link:
+        return ""
+    path = urlparse(link.strip()).path.rstrip("/")
+    url_key = path.rsplit("/", 1)[-1].lower()
+    if url_key.endswith(".html"):
+        url_key = url_key[:-len(".html")]
+    if url_key:
+        return url_key
+    return hashlib.sha1(link.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_item(item: dict[str, Any]) -> dict[str, Any]:
+    """Add ``price_cents``, ``release_date_iso`` and ``product_id`` to a wishlist item."""
+    item["price_cents"] = parse_price_cents(item.get("price"))
+    item["release_date_iso"] = parse_release_date(item.get("release_date"))
+    item["product_id"] = product_id(item.get("link"))
+    return item
@@ -0,0 +1,215 @@
+"""Per-host pacing of outbound requests and browser navigations.
+
+Every browser navigation (browser_pool wraps ``driver.get``) and every
+http_client request takes a slot from its host's scheduler first:
+
+* a token bucket of PACING_RATE requests per second, bursting to
+  PACING_BURST, per host (PACING_RATES overrides single hosts, e.g.
+  ``{"www.panini.de": 1.5}``);
+* at most PACING_MAX_NAVIGATIONS browser navigations in flight per host;
+* background requests (thumbnail downloads) only take a token while nothing
+  else waits and PACING_BACKGROUND_RESERVE more are left for the scrapes.
+
+The rate adapts: a queue-it redirect or a 429/503 halves it (PACING_BACKOFF),
+empties the bucket and pauses the host for the Retry-After or
+PACING_COOLDOWN seconds. A navigation much slower than usual (over
+PACING_SLOW_SECONDS and three times the running average) halves it without
+a pause. Once the pause is over the rate climbs back linearly, at the
+configured rate per PACING_RECOVERY_SECONDS, up to halfway between the new
+rate and the one that was pushed back; beyond that it probes ten times more
+slowly. Only requests started after the last backoff can trigger another
+one, so a burst that is throttled as a whole backs off once. Waiting for a
+slot gives up when the request is cancelled.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+from urllib.parse import urlparse
+
+import cancellation
+
+PACING_ENABLED = os.environ.get("PACING_ENABLED", "1").lower() in ("1", "true", "yes")
+PACING_RATE = float(os.environ.get("PACING_RATE", "2"))
+PACING_BURST = float(os.environ.get("PACING_BURST", "4"))
+PACING_MAX_NAVIGATIONS = int(os.environ.get("PACING_MAX_NAVIGATIONS", "4"))
+PACING_MIN_RATE = float(os.environ.get("PACING_MIN_RATE", "0.2"))
+PACING_BACKOFF = float(os.environ.get("PACING_BACKOFF", "0.5"))
+# Seconds without pushback it takes to climb from zero back to the configured rate.
+PACING_RECOVERY_SECONDS = float(os.environ.get("PACING_RECOVERY_SECONDS", "120"))
+PACING_COOLDOWN = float(os.environ.get("PACING_COOLDOWN", "10"))
+PACING_SLOW_SECONDS = float(os.environ.get("PACING_SLOW_SECONDS", "10"))
+PACING_BACKGROUND_RESERVE = float(os.environ.get("PACING_BACKGROUND_RESERVE", "2"))
+PACING_RATES: dict[str, float] = json.loads(os.environ.get("PACING_RATES", "{}"))
+PACING_EXEMPT_HOSTS = frozenset(
+    h.strip() for h in os.environ.get("PACING_EXEMPT_HOSTS", "127.0.0.1,localhost").split(",") if h.strip()
+)
+_SLOW_FACTOR = 3
+_PROBE_SPEED = 0.1  # of the recovery speed, above the last pushed-back rate's midpoint
+
+
+class Slot:
+    """Handed to the caller for the duration of one request, to report how the host answered."""
+
+    def __init__(self) -> None:
+        self.throttled = False
+        self.retry_after: float | None = None
+
+    def throttle(self, retry_after: float | None = None) -> None:
+        self.throttled = True
+        self.retry_after = retry_after
+
+
+class HostPacer:
+    def __init__(self, host: str, rate: float = PACING_RATE, burst: float = PACING_BURST,
+                 max_navigations: int = PACING_MAX_NAVIGATIONS) -> None:
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_navigations = max_navigations
+        self._cond = threading.Condition()
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._backed_off_at = 0.0
+        self._navigations = 0
+        self._waiting = 0  # foreground requests waiting for a token
+        self._ceiling = rate  # recovery slows down above this
+        self._typical: float | None = None  # running average of navigation seconds
+        self._counts = {"requests": 0, "background": 0, "throttled": 0, "slowdowns": 0, "backoffs": 0,
+                        "waited_seconds": 0.0}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - max(self._updated, self._paused_until)
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            step = elapsed * self.max_rate / PACING_RECOVERY_SECONDS
+            self.rate = min(self.max_rate, self.rate + (step if self.rate < self._ceiling else step * _PROBE_SPEED))
+        self._updated = max(self._updated, now)
+
+    def acquire(self, navigation: bool = False, background: bool = False) -> float:
+        """Block until the host may be contacted; returns when this request started."""
+        start = time.monotonic()
+        needed = min(1 + PACING_BACKGROUND_RESERVE, self.burst) if background else 1
+        with self._cond:
+            self._waiting += int(not background)
+            try:
+                while True:
+                    cancellation.checkpoint()
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    elif navigation and self._navigations >= self.max_navigations:
+                        wait = cancellation.CANCEL_POLL_SECONDS  # until a navigation finishes
+                    elif background and self._waiting:
+                        wait = cancellation.CANCEL_POLL_SECONDS  # until the foreground requests got theirs
+                    elif self._tokens < needed:
+                        wait = (needed - self._tokens) / self.rate
+                    else:
+                        break
+                    self._cond.wait(min(wait, cancellation.CANCEL_POLL_SECONDS))
+            finally:
+                self._waiting -= int(not background)
+            self._tokens -= 1
+            self._navigations += int(navigation)
+            self._counts["requests"] += 1
+            self._counts["background"] += int(background)
+            self._counts["waited_seconds"] += now - start
+        return now
+
+    def _back_off(self, now: float, pause: float) -> None:
+        backed_off = max(PACING_MIN_RATE, self.rate * PACING_BACKOFF)
+        self._ceiling = (self.rate + backed_off) / 2
+        self.rate = backed_off
+        self._tokens = min(self._tokens, 0.0)
+        self._paused_until = max(self._paused_until, now + pause)
+        self._backed_off_at = now
+        self._counts["backoffs"] += 1
+
+    def release(self, started: float, navigation: bool, slot: Slot) -> None:
+        now = time.monotonic()
+        seconds = now - started
+        with self._cond:
+            self._navigations -= int(navigation)
+            slow = (navigation and self._typical is not None
+                    and seconds > max(PACING_SLOW_SECONDS, _SLOW_FACTOR * self._typical))
+            if slot.throttled:
+                self._counts["throttled"] += 1
+            elif slow:
+                self._counts["slowdowns"] += 1
+            elif navigation:
+                self._typical = seconds if self._typical is None else 0.8 * self._typical + 0.2 * seconds
+            if (slot.throttled or slow) and started >= self._backed_off_at:
+                pause = (slot.retry_after if slot.retry_after is not None else PACING_COOLDOWN) if slot.throttled else 0
+                self._refill(now)
+                print(f"Backing off {self.host}: {'throttled' if slot.throttled else 'slow response'}, "
+                      f"rate {self.rate:.2f}/s -> {max(PACING_MIN_RATE, self.rate * PACING_BACKOFF):.2f}/s")
+                self._back_off(now, pause)
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                **self._counts,
+                "waited_seconds": round(self._counts["waited_seconds"], 1),
+                "rate": round(self.rate, 2),
+                "max_rate": self.max_rate,
+                "tokens": round(self._tokens, 2),
+                "navigations": self._navigations,
+                "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+_lock = threading.Lock()
+_pacers: dict[str, HostPacer] = {}
+
+
+def pacer_for(host: str) -> HostPacer:
+    with _lock:
+        pacer = _pacers.get(host)
+        if pacer is None:
+            pacer = _pacers[host] = HostPacer(host, rate=float(PACING_RATES.get(host, PACING_RATE)))
+        return pacer
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None  # an HTTP date; the cooldown is close enough
+
+
+@contextlib.contextmanager
+def slot(url: str, navigation: bool = False, background: bool = False) -> Iterator[Slot]:
+    """Wait for the host's turn, then time the request made inside the block.
+
+    A ``background`` request waits for the foreground ones and leaves them a reserve of tokens.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    current = Slot()
+    if not PACING_ENABLED or not host or host in PACING_EXEMPT_HOSTS:
+        yield current
+        return
+    pacer = pacer_for(host)
+    started = pacer.acquire(navigation, background)
+    try:
+        yield current
+    finally:
+        pacer.release(started, navigation, current)
+
+
+def get_stats() -> dict[str, Any]:
+    with _lock:
+        pacers = list(_pacers.values())
+    return {"enabled": PACING_ENABLED, "hosts": {p.host: p.get_stats() for p in pacers}}
+
+
+def reset() -> None:
+    with _lock:
+        _pacers.clear()
@@ -0,0 +1,109 @@
+"""Selenium steps shared by every panini.de browser flow.
+
+Cookie consent, the Gigya login and debug dumps used to be copied into each
+scraper with small differences; they live here so a change to the site only
+needs one fix.
+"""
+import os
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import cancellation
+import profile_template
+from queue_it import check_queue_it
+
+BASE_URL = "https://www.panini.de/shp_deu_de"
+LOGIN_URL = f"{BASE_URL}/customer/account/login/"
+WISHLIST_URL = f"{BASE_URL}/wishlist/"
+SHARED_WISHLIST_URL = f"{BASE_URL}/wishlist/shared/"
+
+COOKIE_CONSENT_XPATH = "//button[contains(text(), 'Nur technische Cookies verwenden')]"
+LOGGED_IN_XPATH = "//*[contains(text(),'Mein Konto')]"
+
+DEBUG_DIR = os.environ.get("SELENIUM_DEBUG_DIR", "")
+
+
+def click_cookie_consent(driver: webdriver.Chrome, timeout: float = 5) -> bool:
+    """Accept technical cookies only. Returns False when no banner showed up.
+
+    A browser started from a profile template with the consent given only
+    gets one look for the banner instead of a wait.
+    """
+    consented = profile_template.has_consent(driver)
+    try:
+        WebDriverWait(driver, 0 if consented else timeout).until(
+            EC.element_to_be_clickable((By.XPATH, COOKIE_CONSENT_XPATH))).click()
+    except Exception:
+        cancellation.checkpoint()
+        if not consented:
+            print("No cookie consent button found, continuing")
+        return False
+    if consented:
+        profile_template.consent_missing(driver)
+    print("Clicked cookie consent button")
+    return True
+
+
+def gigya_login(driver: webdriver.Chrome, email: str, password: str) -> None:
+    """Log in through the Gigya form on the current page; raises if it does not succeed."""
+    check_queue_it(driver)
+    click_cookie_consent(driver)
+
+    print("Filling Gigya login form...")
+    username_fields = WebDriverWait(driver, 20).until(
+        lambda d: [el for el in d.find_elements(By.CSS_SELECTOR, "input.gigya-input-text[name='username']") if el.is_displayed()]
+    )
+    username_fields[0].send_keys(email)
+
+    password_fields = WebDriverWait(driver, 10).until(
+        lambda d: [el for el in d.find_elements(By.CSS_SELECTOR, "input.gigya-input-password[name='password']") if el.is_displayed()]
+    )
+    password_fields[0].send_keys(password)
+
+    submit_buttons = driver.find_elements(By.CSS_SELECTOR, "input.gigya-input-submit[type='submit']")
+    visible_buttons = [b for b in submit_buttons if b.is_displayed()]
+    if not visible_buttons:
+        save_debug_info(driver, "no_visible_submit")
+        raise Exception("No visible submit button found")
+    driver.execute_script("arguments[0].click();", visible_buttons[0])
+
+    print("Waiting for login to complete...")
+    try:
+        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.XPATH, LOGGED_IN_XPATH)))
+    except Exception:
+        save_debug_info(driver, "login_verification_failed")
+        raise
+    print("Login successful")
+
+
+def open_and_login(driver: webdriver.Chrome, email: str, password: str) -> None:
+    """Navigate to the login page and log in."""
+    print("Navigating to login page...")
+    driver.get(LOGIN_URL)
+    cancellation.checkpoint()
+    gigya_login(driver, email, password)
+
+
+def save_debug_info(driver: webdriver.Chrome, label: str) -> None:
+    """Save screenshot and page source for debugging (only if SELENIUM_DEBUG_DIR is set)."""
+    if not DEBUG_DIR:
+        return
+    os.makedirs(DEBUG_DIR, exist_ok=True)
+    try:
+        path = os.path.join(DEBUG_DIR, f"{label}_screenshot.png")
+        driver.save_screenshot(path)
+        print(f"Debug screenshot saved to {path}")
+    except Exception:
+        pass
+    try:
+        path = os.path.join(DEBUG_DIR, f"{label}_source.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
+        print(f"Debug page source saved to {path}")
+    except Exception:
+        pass
+    print(f"Current URL: {driver.current_url}")
+    print(f"Page title: {driver.title}")
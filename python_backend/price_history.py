@@ -0,0 +1,194 @@
+"""Append-only price history for comics seen by the scrapers.
+
+Every observation is a fixed 13-byte record (url id, unix timestamp, price in
+cents, availability) appended to ``points.bin``; URLs are interned once in
+``urls.txt`` where the line number is the url id. In memory the columns live
+in ``array`` buffers plus a per-url row index, so millions of points stay
+cheap. A point is only written when the price or availability changed, or
+when the last point for that URL is older than PRICE_HISTORY_MIN_INTERVAL.
+
+Every gunicorn worker has its own store on the same files. Writers take an
+exclusive lock on ``.lock`` and first read what the other workers appended,
+so url ids stay line numbers; readers pick up new lines and records as well.
+"""
+import contextlib
+import fcntl
+import os
+import struct
+import threading
+import time
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+from normalize import parse_price_cents
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+PRICE_HISTORY_DIR = os.environ.get("PRICE_HISTORY_DIR", os.path.join(_HERE, "data", "price_history"))
+PRICE_HISTORY_MIN_INTERVAL = int(os.environ.get("PRICE_HISTORY_MIN_INTERVAL", "21600"))  # 6 hours
+
+RECORD = struct.Struct("<IIiB")
+NO_PRICE = -1
+_SECONDS_PER_DAY = 86400
+
+
+def canonical_url(url: str) -> str:
+    return url.strip().lower().split("#")[0].split("?")[0].rstrip("/")
+
+
+class PriceHistoryStore:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._urls: list[str] = []
+        self._url_ids: dict[str, int] = {}
+        self._url_col = array("I")
+        self._ts_col = array("I")
+        self._price_col = array("i")
+        self._avail_col = array("B")
+        self._rows_by_url: dict[int, array] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._urls_path = os.path.join(directory, "urls.txt")
+        self._points_path = os.path.join(directory, "points.bin")
+        self._lock_path = os.path.join(directory, ".lock")
+        self._urls_read = 0
+        self._points_read = 0
+        with self._lock:
+            self._sync()
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def _sync(self) -> None:
+        """Read the urls and points appended since the last sync, by this process or another."""
+        with contextlib.suppress(FileNotFoundError), open(self._urls_path, "rb") as f:
+            f.seek(self._urls_read)
+            data = f.read()
+            complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+            for line in data[:complete].decode("utf-8").split("\n")[:-1]:
+                self._url_ids[line] = len(self._urls)
+                self._urls.append(line)
+            self._urls_read += complete
+        with contextlib.suppress(FileNotFoundError), open(self._points_path, "rb") as f:
+            f.seek(self._points_read)
+            data = f.read()
+            usable = len(data) - len(data) % RECORD.size
+            for url_id, ts, price, available in RECORD.iter_unpack(data[:usable]):
+                self._append_row(url_id, ts, price, available)
+            self._points_read += usable
+
+    def _intern(self, url: str) -> int:
+        """The id of ``url``, appending it to urls.txt if new; call with the file lock held after a sync."""
+        url_id = self._url_ids.get(url)
+        if url_id is not None:
+            return url_id
+        line = (url + "\n").encode("utf-8")
+        with open(self._urls_path, "ab") as f:
+            f.truncate(self._urls_read)  # drop a torn line left by a crashed writer
+            f.write(line)
+        self._urls_read += len(line)
+        url_id = len(self._urls)
+        self._urls.append(url)
+        self._url_ids[url] = url_id
+        return url_id
+
+    def _append_row(self, url_id: int, ts: int, price: int, available: int) -> None:
+        self._rows_by_url.setdefault(url_id, array("I")).append(len(self._ts_col))
+        self._url_col.append(url_id)
+        self._ts_col.append(ts)
+        self._price_col.append(price)
+        self._avail_col.append(available)
+
+    def record(self, url: str, price_cents: int | None, available: bool | None = None,
+               timestamp: float | None = None) -> bool:
+        """Record an observation. Returns False when it was deduplicated."""
+        url = canonical_url(url)
+        if not url:
+            return False
+        ts = int(timestamp if timestamp is not None else time.time())
+        price = NO_PRICE if price_cents is None else price_cents
+        avail = int(available if available is not None else price_cents is not None)
+        with self._lock, self._file_lock():
+            self._sync()
+            url_id = self._intern(url)
+            rows = self._rows_by_url.get(url_id)
+            if rows:
+                last = rows[-1]
+                if (self._price_col[last] == price and self._avail_col[last] == avail
+                        and ts - self._ts_col[last] < PRICE_HISTORY_MIN_INTERVAL):
+                    return False
+            with open(self._points_path, "ab") as f:
+                f.truncate(self._points_read)  # drop a torn record left by a crashed writer
+                f.write(RECORD.pack(url_id, ts, price, avail))
+            self._points_read += RECORD.size
+            self._append_row(url_id, ts, price, avail)
+            return True
+
+    def query(self, url: str, start: float | None = None, end: float | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            url_id = self._url_ids.get(canonical_url(url))
+            if url_id is None:
+                return []
+            points = []
+            for row in self._rows_by_url.get(url_id, ()):
+                ts = self._ts_col[row]
+                if (start is not None and ts < start) or (end is not None and ts > end):
+                    continue
+                price = self._price_col[row]
+                points.append({
+                    "timestamp": ts,
+                    "price_cents": None if price == NO_PRICE else price,
+                    "available": bool(self._avail_col[row]),
+                })
+            return points
+
+    def daily(self, url: str, start: float | None = None, end: float | None = None) -> list[dict[str, Any]]:
+        """Min/max/last price per UTC day, ignoring points without a price."""
+        days: dict[int, dict[str, Any]] = {}
+        for point in self.query(url, start, end):
+            price = point["price_cents"]
+            if price is None:
+                continue
+            day = point["timestamp"] // _SECONDS_PER_DAY * _SECONDS_PER_DAY
+            bucket = days.get(day)
+            if bucket is None:
+                days[day] = {"day": time.strftime("%Y-%m-%d", time.gmtime(day)), "min_cents": price,
+                             "max_cents": price, "last_cents": price, "points": 1}
+                continue
+            bucket["min_cents"] = min(bucket["min_cents"], price)
+            bucket["max_cents"] = max(bucket["max_cents"], price)
+            bucket["last_cents"] = price
+            bucket["points"] += 1
+        return [days[day] for day in sorted(days)]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._sync()
+            return {"urls": len(self._urls), "points": len(self._ts_col),
+                    "bytes_on_disk": len(self._ts_col) * RECORD.size}
+
+
+_store: PriceHistoryStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PriceHistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceHistoryStore(PRICE_HISTORY_DIR)
+        return _store
+
+
+def observe(url: str, price: str | None) -> None:
+    """Record a scraped price string; never raises into the scraper."""
+    try:
+        if url:
+            get_store().record(url, parse_price_cents(price))
+    except Exception as e:
+        print(f"Failed to record price history for {url}: {e}")
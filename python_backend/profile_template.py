@@ -0,0 +1,286 @@
+"""Chrome profile template with the cookie consent already given.
+
+Every scrape used to wait up to ten seconds for panini.de's cookie banner
+("Nur technische Cookies verwenden"). Instead, one browser builds a profile
+template: it opens the shop, clicks the banner and quits. That leaves the
+consent, and an HTTP cache warm with the Gigya SDK and Magento bundles, in
+its user data directory. Only the cookies the consent click set are kept,
+and the site storage (local and session storage, IndexedDB, service workers)
+is deleted with the rest of the client state: the shop's guest session and
+Gigya's device ids must not be shared between sessions. Only the HTTP cache
+stays warm.
+
+browser_pool starts every Chrome on its own copy of the template (a reflink
+copy where the filesystem supports it), and click_cookie_consent only takes
+a quick look for the banner in such a browser. If the banner shows up
+anyway, the consent has expired or changed; browsers wait for it again
+until the template is rebuilt.
+
+The template is built by the gunicorn warm-up, or in the background by the
+first launch that finds none, and rebuilt after PROFILE_TEMPLATE_MAX_AGE
+seconds. PROFILE_TEMPLATE_ENABLED=0 turns it off.
+"""
+import contextlib
+import glob
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+from typing import Any
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE_TEMPLATE_ENABLED = os.environ.get("PROFILE_TEMPLATE_ENABLED", "1").lower() in ("1", "true", "yes")
+PROFILE_TEMPLATE_DIR = os.environ.get("PROFILE_TEMPLATE_DIR", os.path.join(_HERE, "data", "chrome_profile"))
+# Where the per-browser copies go; the system temp directory by default.
+PROFILE_CLONE_DIR = os.environ.get("PROFILE_CLONE_DIR", "") or None
+PROFILE_TEMPLATE_MAX_AGE = float(os.environ.get("PROFILE_TEMPLATE_MAX_AGE", "86400"))
+PROFILE_TEMPLATE_CONSENT_TIMEOUT = float(os.environ.get("PROFILE_TEMPLATE_CONSENT_TIMEOUT", "15"))
+_RETRY_SECONDS = 300
+# Profile parts that are per-process or only grow the copy, then the site and
+# session state that would make clones share an identity.
+_DROPPED = ("Singleton*", "Crashpad", "ShaderCache", "GrShaderCache", "GraphiteDawnCache", "component_crx_cache",
+            "Local Storage", "Session Storage", "IndexedDB", "Service Worker", "WebStorage", "File System",
+            "databases", "blob_storage", "shared_proto_db", "Shared Dictionary", "SharedStorage*", "Sessions",
+            "Current Session", "Current Tabs", "Last Session", "Last Tabs")
+
+_lock = threading.Lock()
+_template: dict[str, Any] | None = None
+_building = False
+_failed_at = 0.0
+_consented: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_counts = {"built": 0, "build_failures": 0, "clones": 0, "clone_seconds": 0.0, "banner_skipped": 0,
+           "banner_seen": 0}
+
+
+def _marker_path(directory: str | None = None) -> str:
+    return os.path.join(directory or PROFILE_TEMPLATE_DIR, "template.json")
+
+
+def template() -> dict[str, Any] | None:
+    """The current template's metadata ("built_at", "consent", "cookies"), or None if there is no fresh one."""
+    global _template
+    with _lock:
+        current = _template
+    if current is None or time.time() - current["built_at"] > PROFILE_TEMPLATE_MAX_AGE:
+        try:
+            with open(_marker_path(), encoding="utf-8") as f:
+                current = json.load(f)  # possibly rebuilt by another worker
+        except (OSError, ValueError):
+            return None
+        if time.time() - current.get("built_at", 0) > PROFILE_TEMPLATE_MAX_AGE:
+            return None
+        with _lock:
+            _template = current
+    return current
+
+
+def _cookies(driver: Any) -> list[dict[str, Any]]:
+    return driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+
+
+def _settable(cookie: dict[str, Any]) -> dict[str, Any]:
+    """A Network.getAllCookies entry as a Network.setCookies parameter."""
+    fields = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+    param = {field: cookie[field] for field in fields if field in cookie}
+    if not cookie.get("session") and "expires" in cookie:
+        param["expires"] = cookie["expires"]
+    return param
+
+
+def _give_consent(driver: Any) -> tuple[bool, list[str]]:
+    """Click the banner and keep only the cookies that the click set."""
+    from panini_session import click_cookie_consent
+
+    before = {(c["name"], c["domain"], c["path"]): c["value"] for c in _cookies(driver)}
+    consent = click_cookie_consent(driver, timeout=PROFILE_TEMPLATE_CONSENT_TIMEOUT)
+    kept: list[dict[str, Any]] = []
+    deadline = time.monotonic() + 5
+    while consent and not kept and time.monotonic() < deadline:
+        time.sleep(0.5)
+        kept = [c for c in _cookies(driver) if before.get((c["name"], c["domain"], c["path"])) != c["value"]]
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    if kept:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": [_settable(c) for c in kept]})
+    return consent, sorted({c["name"] for c in kept})
+
+
+def build() -> bool:
+    """Build a fresh template with one browser session; False if that failed."""
+    global _template, _failed_at
+    from selenium import webdriver
+
+    import pacing
+    from chrome_options import get_chrome_options
+    from panini_session import BASE_URL
+    from queue_it import is_queue_it_url
+
+    build_dir = f"{PROFILE_TEMPLATE_DIR}.build-{os.getpid()}"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    profile = os.path.join(build_dir, "profile")
+    start = time.monotonic()
+    try:
+        driver = webdriver.Chrome(options=get_chrome_options(user_data_dir=profile))
+        try:
+            driver.set_page_load_timeout(30)
+            with pacing.slot(BASE_URL, navigation=True) as slot:
+                driver.get(BASE_URL)
+                if is_queue_it_url(driver.current_url):
+                    slot.throttle()
+                    raise RuntimeError("the shop is queueing visitors")
+            consent, cookies = _give_consent(driver)
+        finally:
+            with contextlib.suppress(Exception):
+                driver.quit()
+        _strip(profile)
+        marker = {"built_at": time.time(), "consent": consent, "cookies": cookies}
+        with open(_marker_path(build_dir), "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+        _swap_in(build_dir)
+    except Exception as e:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        print(f"Could not build the Chrome profile template: {e}")
+        with _lock:
+            _counts["build_failures"] += 1
+            _failed_at = time.monotonic()
+        return False
+    print(f"Built the Chrome profile template in {time.monotonic() - start:.1f}s "
+          f"(consent: {consent}, kept cookies: {', '.join(cookies) or 'none'})")
+    with _lock:
+        _template = marker
+        _counts["built"] += 1
+    return True
+
+
+def _strip(profile: str) -> None:
+    """Delete the _DROPPED parts from a user data directory and its profiles."""
+    for pattern in _DROPPED:
+        for path in glob.glob(os.path.join(profile, pattern)) + glob.glob(os.path.join(profile, "*", pattern)):
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+
+def _swap_in(build_dir: str) -> None:
+    old_dir = f"{PROFILE_TEMPLATE_DIR}.old-{os.getpid()}"
+    with contextlib.suppress(FileNotFoundError):
+        os.rename(PROFILE_TEMPLATE_DIR, old_dir)
+    try:
+        os.rename(build_dir, PROFILE_TEMPLATE_DIR)
+    except OSError:
+        shutil.rmtree(build_dir, ignore_errors=True)  # another worker's template got there first
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def ensure() -> bool:
+    """Build the template now unless a fresh one exists; True if there is one afterwards."""
+    if not PROFILE_TEMPLATE_ENABLED:
+        return False
+    return template() is not None or build()
+
+
+def _build_in_background() -> None:
+    global _building
+    with _lock:
+        if _building or (_failed_at and time.monotonic() - _failed_at < _RETRY_SECONDS):
+            return
+        _building = True
+
+    def run() -> None:
+        global _building
+        try:
+            build()
+        finally:
+            with _lock:
+                _building = False
+
+    threading.Thread(target=run, name="profile-template", daemon=True).start()
+
+
+def _copy(source: str, target: str) -> None:
+    try:
+        # GNU cp clones the files copy-on-write where the filesystem can (btrfs, XFS, overlayfs on those).
+        subprocess.run(["cp", "-a", "--reflink=auto", f"{source}/.", target], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        shutil.copytree(source, target, symlinks=True, dirs_exist_ok=True)
+
+
+def clone() -> str | None:
+    """A private copy of the template for one browser; None (and a build is started) if there is none yet."""
+    if not PROFILE_TEMPLATE_ENABLED:
+        return None
+    if template() is None:
+        _build_in_background()
+        return None
+    start = time.monotonic()
+    target = tempfile.mkdtemp(prefix="chrome-profile-", dir=PROFILE_CLONE_DIR)
+    try:
+        _copy(os.path.join(PROFILE_TEMPLATE_DIR, "profile"), target)
+    except OSError as e:
+        print(f"Could not copy the Chrome profile template: {e}")
+        shutil.rmtree(target, ignore_errors=True)
+        return None
+    with _lock:
+        _counts["clones"] += 1
+        _counts["clone_seconds"] += time.monotonic() - start
+    return target
+
+
+def remove_clone(path: str | None) -> None:
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def started(driver: Any) -> None:
+    """Note that ``driver`` runs on a clone, so it has the consent if the template does."""
+    current = template()
+    if current is not None and current.get("consent"):
+        _consented.add(driver)
+
+
+def has_consent(driver: Any) -> bool:
+    """Whether ``driver`` started with the consent given, so the banner should not show."""
+    if driver not in _consented:
+        return False
+    with _lock:
+        _counts["banner_skipped"] += 1
+    return True
+
+
+def consent_missing(driver: Any) -> None:
+    """The banner showed up in a browser that should have had the consent: stop relying on it."""
+    global _template
+    _consented.discard(driver)
+    with _lock:
+        _counts["banner_seen"] += 1
+        if _template is not None:
+            _template = {**_template, "consent": False}
+            marker = _template
+        else:
+            marker = None
+    if marker is not None:
+        print("Cookie banner showed up despite the profile template's consent; waiting for it again")
+        with contextlib.suppress(OSError), open(_marker_path(), "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+
+
+def get_stats() -> dict[str, Any]:
+    current = template() if PROFILE_TEMPLATE_ENABLED else None
+    with _lock:
+        counts = dict(_counts)
+        building = _building
+    clones = counts.pop("clone_seconds")
+    return {
+        **counts,
+        "enabled": PROFILE_TEMPLATE_ENABLED,
+        "building": building,
+        "consent": bool(current and current.get("consent")),
+        "age_seconds": round(time.time() - current["built_at"]) if current else None,
+        "avg_clone_ms": round(clones / counts["clones"] * 1000, 1) if counts["clones"] else None,
+    }
@@ -0,0 +1,141 @@
+"""Backend-wide admission control for Panini's queue-it.net waiting room.
+
+Once any browser session is redirected to queue-it, the whole site is treated
+as queued: a single probe session waits inside the waiting room while every
+other scrape request is parked here before it launches Chrome.
+"""
+import os
+import threading
+import time
+from typing import Any
+
+import cancellation
+
+QUEUE_IT_HOST = "queue-it.net"
+PROBE_TIMEOUT = int(os.environ.get("QUEUE_IT_PROBE_TIMEOUT", "120"))
+PARK_TIMEOUT = int(os.environ.get("QUEUE_IT_PARK_TIMEOUT", "30"))
+RETRY_AFTER_SECONDS = int(os.environ.get("QUEUE_IT_RETRY_AFTER", "30"))
+
+
+class QueueItActive(Exception):
+    """Raised when a scrape cannot proceed because the site is queued."""
+
+
+_condition = threading.Condition()
+_active = False
+_since: float | None = None
+_last_cleared: float | None = None
+_probe_owner: int | None = None
+_parked = 0
+
+
+def is_queue_it_url(url: str) -> bool:
+    return QUEUE_IT_HOST in url
+
+
+def get_status() -> dict[str, Any]:
+    with _condition:
+        return {
+            "active": _active,
+            "since": _since,
+            "last_cleared": _last_cleared,
+            "probe_running": _probe_owner is not None,
+            "parked": _parked,
+            "retry_after": RETRY_AFTER_SECONDS if _active else 0,
+        }
+
+
+def _mark_cleared() -> None:
+    global _active, _since, _last_cleared, _probe_owner
+    with _condition:
+        if _active:
+            print("queue-it cleared, releasing parked requests")
+            _last_cleared = time.time()
+        _active = False
+        _since = None
+        _probe_owner = None
+        _condition.notify_all()
+
+
+def release_admission() -> None:
+    """Give up the probe role, if held, once a browser session ends."""
+    global _probe_owner
+    with _condition:
+        if _probe_owner == threading.get_ident():
+            _probe_owner = None
+            _condition.notify_all()
+
+
+def wait_for_admission(timeout: float = PARK_TIMEOUT) -> None:
+    """Park the calling request while the site is queued.
+
+    Returns as soon as the site is clear, or when this request is chosen to be
+    the single probe session. Raises QueueItActive if neither happens within
+    ``timeout`` seconds, and Cancelled as soon as the request is cancelled.
+    """
+    global _probe_owner, _parked
+    me = threading.get_ident()
+    deadline = time.monotonic() + timeout
+    waiter = object()
+    cancellation.on_cancel(waiter, _wake_parked)
+    with _condition:
+        _parked += 1
+        try:
+            while _active:
+                cancellation.checkpoint()
+                if _probe_owner is None or _probe_owner == me:
+                    _probe_owner = me
+                    print("Site is queued, this request becomes the queue-it probe")
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QueueItActive("Panini is currently queued (queue-it)")
+                _condition.wait(remaining)
+        finally:
+            _parked -= 1
+            cancellation.discard(waiter)
+
+
+def _wake_parked() -> None:
+    with _condition:
+        _condition.notify_all()
+
+
+def check_queue_it(driver: Any) -> None:
+    """Inspect the driver after a navigation and update the shared queue state.
+
+    The probe session waits up to PROBE_TIMEOUT for the waiting room to let it
+    through; any other session that lands in queue-it gives up immediately.
+    """
+    global _active, _since, _probe_owner
+    if not is_queue_it_url(driver.current_url):
+        if _active and _probe_owner == threading.get_ident():
+            _mark_cleared()
+        return
+
+    me = threading.get_ident()
+    with _condition:
+        if not _active:
+            print("Redirected to queue-it, marking site as queued")
+            _active = True
+            _since = time.time()
+        if _probe_owner is None:
+            _probe_owner = me
+        is_probe = _probe_owner == me
+
+    if not is_probe:
+        raise QueueItActive("Redirected to queue-it while another probe is waiting")
+
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    print("Waiting inside queue-it as the probe session...")
+    try:
+        WebDriverWait(driver, PROBE_TIMEOUT).until(
+            lambda d: not is_queue_it_url(d.current_url)
+        )
+    except Exception as e:
+        release_admission()
+        cancellation.checkpoint()
+        raise QueueItActive("Still queued after probe timeout") from e
+    print("Left queue-it, continuing")
+    _mark_cleared()
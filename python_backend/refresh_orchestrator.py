@@ -0,0 +1,204 @@
+"""Batch wishlist refresh for many accounts.
+
+Takes encrypted (email, password) pairs as stored in the ``accountData``
+table, decrypts the whole batch with ``batch_crypto.decrypt_many`` and runs
+``get_wishlist`` across a bounded number of concurrent browsers. Accounts are served round-robin
+(retries go to the back of the line), every start is jittered, and each
+finished account is checkpointed so an interrupted run can be resumed; a resumed
+run tries the failed accounts again.
+
+    python refresh_orchestrator.py accounts.json --output refresh_out --browsers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from batch_crypto import decrypt_many
+from queue_it import QueueItActive
+
+DEFAULT_BROWSERS = int(os.environ.get("REFRESH_BROWSERS", "4"))
+DEFAULT_JITTER_SECONDS = float(os.environ.get("REFRESH_JITTER_SECONDS", "2"))
+DEFAULT_RETRIES = int(os.environ.get("REFRESH_RETRIES", "1"))
+
+
+def account_id(account: dict[str, Any]) -> str:
+    if account.get("id"):
+        return str(account["id"])
+    return hashlib.sha256(account["email"].encode("utf-8")).hexdigest()[:16]
+
+
+def load_accounts(path: str) -> list[dict[str, Any]]:
+    """Read accounts from a JSON array or a JSON-lines file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class Checkpoint:
+    """Append-only JSON-lines log of account outcomes.
+
+    ``done`` holds the accounts a resumed run skips: the ones that were
+    refreshed or whose credentials cannot be decrypted. Failed accounts are
+    logged too, but tried again.
+    """
+
+    FINAL = ("ok", "invalid")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get("status", "ok") in self.FINAL:
+                            self.done.add(entry["id"])
+                    except (ValueError, KeyError, AttributeError):
+                        continue
+
+    def mark(self, acc_id: str, status: str) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": acc_id, "status": status, "at": time.time()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if status in self.FINAL:
+                self.done.add(acc_id)
+
+
+class DirectorySink:
+    """Writes one ``<account id>.json`` file per refreshed account."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, acc_id: str, result: dict[str, Any]) -> None:
+        # The scrapers' messages name the account's email address; keep it out of the files.
+        result = {**result, "message": f"Wishlist for account {acc_id}"}
+        path = os.path.join(self.directory, f"{acc_id}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def _default_scrape(email: str, password: str) -> dict[str, Any]:
+    from scraper_backend import get_wishlist
+
+    return get_wishlist(email, password)
+
+
+def _is_failure(result: dict[str, Any]) -> bool:
+    return bool(result.get("error") or result.get("login_failed"))
+
+
+def refresh_accounts(
+    accounts: list[dict[str, Any]],
+    sink: DirectorySink,
+    checkpoint: Checkpoint,
+    browsers: int = DEFAULT_BROWSERS,
+    jitter: float = DEFAULT_JITTER_SECONDS,
+    retries: int = DEFAULT_RETRIES,
+    scrape: Callable[[str, str], dict[str, Any]] = _default_scrape,
+) -> dict[str, int]:
+    """Refresh every account not already in ``checkpoint``. Returns status counts."""
+    browsers = max(browsers, 1)
+    counts = {"ok": 0, "failed": 0, "skipped": 0, "invalid": 0}
+    todo: list[tuple[str, dict[str, Any]]] = []
+    seen: set[str] = set()
+    for account in accounts:
+        acc_id = account_id(account)
+        if acc_id in seen:
+            continue
+        seen.add(acc_id)
+        if acc_id in checkpoint.done:
+            counts["skipped"] += 1
+            continue
+        todo.append((acc_id, account))
+
+    # Decrypt the whole batch with one key object; invalid pairs come back as None.
+    tokens = [token for _, account in todo for token in (account.get("email", ""), account.get("password", ""))]
+    plaintexts = decrypt_many(tokens, errors="none")
+    pending: deque[tuple[str, tuple[str, str], int]] = deque()
+    for index, (acc_id, _) in enumerate(todo):
+        email, password = plaintexts[2 * index], plaintexts[2 * index + 1]
+        if not email or not password:
+            print(f"Skipping account {acc_id}: cannot decrypt credentials")
+            checkpoint.mark(acc_id, "invalid")
+            counts["invalid"] += 1
+            continue
+        pending.append((acc_id, (email, password), 0))
+
+    def run(credentials: tuple[str, str]) -> dict[str, Any]:
+        if jitter > 0:
+            time.sleep(random.uniform(0, jitter))
+        return scrape(*credentials)
+
+    in_flight: dict[Future[dict[str, Any]], tuple[str, tuple[str, str], int]] = {}
+    with ThreadPoolExecutor(max_workers=browsers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < browsers:
+                acc_id, credentials, attempt = pending.popleft()
+                in_flight[executor.submit(run, credentials)] = (acc_id, credentials, attempt)
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                acc_id, credentials, attempt = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except QueueItActive:
+                    result = {"message": "Failed: site is queued", "data": [], "error": True}
+                except Exception as e:
+                    print(f"Refresh of account {acc_id} raised: {e}")
+                    result = {"message": f"Failed: {e}", "data": [], "error": True}
+
+                # The same password fails the same way again; only retry other failures.
+                if _is_failure(result) and not result.get("login_failed") and attempt < retries:
+                    pending.append((acc_id, credentials, attempt + 1))
+                    continue
+
+                status = "failed" if _is_failure(result) else "ok"
+                sink.write(acc_id, {"id": acc_id, "status": status, "refreshed_at": time.time(), **result})
+                checkpoint.mark(acc_id, status)
+                counts[status] += 1
+                print(f"Account {acc_id}: {status} ({len(result.get('data', []))} items)")
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accounts", help="JSON or JSON-lines file of {id, email, password} (encrypted)")
+    parser.add_argument("--output", default="refresh_output", help="directory for per-account results")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>/checkpoint.jsonl)")
+    parser.add_argument("--browsers", type=int, default=DEFAULT_BROWSERS, help="concurrent browser sessions")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER_SECONDS, help="max random delay before each scrape")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries per failed account")
+    args = parser.parse_args(argv)
+
+    sink = DirectorySink(args.output)
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(args.output, "checkpoint.jsonl"))
+    start = time.perf_counter()
+    counts = refresh_accounts(
+        load_accounts(args.accounts), sink, checkpoint,
+        browsers=args.browsers, jitter=args.jitter, retries=args.retries,
+    )
+    print(f"Refresh finished in {time.perf_counter() - start:.1f}s: {counts}")
+    return 0 if counts["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Content negotiation for large API responses.
+
+``compress`` applies gzip, or brotli when the ``brotli`` package is installed,
+depending on what the client accepts. ``packb`` encodes a payload as
+MessagePack when the ``msgpack`` package is installed. Neither package is
+required: without them responses simply stay gzip/JSON.
+"""
+import gzip
+import os
+from typing import Any
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_MIMETYPES = frozenset({"application/json", "application/msgpack", "text/plain"})
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+def supported_encodings() -> list[str]:
+    """Content codings this process can produce, preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def packb(payload: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(payload, use_bin_type=True)
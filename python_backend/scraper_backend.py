@@ -0,0 +1,357 @@
+"""One entry point per scraping operation, served by interchangeable backends.
+
+* ``selenium`` - headless Chrome, the only backend that can log in
+* ``http``     - plain pooled HTTP plus the same HTML parsers, for public pages
+* ``fixture``  - replays saved HTML from SCRAPER_FIXTURES_DIR, for development
+  and load tests without touching panini.de
+* ``api``      - the Magento storefront GraphQL API (magento_api), product
+  lookups only, batched by ``get_information_many``
+
+The backend for each operation comes from ``SCRAPER_BACKEND_<OPERATION>``
+(e.g. ``SCRAPER_BACKEND_GET_INFORMATION=http``), falling back to
+``SCRAPER_BACKEND`` and then ``selenium``. A backend that cannot serve a call
+(the HTTP backend has no login) hands it to Selenium. Every call is timed and
+its outcome recorded per backend and operation; ``get_stats()`` backs the
+``/scraper_stats`` endpoint. Cancelled calls are left out of the stats; they
+say nothing about the backend.
+"""
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import fingerprint
+import price_history
+from cancellation import Cancelled
+
+OPERATIONS = ("get_information", "get_wishlist", "handle_login", "send_wishlist")
+STATS_WINDOW = int(os.environ.get("SCRAPER_STATS_WINDOW", "200"))
+SCRAPER_FIXTURES_DIR = os.environ.get(
+    "SCRAPER_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+)
+
+
+class BackendUnsupported(Exception):
+    """The backend cannot perform this operation; the caller falls back to Selenium."""
+
+
+class SeleniumBackend:
+    name = "selenium"
+
+    def get_information(self, url: str) -> dict[str, str]:
+        from get_comic_information import get_information
+
+        return get_information(url)
+
+    def iter_wishlist(self, email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+        from get_wishlist import iter_wishlist
+
+        return iter_wishlist(email, password)
+
+    def handle_login(self, email: str, password: str, keep_session: bool = False) -> str:
+        from test_account import handle_login
+
+        return handle_login(email, password, keep_session)
+
+    def send_wishlist(self, email: str, password: str) -> str:
+        from send_wishlist import send_wishlist
+
+        return send_wishlist(email, password)
+
+
+class HttpBackend:
+    """Fetches public pages with http_client and parses them like the browser path."""
+
+    name = "http"
+
+    def _fetch(self, url: str) -> tuple[str, bool]:
+        """The page's HTML, and False when the server answered 304 Not Modified."""
+        import http_client
+
+        status, body, changed = http_client.conditional_get(url)
+        if status != 200:
+            raise OSError(f"GET {url} returned HTTP {status}")
+        return body.decode("utf-8", errors="replace"), changed
+
+    def _parse_product(self, html: str, url: str, changed: bool = True) -> dict[str, str]:
+        from get_comic_information import parse_product_html
+
+        if not changed:
+            unchanged = fingerprint.last(f"product_{self.name}", url)
+            if unchanged is not None:
+                return unchanged
+        page_fingerprint = fingerprint.compute(html)
+        unchanged = fingerprint.lookup(f"product_{self.name}", url, page_fingerprint)
+        if unchanged is not None:
+            return unchanged
+        data = parse_product_html(html, url)
+        if data["price"] != "Price unavailable":
+            price_history.observe(url, data["price"])
+            fingerprint.remember(f"product_{self.name}", url, page_fingerprint, data)
+        return data
+
+    def get_information(self, url: str) -> dict[str, str]:
+        try:
+            html, changed = self._fetch(url)
+            return self._parse_product(html, url, changed)
+        except Exception as e:
+            print(f"Error fetching {url} over HTTP: {e}")
+            return {"error": f"Failed to fetch comic information: {e}"}
+
+    def iter_wishlist(self, email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+        if password:
+            raise BackendUnsupported("HTTP backend cannot log in")
+        from get_wishlist import iter_wishlist_page
+        from panini_session import SHARED_WISHLIST_URL
+
+        def events() -> Iterator[dict[str, Any]]:
+            try:
+                html, _ = self._fetch(SHARED_WISHLIST_URL)  # the parser's own fingerprint skips unchanged lists
+                yield {"event": "page_loaded"}
+                yield from iter_wishlist_page(email, lambda: html, html)
+            except Exception as e:
+                print(f"Error getting wishlist over HTTP: {e}")
+                yield {"event": "done", "message": "Failed to get wishlist. Please try again later.", "error": True}
+        return events()
+
+    def handle_login(self, email: str, password: str, keep_session: bool = False) -> str:
+        raise BackendUnsupported("HTTP backend cannot log in")
+
+    def send_wishlist(self, email: str, password: str) -> str:
+        raise BackendUnsupported("HTTP backend cannot log in")
+
+
+class FixtureBackend(HttpBackend):
+    """Replays ``wishlist.html`` and ``<url key>.html`` (or ``product.html``) from a directory."""
+
+    name = "fixture"
+
+    def __init__(self, directory: str = SCRAPER_FIXTURES_DIR) -> None:
+        self.directory = directory
+
+    def _fetch(self, url: str) -> tuple[str, bool]:
+        from normalize import product_id
+        from panini_session import SHARED_WISHLIST_URL
+
+        if url == SHARED_WISHLIST_URL:
+            candidates = ["wishlist.html"]
+        else:
+            candidates = [f"{product_id(url)}.html", "product.html"]
+        for name in candidates:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read(), True
+        raise FileNotFoundError(f"No fixture for {url} in {self.directory}")
+
+    def iter_wishlist(self, email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+        events = super().iter_wishlist(email, None)
+        if not password:
+            return events
+
+        def logged_in_first() -> Iterator[dict[str, Any]]:
+            yield {"event": "logged_in"}
+            yield from events
+        return logged_in_first()
+
+    def handle_login(self, email: str, password: str, keep_session: bool = False) -> str:
+        return "Login successful"
+
+    def send_wishlist(self, email: str, password: str) -> str:
+        return "Wishlist send successfully."
+
+
+class ApiBackend:
+    """Product lookups through the storefront GraphQL API; no login, so no wishlists."""
+
+    name = "api"
+
+    def get_information(self, url: str) -> dict[str, str]:
+        import magento_api
+
+        data = magento_api.get_information(url)
+        if data.get("price", "Price unavailable") != "Price unavailable":
+            price_history.observe(url, data["price"])
+        return data
+
+    def get_many(self, urls: list[str]) -> dict[str, dict[str, str]]:
+        import magento_api
+
+        results = magento_api.get_many(urls)
+        for url, data in results.items():
+            if data["price"] != "Price unavailable":
+                price_history.observe(url, data["price"])
+        return results
+
+    def iter_wishlist(self, email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+        raise BackendUnsupported("The storefront API has no wishlist access")
+
+    def handle_login(self, email: str, password: str, keep_session: bool = False) -> str:
+        raise BackendUnsupported("The storefront API cannot log in")
+
+    def send_wishlist(self, email: str, password: str) -> str:
+        raise BackendUnsupported("The storefront API cannot log in")
+
+
+BACKENDS: dict[str, Callable[[], Any]] = {
+    "selenium": SeleniumBackend,
+    "http": HttpBackend,
+    "fixture": FixtureBackend,
+    "api": ApiBackend,
+}
+
+_instances: dict[str, Any] = {}
+_instances_lock = threading.Lock()
+
+
+def _backend(name: str) -> Any:
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = _instances[name] = BACKENDS[name]()
+        return backend
+
+
+def backend_name_for(operation: str) -> str:
+    name = (os.environ.get(f"SCRAPER_BACKEND_{operation.upper()}")
+            or os.environ.get("SCRAPER_BACKEND") or "selenium").lower()
+    if name not in BACKENDS:
+        print(f"Unknown scraper backend {name!r} for {operation}, using selenium")
+        return "selenium"
+    return name
+
+
+_stats_lock = threading.Lock()
+# (backend, operation) -> recent (seconds, success) samples
+_recent: dict[tuple[str, str], deque[tuple[float, bool]]] = {}
+# (backend, operation) -> [calls, successes, fallbacks] since start-up
+_totals: dict[tuple[str, str], list[int]] = {}
+
+
+def record(backend: str, operation: str, seconds: float, success: bool, fallback: bool = False) -> None:
+    with _stats_lock:
+        _recent.setdefault((backend, operation), deque(maxlen=STATS_WINDOW)).append((seconds, success))
+        totals = _totals.setdefault((backend, operation), [0, 0, 0])
+        totals[0] += 1
+        totals[1] += int(success)
+        totals[2] += int(fallback)
+
+
+def get_stats() -> dict[str, dict[str, dict[str, Any]]]:
+    with _stats_lock:
+        stats: dict[str, dict[str, dict[str, Any]]] = {}
+        for (backend, operation), (calls, successes, fallbacks) in _totals.items():
+            latencies = sorted(seconds for seconds, _ in _recent[(backend, operation)])
+            stats.setdefault(backend, {})[operation] = {
+                "calls": calls,
+                "success_rate": successes / calls if calls else None,
+                "fallbacks": fallbacks,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None,
+            }
+        return stats
+
+
+def reset() -> None:
+    with _stats_lock:
+        _recent.clear()
+        _totals.clear()
+
+
+def _call(operation: str, method: str, is_success: Callable[[Any], bool], *args: Any) -> Any:
+    name = backend_name_for(operation)
+    start = time.perf_counter()
+    try:
+        result = getattr(_backend(name), method)(*args)
+    except BackendUnsupported as e:
+        print(f"{name} backend cannot {operation} ({e}), falling back to selenium")
+        record(name, operation, time.perf_counter() - start, False, fallback=True)
+        name = "selenium"
+        start = time.perf_counter()
+        result = getattr(_backend(name), method)(*args)
+    except Cancelled:
+        raise
+    except Exception:
+        record(name, operation, time.perf_counter() - start, False)
+        raise
+    record(name, operation, time.perf_counter() - start, is_success(result))
+    return result
+
+
+def get_information(url: str) -> dict[str, str]:
+    return _call("get_information", "get_information",
+                 lambda result: not (isinstance(result, dict) and "error" in result), url)
+
+
+def supports_get_many() -> bool:
+    """Whether the get_information backend can look up many URLs in one call."""
+    return hasattr(_backend(backend_name_for("get_information")), "get_many")
+
+
+def get_information_many(urls: list[str]) -> dict[str, dict[str, str]]:
+    """get_information for every URL in one batched lookup; BackendUnsupported unless supports_get_many()."""
+    name = backend_name_for("get_information")
+    backend = _backend(name)
+    if not hasattr(backend, "get_many"):
+        raise BackendUnsupported(f"{name} backend has no batched lookup")
+
+    start = time.perf_counter()
+    try:
+        results = backend.get_many(urls)
+    except Exception:
+        record(name, "get_information", time.perf_counter() - start, False)
+        raise
+    record(name, "get_information", time.perf_counter() - start, True)
+    for url in urls:
+        results.setdefault(url, {"error": f"Product not found: {url}"})
+    return results
+
+
+def iter_wishlist(email: str, password: str | None = None) -> Iterator[dict[str, Any]]:
+    """Like get_wishlist.iter_wishlist; timing covers the whole stream."""
+    name = backend_name_for("get_wishlist")
+    try:
+        events = _backend(name).iter_wishlist(email, password)
+    except BackendUnsupported as e:
+        print(f"{name} backend cannot get_wishlist ({e}), falling back to selenium")
+        record(name, "get_wishlist", 0.0, False, fallback=True)
+        name = "selenium"
+        events = _backend(name).iter_wishlist(email, password)
+
+    start = time.perf_counter()
+    success = cancelled = False
+    try:
+        for event in events:
+            if event["event"] == "done":
+                success = not event.get("error")
+            yield event
+    except Cancelled:
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            record(name, "get_wishlist", time.perf_counter() - start, success)
+
+
+def get_wishlist(email: str, password: str | None = None) -> dict[str, Any]:
+    from get_wishlist import collect_wishlist
+
+    return collect_wishlist(iter_wishlist(email, password))
+
+
+def login_and_get_wishlist(email: str, password: str) -> dict[str, Any]:
+    """Login check and wishlist from one session; see get_wishlist.login_and_get_wishlist."""
+    from get_wishlist import collect_login_and_wishlist
+
+    return collect_login_and_wishlist(iter_wishlist(email, password))
+
+
+def handle_login(email: str, password: str, keep_session: bool = False) -> str:
+    return _call("handle_login", "handle_login", lambda result: result != "Login failed",
+                 email, password, keep_session)
+
+
+def send_wishlist(email: str, password: str) -> str:
+    return _call("send_wishlist", "send_wishlist", lambda result: result != "Login failed", email, password)
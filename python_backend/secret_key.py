@@ -0,0 +1,20 @@
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=1)
+def load_secret_key() -> bytes:
+    """Load and validate SECRET_KEY once per process."""
+    load_dotenv()
+
+    secret_key = os.getenv('SECRET_KEY')
+
+    if not secret_key:
+        raise ValueError('SECRET_KEY is missing in environment variables')
+
+    if len(secret_key) != 32:
+        raise ValueError('SECRET_KEY must be 32 bytes')
+
+    return bytes(secret_key, 'utf-8')
@@ -0,0 +1,88 @@
+"""Success statistics for the scrapers' selector fallbacks.
+
+Each (page type, field) has an ordered list of selector strategies. Outcomes
+are recorded over a sliding window so the scrapers can try the strategy that
+has recently worked first and give a strategy that has stopped matching only a
+short timeout instead of its full wait. A strategy only counts as a success
+when it yielded data, not merely when its element showed up.
+
+A fallback is only tried after the strategies before it missed, so its
+success rate says nothing about them. The scrapers therefore pin their
+specific selectors in front; only the fallbacks behind them are reordered.
+"""
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any, TypeVar
+
+STATS_WINDOW = int(os.environ.get("SELECTOR_STATS_WINDOW", "50"))
+SHORT_TIMEOUT_AFTER = int(os.environ.get("SELECTOR_SHORT_TIMEOUT_AFTER", "5"))
+SHORT_TIMEOUT_SECONDS = float(os.environ.get("SELECTOR_SHORT_TIMEOUT", "1"))
+
+T = TypeVar("T")
+
+_stats_lock = threading.Lock()
+# (page_type, field) -> strategy -> recent outcomes
+_recent: dict[tuple[str, str], dict[Hashable, deque[bool]]] = {}
+# (page_type, field) -> strategy -> [successes, attempts] since start-up
+_totals: dict[tuple[str, str], dict[Hashable, list[int]]] = {}
+
+
+def record(page_type: str, field: str, strategy: Hashable, success: bool) -> None:
+    with _stats_lock:
+        recent = _recent.setdefault((page_type, field), {})
+        recent.setdefault(strategy, deque(maxlen=STATS_WINDOW)).append(success)
+        totals = _totals.setdefault((page_type, field), {}).setdefault(strategy, [0, 0])
+        totals[0] += int(success)
+        totals[1] += 1
+
+
+def _success_rate(outcomes: deque[bool] | None) -> float:
+    # Laplace smoothing: strategies without data rank as 0.5, ties keep the
+    # original order because sorted() is stable.
+    if not outcomes:
+        return 0.5
+    return (sum(outcomes) + 1) / (len(outcomes) + 2)
+
+
+def order(page_type: str, field: str, strategies: Iterable[T],
+          key: Callable[[T], Hashable] = lambda s: s, pinned: int = 0) -> list[T]:
+    """Return ``strategies`` sorted by recent success rate, best first, keeping the first ``pinned`` in place."""
+    strategies = list(strategies)
+    with _stats_lock:
+        recent = dict(_recent.get((page_type, field), {}))
+        return strategies[:pinned] + sorted(strategies[pinned:], key=lambda s: -_success_rate(recent.get(key(s))))
+
+
+def timeout_for(page_type: str, field: str, strategy: Hashable, default: float) -> float:
+    """Full ``default`` timeout, or a short one for a strategy that keeps missing."""
+    with _stats_lock:
+        outcomes = _recent.get((page_type, field), {}).get(strategy)
+        if outcomes and len(outcomes) >= SHORT_TIMEOUT_AFTER and not any(outcomes):
+            return min(default, SHORT_TIMEOUT_SECONDS)
+    return default
+
+
+def get_stats() -> dict[str, Any]:
+    with _stats_lock:
+        stats: dict[str, Any] = {}
+        for (page_type, field), strategies in _totals.items():
+            rows = []
+            for strategy, (successes, attempts) in strategies.items():
+                outcomes = _recent[(page_type, field)][strategy]
+                rows.append({
+                    "strategy": str(strategy),
+                    "successes": successes,
+                    "attempts": attempts,
+                    "recent_success_rate": round(_success_rate(outcomes), 3),
+                    "short_timeout": len(outcomes) >= SHORT_TIMEOUT_AFTER and not any(outcomes),
+                })
+            stats.setdefault(page_type, {})[field] = rows
+        return stats
+
+
+def reset() -> None:
+    with _stats_lock:
+        _recent.clear()
+        _totals.clear()
@@ -7,7 +7,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from chrome_options import get_chrome_options
+from browser_pool import new_driver
+from panini_session import open_and_login
+from queue_it import QueueItActive, release_admission, wait_for_admission
 
 load_dotenv()
 
@@ -36,36 +38,20 @@ def bypass_recaptcha(driver: webdriver.Chrome) -> None:
 
 
 def send_wishlist(email: str, password: str) -> str:
-    driver = webdriver.Chrome(options=get_chrome_options())
+    wait_for_admission()
     try:
-        driver.get("https://www.panini.de/shp_deu_de/customer/account/login/")
-
-        WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Nur technische Cookies verwenden')]"))
-        ).click()
-
-        email_field = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//input[@placeholder='Email *']"))
-        )
-        password_field = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//input[@placeholder='Passwort *']"))
-        )
-
-        driver.execute_script("arguments[0].scrollIntoView(true);", email_field)
-        driver.execute_script("arguments[0].scrollIntoView(true);", password_field)
-
-        driver.execute_script("arguments[0].value = arguments[1];", email_field, email)
-        driver.execute_script("arguments[0].value = arguments[1];", password_field, password)
-
-        login_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, "//input[@value='Senden']"))
-        )
-        driver.execute_script("arguments[0].scrollIntoView(true);", login_button)
-        driver.execute_script("arguments[0].click();", login_button)
-
-        WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.XPATH, "//span[contains(text(),'Mein Konto')]"))
-        )
+        driver = new_driver()
+    except Exception:
+        release_admission()
+        raise
+    try:
+        try:
+            open_and_login(driver, email, password)
+        except QueueItActive:
+            raise
+        except Exception as e:
+            print(f"Login failed: {e}")
+            return "Login failed"
 
         if driver.find_elements(By.ID, 'recaptcha-anchor'):
             print("Captcha detected")
@@ -73,9 +59,6 @@ def send_wishlist(email: str, password: str) -> str:
         else:
             print("No CAPTCHA detected")
 
-        if "Welcome" not in driver.page_source:
-            return "Login failed"
-
         driver.get("https://www.panini.de/shp_deu_de/wishlist/index/share/wishlist_id/2222286/")
 
         emails_input = WebDriverWait(driver, 5).until(
@@ -100,3 +83,4 @@ def send_wishlist(email: str, password: str) -> str:
         return "Wishlist send successfully."
     finally:
         driver.quit()
+        release_admission()
@@ -0,0 +1,75 @@
+"""Startup profiling report: import time per module for the backend.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+aggregates the self time by top-level package.
+
+    python startup_profile.py                 # profile main.py
+    python startup_profile.py --module warmup --top 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def collect_import_times(module: str) -> list[tuple[str, int, int]]:
+    """Return (module name, self us, cumulative us) for every import of ``module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_HERE,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-500:]}")
+
+    entries: list[tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        entries.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return entries
+
+
+def build_report(entries: list[tuple[str, int, int]]) -> dict[str, object]:
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.split(".")[0]] += self_us
+    total_us = sum(self_us for _, self_us, _ in entries)
+    packages = sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+    return {
+        "total_ms": total_us / 1000,
+        "modules": len(entries),
+        "packages": [{"package": name, "ms": us / 1000} for name, us in packages],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="number of packages to show")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = build_report(collect_import_times(args.module))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"import {args.module}: {report['total_ms']:.1f} ms across {report['modules']} modules")
+    print(f"{'package':<32}{'self ms':>10}")
+    for row in report["packages"][: args.top]:
+        print(f"{row['package']:<32}{row['ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Product fields from the machine-readable data embedded in Magento product pages.
+
+Panini's product pages carry JSON-LD ``Product``/``Offer`` blocks and
+Magento's price-box configuration: ``data-price-amount`` attributes and the
+``priceConfig`` JSON in ``text/x-magento-init`` scripts and ``data-mage-init``
+attributes. They are mapped here onto the keys get_information has always
+returned ("price", "name", "ISBN", "Autor", ...), formatted like the visible
+text, and the DOM scrape only fills the fields they lack.
+"""
+import json
+import re
+from collections.abc import Iterator
+from typing import Any
+
+# JSON-LD property -> get_information key
+_JSON_LD_FIELDS = {
+    "sku": "Artikelnummer",
+    "isbn": "ISBN",
+    "gtin13": "ISBN",
+    "author": "Autor",
+    "illustrator": "Zeichner",
+    "numberOfPages": "Seitenzahl",
+    "datePublished": "Erscheinungsdatum",
+    "releaseDate": "Erscheinungsdatum",
+    "isPartOf": "Serie",
+}
+_PRODUCT_TYPES = frozenset({"Product", "Book", "ComicIssue"})
+_CURRENCY_SYMBOLS = {"EUR": "€"}
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+_COMPARABLE_RE = re.compile(r"[\W_]+")
+
+
+def format_price(amount: Any, currency: str = "EUR") -> str:
+    """``7.5`` -> ``"7,50 €"``, the way the price box renders it."""
+    euros, cents = f"{float(amount):,.2f}".split(".")
+    return f"{euros.replace(',', '.')},{cents} {_CURRENCY_SYMBOLS.get(currency, currency)}"
+
+
+def format_date(value: str) -> str:
+    """ISO ``2024-10-02`` (optionally with a time) -> ``02.10.2024``, as the attribute table shows it."""
+    match = _ISO_DATE_RE.match(value)
+    return f"{match.group(3)}.{match.group(2)}.{match.group(1)}" if match else value
+
+
+def _text(value: Any) -> str:
+    """A JSON-LD value as display text: names of things, lists joined with commas."""
+    if isinstance(value, list):
+        return ", ".join(filter(None, (_text(v) for v in value)))
+    if isinstance(value, dict):
+        return _text(value.get("name", ""))
+    return str(value).strip() if value is not None else ""
+
+
+def _walk_json_ld(node: Any) -> Iterator[dict[str, Any]]:
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk_json_ld(item)
+    elif isinstance(node, dict):
+        yield node
+        if "@graph" in node:
+            yield from _walk_json_ld(node["@graph"])
+
+
+def _is_product(node: dict[str, Any]) -> bool:
+    types = node.get("@type", [])
+    return bool(_PRODUCT_TYPES.intersection([types] if isinstance(types, str) else types))
+
+
+def _offer_price(offers: Any) -> str:
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if not isinstance(offer, dict):
+            continue
+        amount = offer.get("price", offer.get("lowPrice"))
+        if amount not in (None, ""):
+            try:
+                return format_price(amount, offer.get("priceCurrency") or "EUR")
+            except ValueError:
+                continue
+    return ""
+
+
+def from_json_ld(blocks: list[str]) -> dict[str, str]:
+    """Fields of the first JSON-LD Product on the page."""
+    for block in blocks:
+        try:
+            document = json.loads(block)
+        except ValueError:
+            continue
+        for node in _walk_json_ld(document):
+            if not _is_product(node):
+                continue
+            data: dict[str, str] = {}
+            price = _offer_price(node.get("offers"))
+            if price:
+                data["price"] = price
+            name = _text(node.get("name"))
+            if name:
+                data["title"] = data["name"] = name
+            for prop, key in _JSON_LD_FIELDS.items():
+                value = _text(node.get(prop))
+                if value and key not in data:
+                    data[key] = format_date(value) if key == "Erscheinungsdatum" else value
+            return data
+    return {}
+
+
+def _price_configs(node: Any) -> Iterator[dict[str, Any]]:
+    if isinstance(node, dict):
+        config = node.get("priceConfig")
+        if isinstance(config, dict):
+            yield config
+        for value in node.values():
+            yield from _price_configs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _price_configs(value)
+
+
+def from_price_box(price_amounts: list[list[str]], mage_init: list[str], product_id: str = "") -> dict[str, str]:
+    """The final price from the main price box's ``data-price-amount`` or its priceConfig."""
+    for price_type, amount in price_amounts:
+        if price_type == "finalPrice" and amount:
+            try:
+                return {"price": format_price(amount)}
+            except ValueError:
+                continue
+    configs = []
+    for block in mage_init:
+        try:
+            configs.extend(_price_configs(json.loads(block)))
+        except ValueError:
+            continue
+    if product_id:
+        configs = [c for c in configs if str(c.get("productId", "")) == product_id]
+    if len(configs) != 1:
+        return {}  # none, or several price boxes we cannot tell apart
+    amount = configs[0].get("prices", {}).get("finalPrice", {}).get("amount")
+    try:
+        return {"price": format_price(amount)} if amount not in (None, "") else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def extract(blocks: dict[str, Any]) -> dict[str, str]:
+    """Map the raw blocks (``jsonLd``, ``mageInit``, ``priceAmounts``, ``productId``) to product fields.
+
+    The price box wins over the JSON-LD offer: it is what the page displays.
+    """
+    data = from_json_ld(blocks.get("jsonLd", []))
+    data.update(from_price_box(blocks.get("priceAmounts", []), blocks.get("mageInit", []),
+                               blocks.get("productId") or ""))
+    return data
+
+
+def blocks_from_soup(soup: Any) -> dict[str, Any]:
+    """The raw blocks from a parsed page, as the in-page extraction script returns them."""
+    main = soup.select_one(".product-info-main") or soup
+    price_box = main.select_one("[data-role='priceBox'][data-product-id]")
+    return {
+        "jsonLd": [s.string or "" for s in soup.select("script[type='application/ld+json']")],
+        "mageInit": [s.string or "" for s in soup.select("script[type='text/x-magento-init']")
+                     if "priceConfig" in (s.string or "")]
+                    + [el["data-mage-init"] for el in main.select("[data-mage-init*='priceConfig']")],
+        "priceAmounts": [[el.get("data-price-type", ""), el.get("data-price-amount", "")]
+                         for el in main.select("[data-price-amount]")],
+        "productId": price_box["data-product-id"] if price_box else "",
+    }
+
+
+def _comparable(value: str) -> str:
+    return _COMPARABLE_RE.sub("", value).lower()
+
+
+def merge(structured: dict[str, str], scraped: dict[str, str]) -> dict[str, str]:
+    """Structured fields first, scraped text for the rest.
+
+    Where both agree up to punctuation and case (``9783741636234`` vs
+    ``978-3-7416-3623-4``) the scraped text is kept, so values look the same
+    whichever source produced them.
+    """
+    data = dict(scraped)
+    for key, value in structured.items():
+        if _comparable(data.get(key, "")) != _comparable(value):
+            data[key] = value
+    return data
@@ -1,7 +1,10 @@
 """Tests for Python backend — encryption, rate limiting, and request validation."""
 # We need to set env vars before importing the app modules
+import importlib.util
+import json
 import os
 import threading
+import time
 import unittest
 
 os.environ.setdefault('SECRET_KEY', '0123456789abcdef0123456789abcdef')
@@ -50,6 +53,37 @@ class TestEncryption(unittest.TestCase):
         self.assertEqual(decrypt_string(encrypted), original)
 
 
+class TestBatchCrypto(unittest.TestCase):
+    """Test the batch crypto API and its wire formats."""
+
+    def test_decrypt_many_hex_matches_encrypt(self) -> None:
+        from batch_crypto import decrypt_many
+        values = ["a@example.com", "", "pässwörd"]
+        self.assertEqual(decrypt_many([encrypt(v) for v in values]), values)
+
+    def test_compact_format_roundtrip(self) -> None:
+        from batch_crypto import encrypt_many
+        token = encrypt_many(["hello"], wire="compact")[0]
+        self.assertTrue(token.startswith("g1."))
+        self.assertEqual(decrypt_string(token), "hello")
+
+    def test_packed_memoryview_roundtrip(self) -> None:
+        from batch_crypto import decrypt_many, encrypt_many
+        packed = encrypt_many([b"abc", bytearray(b"defg")], wire="packed")
+        blob = bytearray(b"".join(packed))
+        first = memoryview(blob)[:len(packed[0])]
+        second = memoryview(blob)[len(packed[0]):]
+        self.assertEqual(decrypt_many([first, second], as_text=False), [b"abc", b"defg"])
+
+    def test_decrypt_many_errors_none(self) -> None:
+        from batch_crypto import decrypt_many
+        good = encrypt("ok")
+        tampered = good[:-2] + ("00" if not good.endswith("00") else "11")
+        self.assertEqual(decrypt_many([good, "bad", tampered], errors="none"), ["ok", None, None])
+        with self.assertRaises(ValueError):
+            decrypt_many([good, "bad"])
+
+
 class TestRateLimiter(unittest.TestCase):
     """Test the thread-safe rate limiter logic."""
 
@@ -239,6 +273,1895 @@ class TestFlaskRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 429)
 
 
+class TestQueueIt(unittest.TestCase):
+    """Test backend-wide queue-it admission control."""
+
+    class _FakeDriver:
+        def __init__(self, url: str) -> None:
+            self.current_url = url
+
+    def setUp(self) -> None:
+        import queue_it
+        queue_it._mark_cleared()
+        self.queue_it = queue_it
+
+    def tearDown(self) -> None:
+        self.queue_it._mark_cleared()
+
+    def test_admission_passes_when_clear(self) -> None:
+        self.queue_it.wait_for_admission(timeout=0.1)
+        self.assertFalse(self.queue_it.get_status()["active"])
+
+    def test_non_probe_session_in_queue_raises(self) -> None:
+        """A second session landing in queue-it gives up instead of waiting."""
+        queue_it = self.queue_it
+        with queue_it._condition:
+            queue_it._active = True
+            queue_it._probe_owner = -1
+        driver = self._FakeDriver("https://panini.queue-it.net/?c=panini")
+        with self.assertRaises(queue_it.QueueItActive):
+            queue_it.check_queue_it(driver)
+
+    def test_parked_request_times_out_while_probe_waits(self) -> None:
+        queue_it = self.queue_it
+        with queue_it._condition:
+            queue_it._active = True
+            queue_it._probe_owner = -1
+        with self.assertRaises(queue_it.QueueItActive):
+            queue_it.wait_for_admission(timeout=0.05)
+        self.assertEqual(queue_it.get_status()["parked"], 0)
+
+    def test_parked_request_released_when_probe_clears(self) -> None:
+        queue_it = self.queue_it
+        with queue_it._condition:
+            queue_it._active = True
+            queue_it._probe_owner = -1
+
+        admitted: list[bool] = []
+
+        def park() -> None:
+            queue_it.wait_for_admission(timeout=5)
+            admitted.append(True)
+
+        thread = threading.Thread(target=park)
+        thread.start()
+        queue_it._mark_cleared()
+        thread.join(timeout=5)
+        self.assertEqual(admitted, [True])
+
+    def test_first_parked_request_becomes_probe(self) -> None:
+        queue_it = self.queue_it
+        with queue_it._condition:
+            queue_it._active = True
+        queue_it.wait_for_admission(timeout=0.1)
+        self.assertTrue(queue_it.get_status()["probe_running"])
+        queue_it.release_admission()
+        self.assertFalse(queue_it.get_status()["probe_running"])
+
+    def test_probe_clears_queue_on_normal_page(self) -> None:
+        queue_it = self.queue_it
+        with queue_it._condition:
+            queue_it._active = True
+        queue_it.wait_for_admission(timeout=0.1)
+        queue_it.check_queue_it(self._FakeDriver("https://www.panini.de/shp_deu_de/"))
+        self.assertFalse(queue_it.get_status()["active"])
+
+    def test_queue_status_route(self) -> None:
+        from main import app
+        client = app.test_client()
+        response = client.get('/queue_status', headers={"X-API-Key": os.environ['FLASK_API_KEY']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("active", response.get_json())
+
+
+class TestWishlistStreaming(unittest.TestCase):
+    """Test the event-based wishlist scraper and the streaming route."""
+
+    _EVENTS = [
+        {"event": "queued"},
+        {"event": "browser_started"},
+        {"event": "logged_in"},
+        {"event": "page_loaded"},
+        {"event": "item", "data": {"name": "Comic A", "link": "https://www.panini.de/a"}},
+        {"event": "item", "data": {"name": "Comic B", "link": "https://www.panini.de/b"}},
+        {"event": "done", "message": "Wishlist for test", "count": 2},
+    ]
+
+    def test_parse_product_item(self) -> None:
+        from bs4 import BeautifulSoup
+
+        from get_wishlist import _parse_product_item
+        html = (
+            '<li class="product-item"><a class="product-item-link" href="https://www.panini.de/x.html">X</a>'
+            '<img class="product-image-photo" src="https://www.panini.de/media/catalog/product/cache/abc/x/y.jpg">'
+            '<span class="price">12,00 €</span></li>'
+        )
+        item = BeautifulSoup(html, "lxml").select_one("li.product-item")
+        data = _parse_product_item(item)
+        self.assertEqual(data["name"], "X")
+        self.assertEqual(data["image"], "https://www.panini.de/media/catalog/product/x/y.jpg")
+        self.assertEqual(data["price"], "12,00 €")
+        self.assertEqual(data["release_date"], "Date not available")
+
+    def test_get_wishlist_collects_items(self) -> None:
+        from unittest import mock
+
+        import get_wishlist
+        with mock.patch.object(get_wishlist, 'iter_wishlist', return_value=iter(self._EVENTS)):
+            result = get_wishlist.get_wishlist("test", "secret")
+        self.assertEqual(result["message"], "Wishlist for test")
+        self.assertEqual([d["name"] for d in result["data"]], ["Comic A", "Comic B"])
+
+    def test_stream_route_emits_ndjson(self) -> None:
+        import json
+        from unittest import mock
+
+        import main
+        from encrypt import encrypt
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        body = {"email": encrypt("test@example.com"), "password": encrypt("secret")}
+        with mock.patch.object(main, 'iter_wishlist', return_value=iter(self._EVENTS)):
+            response = main.app.test_client().post('/get_wishlist_stream', json=body, headers=headers)
+            lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        events = [json.loads(line)["event"] for line in lines]
+        self.assertEqual(events, [e["event"] for e in self._EVENTS])
+
+    def test_stream_route_emits_sse(self) -> None:
+        from unittest import mock
+
+        import main
+        from encrypt import encrypt
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY'], "Accept": "text/event-stream"}
+        body = {"email": encrypt("test@example.com"), "password": encrypt("secret")}
+        with mock.patch.object(main, 'iter_wishlist', return_value=iter(self._EVENTS)):
+            response = main.app.test_client().post('/get_wishlist_stream', json=body, headers=headers)
+            text = response.get_data(as_text=True)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertIn("event: item\ndata: ", text)
+
+
+class TestColdStart(unittest.TestCase):
+    """Test lazy scraper imports and the worker warm-up helpers."""
+
+    def test_main_does_not_import_scrapers(self) -> None:
+        import subprocess
+        import sys
+        code = "import main, sys; print(sorted(m for m in ('selenium', 'bs4', 'lxml') if m in sys.modules))"
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(proc.stdout.strip(), "[]")
+
+    def test_lazy_callable_imports_on_first_call(self) -> None:
+        from lazy_import import LazyCallable
+        lazy = LazyCallable('json', 'dumps')
+        self.assertIsNone(lazy._target)
+        self.assertEqual(lazy([1]), "[1]")
+        self.assertIsNotNone(lazy._target)
+
+    def test_secret_key_loaded_once(self) -> None:
+        import decrypt_string
+        import encrypt
+        from secret_key import load_secret_key
+        self.assertIs(decrypt_string.key, encrypt.key)
+        self.assertIs(load_secret_key(), decrypt_string.key)
+
+    def test_pool_refill_does_not_overshoot_target(self) -> None:
+        from unittest import mock
+
+        import browser_pool
+        launches = []
+
+        def launch() -> mock.MagicMock:
+            time.sleep(0.05)
+            launches.append(1)
+            return mock.MagicMock()
+
+        with mock.patch.object(browser_pool, "_launch", side_effect=launch), \
+                mock.patch.object(browser_pool, "_idle", []) as idle, \
+                mock.patch.object(browser_pool, "_target", 2), \
+                mock.patch("browser_watchdog.start"):
+            threads = [threading.Thread(target=browser_pool.new_driver) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            deadline = time.monotonic() + 5
+            while (browser_pool._refilling or len(idle) < 2) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(idle), 2)
+            self.assertLessEqual(len(launches), 4 + 2)
+            self.assertFalse(browser_pool._refilling)
+
+    def test_parse_fixtures(self) -> None:
+        from warmup import parse_fixtures
+        self.assertEqual(parse_fixtures(), 3)
+
+
+class TestRefreshOrchestrator(unittest.TestCase):
+    """Test batch refresh scheduling, checkpointing and resume."""
+
+    def setUp(self) -> None:
+        import tempfile
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out_dir = self._tmp.name
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _accounts(self, n: int) -> list[dict[str, str]]:
+        return [
+            {"id": f"acc{i}", "email": encrypt(f"user{i}@example.com"), "password": encrypt("secret")}
+            for i in range(n)
+        ]
+
+    def test_refresh_writes_results_and_checkpoint(self) -> None:
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        def scrape(email: str, password: str) -> dict[str, object]:
+            return {"message": f"Wishlist for {email}", "data": [{"name": "X"}]}
+
+        checkpoint = Checkpoint(os.path.join(self.out_dir, "checkpoint.jsonl"))
+        counts = refresh_accounts(self._accounts(5), DirectorySink(self.out_dir), checkpoint,
+                                  browsers=2, jitter=0, scrape=scrape)
+        self.assertEqual(counts["ok"], 5)
+        with open(os.path.join(self.out_dir, "acc3.json"), encoding="utf-8") as f:
+            written = f.read()
+        self.assertIn('"name": "X"', written)
+        self.assertNotIn("user3@example.com", written)
+        self.assertEqual(Checkpoint(checkpoint.path).done, {f"acc{i}" for i in range(5)})
+
+    def test_resume_skips_checkpointed_accounts(self) -> None:
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        checkpoint = Checkpoint(os.path.join(self.out_dir, "checkpoint.jsonl"))
+        checkpoint.mark("acc0", "ok")
+        scraped: list[str] = []
+        lock = threading.Lock()
+
+        def scrape(email: str, password: str) -> dict[str, object]:
+            with lock:
+                scraped.append(email)
+            return {"message": "ok", "data": []}
+
+        counts = refresh_accounts(self._accounts(3), DirectorySink(self.out_dir),
+                                  Checkpoint(checkpoint.path), jitter=0, scrape=scrape)
+        self.assertEqual(counts["skipped"], 1)
+        self.assertNotIn("user0@example.com", scraped)
+        self.assertEqual(len(scraped), 2)
+
+    def test_resume_retries_failed_accounts(self) -> None:
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        path = os.path.join(self.out_dir, "checkpoint.jsonl")
+        outcomes = {"user0@example.com": True, "user1@example.com": False}
+
+        def scrape(email: str, password: str) -> dict[str, object]:
+            if outcomes[email]:
+                return {"message": "ok", "data": []}
+            return {"message": "Failed: site is queued", "data": [], "error": True}
+
+        first = refresh_accounts(self._accounts(2), DirectorySink(self.out_dir), Checkpoint(path),
+                                 jitter=0, retries=0, scrape=scrape)
+        self.assertEqual((first["ok"], first["failed"]), (1, 1))
+
+        outcomes["user1@example.com"] = True
+        resumed = refresh_accounts(self._accounts(2), DirectorySink(self.out_dir), Checkpoint(path),
+                                   jitter=0, retries=0, scrape=scrape)
+        self.assertEqual((resumed["skipped"], resumed["ok"], resumed["failed"]), (1, 1, 0))
+        self.assertEqual(Checkpoint(path).done, {"acc0", "acc1"})
+
+    def test_failed_account_is_retried_then_recorded(self) -> None:
+        from get_wishlist import collect_wishlist
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        calls: list[str] = []
+
+        def scrape(email: str, password: str) -> dict[str, object]:
+            calls.append(email)
+            return collect_wishlist([{"event": "done", "message": "Failed to get wishlist. Please try again later.",
+                                      "error": True}])
+
+        checkpoint = Checkpoint(os.path.join(self.out_dir, "checkpoint.jsonl"))
+        counts = refresh_accounts(self._accounts(1), DirectorySink(self.out_dir), checkpoint,
+                                  browsers=1, jitter=0, retries=2, scrape=scrape)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(counts["failed"], 1)
+
+    def test_failed_login_is_recorded_without_retry(self) -> None:
+        from get_wishlist import collect_wishlist
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        calls: list[str] = []
+
+        def scrape(email: str, password: str) -> dict[str, object]:
+            calls.append(email)
+            return collect_wishlist([{"event": "done", "message": "Login failed", "error": True, "login_failed": True}])
+
+        checkpoint = Checkpoint(os.path.join(self.out_dir, "checkpoint.jsonl"))
+        counts = refresh_accounts(self._accounts(1), DirectorySink(self.out_dir), checkpoint,
+                                  browsers=1, jitter=0, retries=2, scrape=scrape)
+        self.assertEqual((len(calls), counts["failed"], counts["ok"]), (1, 1, 0))
+        with open(os.path.join(self.out_dir, "acc0.json"), encoding="utf-8") as f:
+            self.assertTrue(json.load(f)["login_failed"])
+
+    def test_undecryptable_account_is_marked_invalid(self) -> None:
+        from refresh_orchestrator import Checkpoint, DirectorySink, refresh_accounts
+
+        accounts = [{"id": "bad", "email": "not:valid:hex", "password": "x"}]
+        checkpoint = Checkpoint(os.path.join(self.out_dir, "checkpoint.jsonl"))
+        counts = refresh_accounts(accounts, DirectorySink(self.out_dir), checkpoint,
+                                  jitter=0, scrape=lambda e, p: {"message": "ok", "data": []})
+        self.assertEqual(counts["invalid"], 1)
+
+
+class TestSelectorStats(unittest.TestCase):
+    """Test adaptive ordering of selector fallbacks."""
+
+    def setUp(self) -> None:
+        import selector_stats
+        selector_stats.reset()
+        self.stats = selector_stats
+
+    def tearDown(self) -> None:
+        self.stats.reset()
+
+    def test_order_unchanged_without_data(self) -> None:
+        self.assertEqual(self.stats.order("product", "title", ["a", "b", "c"]), ["a", "b", "c"])
+
+    def test_successful_fallback_moves_first(self) -> None:
+        for _ in range(3):
+            self.stats.record("product", "title", "a", False)
+            self.stats.record("product", "title", "b", True)
+        self.assertEqual(self.stats.order("product", "title", ["a", "b", "c"]), ["b", "c", "a"])
+
+    def test_broad_fallback_does_not_lock_in(self) -> None:
+        from unittest import mock
+
+        from selenium.common.exceptions import NoSuchElementException
+
+        from get_comic_information import _TABLE_STRATEGIES, _wait_for_first
+        specific, broad = _TABLE_STRATEGIES[0][1], _TABLE_STRATEGIES[1][1]
+
+        class Element:
+            def __init__(self, rows: int) -> None:
+                self.rows = rows
+
+            def is_displayed(self) -> bool:
+                return True
+
+            def find_elements(self, *args: object) -> list[str]:
+                return ["row"] * self.rows
+
+        class Driver:
+            def __init__(self, elements: dict) -> None:
+                self.elements = elements
+
+            def find_element(self, by: str, selector: str) -> Element:
+                if selector not in self.elements:
+                    raise NoSuchElementException(selector)
+                return self.elements[selector]
+
+        with mock.patch.object(self.stats, "timeout_for", return_value=0):
+            # A page without the specific table: the broad fallback wins once...
+            self.assertIsNotNone(_wait_for_first(Driver({broad: Element(3)}), "attribute_table", _TABLE_STRATEGIES))
+            # ...but the specific selector is still tried first on the next page.
+            table = Element(2)
+            found = _wait_for_first(Driver({specific: table, broad: Element(5)}), "attribute_table", _TABLE_STRATEGIES)
+            self.assertIs(found, table)
+            # A match without attribute rows is a miss, not a success.
+            self.assertIsNone(_wait_for_first(Driver({broad: Element(0)}), "attribute_table", _TABLE_STRATEGIES))
+        rows = {row["strategy"]: row for row in self.stats.get_stats()["product"]["attribute_table"]}
+        self.assertEqual((rows[broad]["successes"], rows[broad]["attempts"]), (1, 2))
+        self.assertEqual((rows[specific]["successes"], rows[specific]["attempts"]), (1, 3))
+
+    def test_never_matching_selector_gets_short_timeout(self) -> None:
+        self.assertEqual(self.stats.timeout_for("product", "price", "dead", 20), 20)
+        for _ in range(self.stats.SHORT_TIMEOUT_AFTER):
+            self.stats.record("product", "price", "dead", False)
+        self.assertEqual(self.stats.timeout_for("product", "price", "dead", 20), self.stats.SHORT_TIMEOUT_SECONDS)
+        self.stats.record("product", "price", "dead", True)
+        self.assertEqual(self.stats.timeout_for("product", "price", "dead", 20), 20)
+
+    def test_wishlist_parser_records_stats(self) -> None:
+        from warmup import parse_fixtures
+        parse_fixtures()
+        rows = self.stats.get_stats()["wishlist"]["link"]
+        self.assertEqual(rows[0]["strategy"], "a.product-item-link")
+        self.assertEqual(rows[0]["successes"], 3)
+
+    def test_wishlist_recovers_after_one_odd_item(self) -> None:
+        from bs4 import BeautifulSoup
+
+        from get_wishlist import _LINK_SELECTORS, _parse_product_item
+        from warmup import FIXTURES_DIR
+        # One item without a.product-item-link, found through the broad fallback.
+        self.stats.record("wishlist", "link", "a.product-item-link", False)
+        self.stats.record("wishlist", "link", "a.product-item-name", False)
+        self.stats.record("wishlist", "link", "a[href]", True)
+        self.assertEqual(self.stats.order("wishlist", "link", _LINK_SELECTORS, pinned=1)[0], "a.product-item-link")
+
+        with open(os.path.join(FIXTURES_DIR, "wishlist.html"), encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        items = [_parse_product_item(item) for item in soup.select("li.product-item")]
+        self.assertEqual(len(items), 3)
+        self.assertTrue(all(item["name"] and item["link"] for item in items))
+        self.assertEqual(items[1]["name"], "One Piece 105")
+
+    def test_selector_stats_route(self) -> None:
+        from main import app
+        response = app.test_client().get('/selector_stats', headers={"X-API-Key": os.environ['FLASK_API_KEY']})
+        self.assertEqual(response.status_code, 200)
+
+
+class TestPriceHistory(unittest.TestCase):
+    """Test the append-only price history store."""
+
+    def setUp(self) -> None:
+        import tempfile
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_record_dedupes_and_persists(self) -> None:
+        from price_history import RECORD, PriceHistoryStore
+        store = PriceHistoryStore(self._tmp.name)
+        url = "https://www.panini.de/shp_deu_de/comic.html"
+        self.assertTrue(store.record(url, 1200, timestamp=1_700_000_000))
+        self.assertFalse(store.record(url, 1200, timestamp=1_700_000_100))
+        self.assertTrue(store.record(url, 999, timestamp=1_700_000_200))
+
+        reloaded = PriceHistoryStore(self._tmp.name)
+        points = reloaded.query(url.upper())
+        self.assertEqual([p["price_cents"] for p in points], [1200, 999])
+        self.assertEqual(os.path.getsize(os.path.join(self._tmp.name, "points.bin")), 2 * RECORD.size)
+
+    def test_stores_sharing_a_directory_agree_on_url_ids(self) -> None:
+        from price_history import PriceHistoryStore
+        first, second = PriceHistoryStore(self._tmp.name), PriceHistoryStore(self._tmp.name)
+        a, b = "https://www.panini.de/a.html", "https://www.panini.de/b.html"
+        first.record(a, 1000, timestamp=1_700_000_000)
+        second.record(b, 2000, timestamp=1_700_000_000)
+        second.record(a, 900, timestamp=1_700_000_100)
+        for store in (first, second, PriceHistoryStore(self._tmp.name)):
+            self.assertEqual([p["price_cents"] for p in store.query(a)], [1000, 900])
+            self.assertEqual([p["price_cents"] for p in store.query(b)], [2000])
+
+    def test_range_query_and_daily_aggregate(self) -> None:
+        from price_history import PriceHistoryStore
+        store = PriceHistoryStore(self._tmp.name)
+        url = "https://www.panini.de/a.html"
+        day = 1_700_006_400  # 2023-11-15 00:00 UTC
+        for offset, price in [(0, 1000), (3600, 800), (7200, 900), (86400, 1100)]:
+            store.record(url, price, timestamp=day + offset)
+        self.assertEqual(len(store.query(url, start=day + 3600, end=day + 7200)), 2)
+        daily = store.daily(url)
+        self.assertEqual(daily[0], {"day": "2023-11-15", "min_cents": 800, "max_cents": 1000,
+                                    "last_cents": 900, "points": 3})
+        self.assertEqual(daily[1]["last_cents"], 1100)
+
+    def test_price_history_route_validates_domain(self) -> None:
+        from main import app
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        response = app.test_client().get('/price_history?url=https://evil.example.com/x', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestNormalization(unittest.TestCase):
+    """Test field normalization and server-side wishlist queries."""
+
+    def _items(self) -> list[dict[str, object]]:
+        from normalize import normalize_item
+        raw = [
+            {"name": "Batman", "link": "https://www.panini.de/shp_deu_de/batman-dmaxi001.html",
+             "price": "29,00 €", "release_date": "15.03.2024"},
+            {"name": "One Piece", "link": "https://www.panini.de/shp_deu_de/one-piece-105-mone105.html",
+             "price": "7,50 €", "release_date": "Erscheint im März 2025"},
+            {"name": "Akira", "link": "https://www.panini.de/shp_deu_de/akira-1.html",
+             "price": "Price not available", "release_date": "Date not available"},
+        ]
+        return [normalize_item(item) for item in raw]
+
+    def test_parse_price_cents(self) -> None:
+        from normalize import parse_price_cents
+        self.assertEqual(parse_price_cents("12,00 €"), 1200)
+        self.assertEqual(parse_price_cents("1.234,99 €"), 123499)
+        self.assertEqual(parse_price_cents("7,5 €"), 750)
+        self.assertEqual(parse_price_cents("1234,99 €"), 123499)
+        self.assertEqual(parse_price_cents("12.50 €"), 1250)
+        self.assertIsNone(parse_price_cents("Price not available"))
+
+    def test_parse_release_date(self) -> None:
+        from normalize import parse_release_date
+        self.assertEqual(parse_release_date("Erscheint am 02.10.2024"), "2024-10-02")
+        self.assertEqual(parse_release_date("März 2025"), "2025-03")
+        self.assertEqual(parse_release_date("11/2024"), "2024-11")
+        self.assertEqual(parse_release_date("Q3/2024"), "2024")
+        self.assertEqual(parse_release_date("31.02.2024"), "2024")
+        self.assertIsNone(parse_release_date("Date not available"))
+
+    def test_normalized_fields(self) -> None:
+        batman, one_piece, akira = self._items()
+        self.assertEqual(batman["product_id"], "batman-dmaxi001")
+        self.assertEqual(batman["price_cents"], 2900)
+        self.assertEqual(one_piece["release_date_iso"], "2025-03")
+        self.assertIsNone(akira["price_cents"])
+
+    def test_sort_by_price_puts_missing_last(self) -> None:
+        from wishlist_query import apply_query, parse_query_params
+        params, error = parse_query_params({"sort": "price", "order": "desc"})
+        self.assertIsNone(error)
+        items, meta = apply_query(self._items(), params)
+        self.assertEqual([i["name"] for i in items], ["Batman", "One Piece", "Akira"])
+        self.assertEqual(meta["total"], 3)
+
+    def test_filter_and_paginate(self) -> None:
+        from wishlist_query import apply_query, parse_query_params
+        params, _ = parse_query_params({"max_price": "3000", "sort": "name", "page": "2", "page_size": "1"})
+        items, meta = apply_query(self._items(), params)
+        self.assertEqual([i["name"] for i in items], ["One Piece"])
+        self.assertEqual(meta, {"total": 2, "page": 2, "page_size": 1})
+
+    def test_release_filters_match_partial_dates(self) -> None:
+        from wishlist_query import apply_query, parse_query_params
+        params, _ = parse_query_params({"released_after": "2025-03-15"})
+        self.assertEqual([i["name"] for i in apply_query(self._items(), params)[0]], ["One Piece"])
+        params, _ = parse_query_params({"released_before": "2024-03"})
+        self.assertEqual([i["name"] for i in apply_query(self._items(), params)[0]], ["Batman"])
+
+    def test_malformed_release_filter_rejected(self) -> None:
+        from main import app
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        response = app.test_client().post('/get_wishlist_complete?released_after=2024-13',
+                                          json={"email": "x", "password": "y"}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_sort_rejected(self) -> None:
+        from main import app
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        response = app.test_client().post('/get_wishlist_complete?sort=bogus',
+                                          json={"email": "x", "password": "y"}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestComicIndex(unittest.TestCase):
+    """Test the search index over cached comic records."""
+
+    def setUp(self) -> None:
+        import comic_index
+        from main import _cache_lock, comic_cache
+        with _cache_lock:
+            comic_cache.clear()
+        comic_index.clear()
+
+    def _cache_samples(self) -> None:
+        from main import _set_cached_comic
+        _set_cached_comic("https://www.panini.de/a.html", {
+            "title": "Die Schlümpfe 12", "Autor": "Peyo", "ISBN": "978-3-7416-1234-5",
+            "Artikelnummer": "DSCHL012"})
+        _set_cached_comic("https://www.panini.de/b.html", {
+            "title": "Batman: Das lange Halloween", "Autor": "Jeph Loeb", "Zeichner": "Tim Sale"})
+        _set_cached_comic("https://www.panini.de/c.html", {
+            "title": "Superman", "Autor": "Jeph Loeb", "Zeichner": "Tim Sale"})
+
+    def test_umlaut_folding_and_prefix(self) -> None:
+        import comic_index
+        self._cache_samples()
+        self.assertEqual([url for url, _ in comic_index.search("schluempfe")], ["https://www.panini.de/a.html"])
+        self.assertEqual([url for url, _ in comic_index.search("Schlü")], ["https://www.panini.de/a.html"])
+
+    def test_ranking_prefers_title_hits(self) -> None:
+        import comic_index
+        from main import _set_cached_comic
+        self._cache_samples()
+        _set_cached_comic("https://www.panini.de/d.html", {"title": "Loeb Sammelband", "Autor": "Someone"})
+        urls = [url for url, _ in comic_index.search("loeb")]
+        self.assertEqual(urls[0], "https://www.panini.de/d.html")
+        self.assertEqual(len(urls), 3)
+        self.assertEqual([url for url, _ in comic_index.search("loeb batman")], ["https://www.panini.de/b.html"])
+
+    def test_exact_isbn_and_article_number(self) -> None:
+        import comic_index
+        self._cache_samples()
+        self.assertEqual(comic_index.search("9783741612345")[0][0], "https://www.panini.de/a.html")
+        self.assertEqual(comic_index.search("dschl012")[0][0], "https://www.panini.de/a.html")
+
+    def test_eviction_and_route(self) -> None:
+        import comic_index
+        from main import _get_cached_comic, app, comic_cache
+        self._cache_samples()
+        url = "https://www.panini.de/b.html"
+        comic_cache[url] = (comic_cache[url][0] - 90000, comic_cache[url][1])
+        self.assertIsNone(_get_cached_comic(url))
+        self.assertEqual([u for u, _ in comic_index.search("batman")], [])
+
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        response = app.test_client().get('/search_comics?q=sale', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["url"] for r in response.get_json()["result"]], ["https://www.panini.de/c.html"])
+        self.assertEqual(app.test_client().get('/search_comics', headers=headers).status_code, 400)
+
+    def test_plain_cache_miss_keeps_index_entry(self) -> None:
+        import comic_index
+        from main import _get_cached_comic
+        url = "https://www.panini.de/e.html"
+        comic_index.add(url, {"title": "Spawn"})  # cached by a concurrent request right after the miss
+        self.assertIsNone(_get_cached_comic(url))
+        self.assertEqual([u for u, _ in comic_index.search("spawn")], [url])
+
+
+class TestThumbnails(unittest.TestCase):
+    """Test image URL canonicalization and the on-disk thumbnail cache."""
+
+    IMAGE_URL = "https://www.panini.de/media/catalog/product/cache/0f831c1845fc143d00d6d1ebc49f446a/d/m/dmaxi001.jpg"
+
+    def setUp(self) -> None:
+        import tempfile
+        from unittest import mock
+
+        import thumbnails
+        self._tmp = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(thumbnails, "_make_thumbnail", lambda data: (data, "image/jpeg"))
+        self._patch.start()
+
+    def tearDown(self) -> None:
+        self._patch.stop()
+        self._tmp.cleanup()
+
+    def _fake_fetch(self, calls: list[str]) -> object:
+        from types import SimpleNamespace
+
+        def request(method: str, url: str, **kwargs: object) -> SimpleNamespace:
+            calls.append(url)
+            return SimpleNamespace(status=200, data=url.encode("utf-8") * 10)
+        return request
+
+    def test_canonical_image_url(self) -> None:
+        from thumbnails import canonical_image_url
+        self.assertEqual(canonical_image_url(self.IMAGE_URL + "?v=2"),
+                         "https://www.panini.de/media/catalog/product/d/m/dmaxi001.jpg")
+        self.assertEqual(canonical_image_url("/media/a.jpg"), "/media/a.jpg")
+
+    def test_register_rejects_foreign_hosts(self) -> None:
+        from thumbnails import ThumbnailCache
+        cache = ThumbnailCache(self._tmp.name)
+        self.assertIsNone(cache.register("https://evil.example.com/a.jpg"))
+        self.assertEqual(cache.register(self.IMAGE_URL), cache.register(self.IMAGE_URL.replace("0f831c", "aaaaaa")))
+
+    def test_route_fetches_once_and_honours_etag(self) -> None:
+        from unittest import mock
+
+        import thumbnails
+        from main import app
+        cache = thumbnails.ThumbnailCache(self._tmp.name)
+        thumb_id = cache.register(self.IMAGE_URL)
+        calls: list[str] = []
+        client = app.test_client()
+        with mock.patch.object(thumbnails, "_cache", cache), \
+                mock.patch("http_client.request", self._fake_fetch(calls)):
+            first = client.get(f'/thumbnail/{thumb_id}')
+            self.assertEqual(first.status_code, 200)
+            self.assertNotIn("immutable", first.headers["Cache-Control"])
+            second = client.get(f'/thumbnail/{thumb_id}', headers={"If-None-Match": first.headers["ETag"]})
+            self.assertEqual(second.status_code, 304)
+            first.close()
+            second.close()
+            self.assertEqual(client.get('/thumbnail/' + "0" * 32).status_code, 404)
+        self.assertEqual(len(calls), 1)
+
+    def test_eviction_keeps_cache_bounded(self) -> None:
+        from unittest import mock
+
+        from thumbnails import ThumbnailCache
+        cache = ThumbnailCache(self._tmp.name, max_bytes=1000)
+        calls: list[str] = []
+        with mock.patch("http_client.request", self._fake_fetch(calls)):
+            for i in range(5):
+                cache.get(cache.register(f"https://www.panini.de/media/{i:04d}/image.jpg"))
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["bytes"], 1000)
+        self.assertGreater(stats["evictions"], 0)
+        # Evicted entries take their files along, so the directory stays bounded too.
+        self.assertEqual(len(os.listdir(os.path.join(self._tmp.name, "entries"))), stats["entries"])
+        self.assertLess(stats["entries"], 5)
+        # A later worker sizes the directory up once and enforces the same bound.
+        self.assertEqual(ThumbnailCache(self._tmp.name, max_bytes=1000).get_stats()["bytes"], stats["bytes"])
+
+    def test_workers_share_registrations_and_fetches(self) -> None:
+        from unittest import mock
+
+        from thumbnails import ThumbnailCache
+        registering, serving = ThumbnailCache(self._tmp.name), ThumbnailCache(self._tmp.name)
+        thumb_id = registering.register(self.IMAGE_URL)
+        calls: list[str] = []
+        with mock.patch("http_client.request", self._fake_fetch(calls)):
+            self.assertIsNotNone(serving.get(thumb_id))
+            self.assertIsNotNone(registering.get(thumb_id))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(serving._fetch_locks), 0)
+
+
+class TestFingerprint(unittest.TestCase):
+    """Test content fingerprints and conditional HTTP revalidation."""
+
+    def setUp(self) -> None:
+        import fingerprint
+        fingerprint.reset()
+
+    def test_session_tokens_are_ignored(self) -> None:
+        import fingerprint
+        first = '<li><a href="/cart/add/uenc/aHR0cA,,/" data-post=\'{"form_key":"a1"}\'>Batman</a></li>'
+        second = '<li>\n  <a href="/cart/add/uenc/Zm9v/" data-post=\'{"form_key":"b2"}\'>Batman</a></li>'
+        self.assertEqual(fingerprint.compute(first), fingerprint.compute(second))
+        self.assertNotEqual(fingerprint.compute(first), fingerprint.compute(first.replace("Batman", "Robin")))
+
+    def test_lookup_returns_copy_only_for_same_fingerprint(self) -> None:
+        import fingerprint
+        fingerprint.remember("product", "u", "fp1", {"price": "9,99 €"})
+        self.assertIsNone(fingerprint.lookup("product", "u", "fp2"))
+        hit = fingerprint.lookup("product", "u", "fp1")
+        hit["price"] = "changed"
+        self.assertEqual(fingerprint.lookup("product", "u", "fp1"), {"price": "9,99 €"})
+        self.assertEqual(fingerprint.get_stats()["hits"], 2)
+
+    def test_conditional_get_revalidates_with_etag(self) -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        import http_client
+        seen: list[str | None] = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                seen.append(self.headers.get("If-None-Match"))
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "5")
+                self.end_headers()
+                self.wfile.write(b"hello")
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/page"
+            self.assertEqual(http_client.conditional_get(url), (200, b"hello", True))
+            self.assertEqual(http_client.conditional_get(url), (200, b"hello", False))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(seen, [None, '"v1"'])
+
+    def test_http_backend_reuses_result_on_not_modified(self) -> None:
+        from unittest import mock
+
+        import fingerprint
+        import get_comic_information
+        from scraper_backend import HttpBackend
+        from warmup import FIXTURES_DIR
+        with open(os.path.join(FIXTURES_DIR, "product.html"), encoding="utf-8") as f:
+            html = f.read().encode("utf-8")
+        url = "https://www.panini.de/shp_deu_de/one-piece-105.html"
+        responses = iter([(200, html, True), (200, html, False)])
+        parse = mock.Mock(wraps=get_comic_information.parse_product_html)
+        compute = mock.Mock(wraps=fingerprint.compute)
+        with mock.patch("http_client.conditional_get", lambda url: next(responses)), \
+                mock.patch.object(get_comic_information, "parse_product_html", parse), \
+                mock.patch.object(fingerprint, "compute", compute), mock.patch("price_history.observe"):
+            first = HttpBackend().get_information(url)
+            second = HttpBackend().get_information(url)
+        self.assertNotIn("error", first)
+        self.assertEqual(second, first)
+        self.assertEqual((parse.call_count, compute.call_count), (1, 1))  # the 304 is neither hashed nor parsed
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test the load-test harness and its fake scraper layer."""
+
+    def test_parse_latency(self) -> None:
+        import random
+
+        from load_test import parse_latency
+        rng = random.Random(1)
+        self.assertEqual(parse_latency("fixed:0.25")(rng), 0.25)
+        self.assertTrue(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2)
+        self.assertGreater(parse_latency("lognormal:0.5,0.3")(rng), 0)
+        with self.assertRaises(ValueError):
+            parse_latency("gamma:1")
+
+    def test_fake_scrapers_drive_real_routes(self) -> None:
+        from unittest import mock
+
+        import main
+        from load_test import FakeScrapers
+        fakes = FakeScrapers({"default": "fixed:0", "test_account": "fixed:0"}, failure_rate=0.0, wishlist_items=3)
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        body = {"email": encrypt("a@b.c"), "password": encrypt("pw")}
+        with mock.patch.multiple(main, get_information=main.get_information, get_wishlist=main.get_wishlist,
+                                 handle_login=main.handle_login, send_wishlist=main.send_wishlist):
+            fakes.install(main)
+            client = main.app.test_client()
+            self.assertEqual(client.post('/test_account', json=body, headers=headers).status_code, 200)
+            response = client.post('/get_wishlist', json=body, headers=headers)
+            self.assertEqual(len(response.get_json()["result"]["data"]), 3)
+            fakes.failure_rate = 1.0
+            self.assertEqual(client.post('/send_wishlist', json=body, headers=headers).status_code, 500)
+
+    @unittest.skipUnless(importlib.util.find_spec("gunicorn"), "gunicorn not installed")
+    def test_drive_under_gunicorn(self) -> None:
+        import argparse
+
+        import load_test
+        args = argparse.Namespace(latency={"default": "fixed:0.01"}, failure_rate=0.0, wishlist_items=5)
+        process, base_url = load_test._start_server(1, 2, args)
+        try:
+            point = load_test.drive(base_url, 2, 0.5, {"test_account": 1})
+        finally:
+            load_test._stop_server(process)
+        self.assertGreater(point["requests"], 0)
+        self.assertEqual(point["error_rate"], 0.0)
+
+
+class TestScraperBackend(unittest.TestCase):
+    """Test backend selection, fixture replay and per-backend stats."""
+
+    def setUp(self) -> None:
+        import fingerprint
+        import scraper_backend
+        scraper_backend.reset()
+        fingerprint.reset()
+
+    def test_backend_chosen_per_operation(self) -> None:
+        from unittest import mock
+
+        from scraper_backend import backend_name_for
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "fixture", "SCRAPER_BACKEND_HANDLE_LOGIN": "selenium"}):
+            self.assertEqual(backend_name_for("get_information"), "fixture")
+            self.assertEqual(backend_name_for("handle_login"), "selenium")
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "bogus"}):
+            self.assertEqual(backend_name_for("get_wishlist"), "selenium")
+
+    def test_fixture_backend_replays_pages(self) -> None:
+        from unittest import mock
+
+        import scraper_backend
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "fixture"}), mock.patch("price_history.observe"), \
+                mock.patch("get_wishlist.thumbnail_path", return_value=""):
+            info = scraper_backend.get_information("https://www.panini.de/shp_deu_de/one-piece-105.html")
+            wishlist = scraper_backend.get_wishlist("fixture@example.com")
+        self.assertEqual(info["ISBN"], "978-3-7416-3623-4")
+        self.assertEqual(info["title"], "One Piece 105")
+        self.assertEqual(len(wishlist["data"]), 3)
+        stats = scraper_backend.get_stats()["fixture"]
+        self.assertEqual(stats["get_information"]["calls"], 1)
+        self.assertEqual(stats["get_wishlist"]["success_rate"], 1.0)
+
+    def test_http_backend_falls_back_for_login(self) -> None:
+        from unittest import mock
+
+        import scraper_backend
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "http"}), \
+                mock.patch.object(scraper_backend.SeleniumBackend, "handle_login", return_value="Login failed"):
+            self.assertEqual(scraper_backend.handle_login("a@b.c", "pw"), "Login failed")
+        stats = scraper_backend.get_stats()
+        self.assertEqual(stats["http"]["handle_login"]["fallbacks"], 1)
+        self.assertEqual(stats["selenium"]["handle_login"]["success_rate"], 0.0)
+
+
+@unittest.skipUnless(os.path.isdir("/proc/self"), "needs /proc")
+class TestBrowserWatchdog(unittest.TestCase):
+    """Test process-tree tracking and limits against a real two-process tree."""
+
+    def setUp(self) -> None:
+        import subprocess
+        import sys
+        import time
+
+        import browser_watchdog
+        code = ("import subprocess, sys, time; "
+                "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); time.sleep(60)")
+        self.proc = subprocess.Popen([sys.executable, "-c", code])
+        self.addCleanup(self._cleanup)
+        self.session = browser_watchdog.track(self.proc.pid, label="test")
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            browser_watchdog.check()
+            if self.session.processes == 2:
+                break
+            time.sleep(0.05)
+
+    def _cleanup(self) -> None:
+        import browser_watchdog
+        browser_watchdog.finish(self.session)
+        self.proc.kill()
+        self.proc.wait()
+
+    def _alive(self, pid: int) -> bool:
+        import browser_watchdog
+        stat = browser_watchdog._read_stat(pid)
+        return stat is not None and stat[1] != "Z"
+
+    def _all_dead(self, pids: list[int]) -> bool:
+        import time
+        deadline = time.monotonic() + 5  # SIGKILL delivery is asynchronous
+        while any(self._alive(pid) for pid in pids):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def test_tracks_tree_and_peak_rss(self) -> None:
+        self.assertEqual(self.session.processes, 2)
+        self.assertGreater(self.session.peak_rss, 0)
+
+    def test_wall_time_limit_kills_whole_tree(self) -> None:
+        import time
+        from types import SimpleNamespace
+
+        import browser_watchdog
+        browser_watchdog.start(SimpleNamespace(service=SimpleNamespace(process=self.proc)))
+        pids = list(self.session.pids)
+        browser_watchdog.check(now=time.monotonic() + browser_watchdog.BROWSER_MAX_SESSION_SECONDS + 1)
+        self.proc.wait(timeout=5)
+        self.assertEqual(self.session.killed, "wall_time")
+        self.assertTrue(self._all_dead(pids))
+
+    def test_finish_kills_leftover_processes(self) -> None:
+        import browser_watchdog
+        child = next(pid for pid in self.session.pids if pid != self.proc.pid)
+        self.proc.kill()
+        self.proc.wait()
+        self.assertTrue(self._alive(child))
+        browser_watchdog.finish(self.session)
+        self.assertTrue(self._all_dead([child]))
+        self.assertEqual(browser_watchdog.get_stats()["recent"][-1]["label"], "test")
+
+
+class TestResponseEncoding(unittest.TestCase):
+    """Native wishlist results, the legacy string flag and response compression."""
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import main
+        self.main = main
+        items = [{"name": f"Comic {i}", "link": f"https://www.panini.de/c{i}.html", "price": "9,99 €"} for i in range(40)]
+        patcher = mock.patch.object(main, 'get_wishlist', return_value={"message": "Wishlist", "data": items})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = main.app.test_client()
+        self.body = {"email": encrypt("a@b.c"), "password": encrypt("pw")}
+        self.headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+
+    def test_result_is_native_json(self) -> None:
+        response = self.client.post('/get_wishlist_complete', json=self.body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["result"]["data"]), 40)
+
+    def test_legacy_string_result(self) -> None:
+        response = self.client.post('/get_wishlist_complete?result_format=string', json=self.body, headers=self.headers)
+        self.assertEqual(len(json.loads(response.get_json()["result"])["data"]), 40)
+        response = self.client.post('/get_wishlist', json=self.body, headers={**self.headers, "X-Result-Format": "string"})
+        self.assertIsInstance(response.get_json()["result"], str)
+
+    def test_gzip_negotiation(self) -> None:
+        import gzip
+
+        response = self.client.post('/get_wishlist_complete', json=self.body,
+                                    headers={**self.headers, "Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(response.get_data()))["result"]["data"]), 40)
+
+        plain = self.client.post('/get_wishlist_complete', json=self.body, headers=self.headers)
+        self.assertNotIn("Content-Encoding", plain.headers)
+
+    def test_small_responses_stay_uncompressed(self) -> None:
+        response = self.client.get('/queue_status', headers={**self.headers, "Accept-Encoding": "gzip, br"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    @unittest.skipUnless(importlib.util.find_spec("msgpack"), "msgpack not installed")
+    def test_msgpack(self) -> None:
+        import msgpack
+
+        response = self.client.post('/get_wishlist_complete?format=msgpack', json=self.body, headers=self.headers)
+        self.assertEqual(response.mimetype, "application/msgpack")
+        self.assertEqual(len(msgpack.unpackb(response.get_data())["result"]["data"]), 40)
+
+
+class TestDomExtraction(unittest.TestCase):
+    """Product and wishlist reads in one in-page script, with the per-element fallback."""
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import fingerprint
+        fingerprint.reset()
+        for patcher in (mock.patch("price_history.observe"), mock.patch("builtins.print"),
+                        mock.patch("get_wishlist.thumbnail_path", return_value="")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _read(self, mode: str, driver: object | None = None) -> tuple[dict[str, str], int]:
+        from unittest import mock
+
+        import dom_extract
+        import fingerprint
+        from benchmark import fixture_driver
+        from get_comic_information import read_product
+        fingerprint.reset()
+        driver = driver or fixture_driver()
+        with mock.patch.object(dom_extract, "DOM_EXTRACTION", mode):
+            return read_product(driver, "https://www.panini.de/p.html"), driver.round_trips
+
+    def test_script_matches_elements_in_one_round_trip(self) -> None:
+        by_elements, element_trips = self._read("elements")
+        by_script, script_trips = self._read("script")
+        self.assertEqual(by_script, by_elements)
+        self.assertEqual(by_script["ISBN"], "978-3-7416-3623-4")
+        self.assertEqual(script_trips, 1)
+        self.assertGreater(element_trips, 2 * (len(by_elements) - 4))
+
+    def test_script_failure_falls_back_to_elements(self) -> None:
+        from benchmark import fixture_driver
+        driver = fixture_driver()
+        driver.execute_async_script = lambda *args: (_ for _ in ()).throw(RuntimeError("javascript error"))
+        data, _ = self._read("script", driver)
+        self.assertEqual(data["title"], "One Piece 105")
+        self.assertEqual(data["price"], "7,50 €")
+
+    def test_wishlist_list_in_one_round_trip(self) -> None:
+        from benchmark import fixture_driver
+        from get_wishlist import (
+            _wishlist_snapshot,
+            collect_wishlist,
+            iter_wishlist_page,
+        )
+        driver = fixture_driver()
+        snapshot = _wishlist_snapshot(driver)
+        self.assertEqual(driver.round_trips, 1)
+        html = snapshot["listHtml"]
+        result = collect_wishlist(iter_wishlist_page("a@b.c", lambda: html, html))
+        self.assertEqual(len(result["data"]), 3)
+
+
+class TestStructuredData(unittest.TestCase):
+    """JSON-LD and Magento price-box data as the primary source of product fields."""
+
+    def test_json_ld_product(self) -> None:
+        from structured_data import from_json_ld
+        block = json.dumps({"@context": "https://schema.org", "@graph": [
+            {"@type": "BreadcrumbList"},
+            {"@type": ["Product", "Book"], "name": "Batman 1", "isbn": "978-3-7416-0000-1",
+             "author": [{"@type": "Person", "name": "Tom King"}, {"name": "Scott Snyder"}],
+             "datePublished": "2025-03-04", "isPartOf": {"name": "Batman"},
+             "offers": [{"@type": "Offer", "price": 1234.5, "priceCurrency": "EUR"}]},
+        ]})
+        data = from_json_ld(["not json", block])
+        self.assertEqual(data["price"], "1.234,50 €")
+        self.assertEqual(data["name"], "Batman 1")
+        self.assertEqual(data["Autor"], "Tom King, Scott Snyder")
+        self.assertEqual(data["Erscheinungsdatum"], "04.03.2025")
+        self.assertEqual(data["Serie"], "Batman")
+
+    def test_price_box_wins_and_must_match_the_product(self) -> None:
+        from structured_data import extract
+        offer = json.dumps({"@type": "Product", "offers": {"price": "9.99", "priceCurrency": "EUR"}})
+        config = json.dumps({"a": {"priceBox": {"priceConfig": {"productId": "7", "prices": {"finalPrice": {"amount": 5}}}}}})
+        self.assertEqual(extract({"jsonLd": [offer], "priceAmounts": [["oldPrice", "12"], ["finalPrice", "8.5"]]})["price"],
+                         "8,50 €")
+        self.assertEqual(extract({"jsonLd": [offer], "mageInit": [config], "productId": "7"})["price"], "5,00 €")
+        self.assertEqual(extract({"jsonLd": [offer], "mageInit": [config], "productId": "8"})["price"], "9,99 €")
+
+    def test_page_without_rendered_price(self) -> None:
+        from get_comic_information import parse_product_html
+        with open(os.path.join(os.path.dirname(__file__), "fixtures", "product.html"), encoding="utf-8") as f:
+            html = f.read()
+        data = parse_product_html(html.replace('<span class="price">7,50 €</span>', ''), "u")
+        self.assertEqual(data["price"], "7,50 €")
+        # DOM text kept where it agrees with the embedded value
+        self.assertEqual(data["ISBN"], "978-3-7416-3623-4")
+        self.assertEqual(data["Seitenzahl"], "208")
+
+
+class TestMagentoApi(unittest.TestCase):
+    """Batched storefront API lookups against the recorded-response mock server."""
+
+    URL = "https://www.panini.de/shp_deu_de/{}.html"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        import magento_mock
+        cls.server = magento_mock.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import magento_api
+        self.server.queries.clear()
+        for patcher in (mock.patch.object(magento_api, "MAGENTO_GRAPHQL_URL", self.server.url),
+                        mock.patch("price_history.observe")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_get_many_is_one_query(self) -> None:
+        from magento_api import get_many
+        urls = [self.URL.format(key) for key in ("one-piece-band-105-mone105", "unknown-x1", "spider-man-sammelband-1-dspid001")]
+        results = get_many(urls)
+        self.assertEqual(len(self.server.queries), 1)
+        self.assertEqual(set(results), {urls[0], urls[2]})
+        self.assertEqual(results[urls[0]]["price"], "7,50 €")
+        self.assertEqual(results[urls[0]]["Erscheinungsdatum"], "02.10.2024")
+        self.assertEqual(results[urls[0]]["Artikelnummer"], "MONE105")
+        self.assertEqual(results[urls[2]]["price"], "1.234,99 €")
+
+    def test_batches_and_errors(self) -> None:
+        from unittest import mock
+
+        import magento_api
+        with mock.patch.object(magento_api, "MAGENTO_BATCH_SIZE", 2):
+            magento_api.get_many([self.URL.format(f"item-{i}") for i in range(5)])
+        self.assertEqual([len(q["keys"]) for q in self.server.queries], [2, 2, 1])
+        with self.assertRaises(magento_api.MagentoApiError):
+            magento_api._post("{ cart { id } }", {})
+
+    def test_batch_route_uses_cache_then_one_lookup(self) -> None:
+        from unittest import mock
+
+        import main
+        with main._cache_lock:
+            main.comic_cache.clear()
+        cached_url = self.URL.format("batman-die-rueckkehr-des-dunklen-ritters-dmaxi001")
+        main._set_cached_comic(cached_url, {"price": "1,00 €", "name": "cached"})
+        urls = [cached_url, self.URL.format("one-piece-band-105-mone105"), self.URL.format("gone-x2"),
+                "https://evil.example.com/x.html"]
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "api"}):
+            response = main.app.test_client().post('/get_comic_information_batch', json={"urls": urls},
+                                                   headers={"X-API-Key": os.environ['FLASK_API_KEY']})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["result"][cached_url]["name"], "cached")
+        self.assertEqual(body["result"][urls[1]]["name"], "One Piece 105")
+        self.assertEqual(set(body["errors"]), {urls[2], urls[3]})
+        self.assertEqual(self.server.queries, [{"keys": ["one-piece-band-105-mone105", "gone-x2"], "size": 2}])
+        self.assertIsNotNone(main._get_cached_comic(urls[1]))
+
+
+class TestEnrichedWishlist(unittest.TestCase):
+    """?enrich=1 prefetches comic information while parsing and joins it into the items."""
+
+    LINKS = [f"https://www.panini.de/shp_deu_de/comic-{i}.html" for i in range(3)]
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import main
+        self.main = main
+        with main._cache_lock:
+            main.comic_cache.clear()
+        self.release = threading.Event()
+        self.fetched: list[str] = []
+
+        def fake_iter_wishlist(email: str, password: str | None = None) -> object:
+            yield {"event": "page_loaded"}
+            for link in self.LINKS:
+                yield {"event": "item", "data": {"name": link, "link": link.upper()}}
+            yield {"event": "done", "message": "Wishlist", "count": len(self.LINKS)}
+
+        def fake_get_information(url: str) -> dict[str, str]:
+            self.release.wait(5)
+            self.fetched.append(url)
+            return {"price": "5,00 €", "url": url, "name": url}
+
+        prefetcher = main.comic_prefetch.Prefetcher(main._get_cached_comic, main._fetch_comic)
+        for patcher in (mock.patch.object(main, "iter_wishlist", fake_iter_wishlist),
+                        mock.patch.object(main, "get_information", fake_get_information),
+                        mock.patch.object(main, "_prefetcher", prefetcher)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+        self.client = main.app.test_client()
+        self.body = {"email": encrypt("a@b.c"), "password": encrypt("pw")}
+        self.headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+
+    def test_cached_items_joined_and_rest_pending(self) -> None:
+        self.main._set_cached_comic(self.LINKS[0].lower(), {"price": "9,99 €", "name": "cached"})
+        response = self.client.post('/get_wishlist_complete?enrich=1', json=self.body, headers=self.headers)
+        result = response.get_json()["result"]
+        self.assertEqual(result["data"][0]["comic"]["name"], "cached")
+        self.assertFalse(result["data"][0]["comic_pending"])
+        self.assertTrue(all(item["comic_pending"] and item["comic"] is None for item in result["data"][1:]))
+        self.assertEqual(result["comics_pending"], 2)
+
+        self.release.set()
+        self.main._prefetcher.wait(self.LINKS, 5)
+        self.assertEqual(sorted(self.fetched), self.LINKS[1:])
+        self.assertIsNotNone(self.main._get_cached_comic(self.LINKS[2]))
+
+    def test_wait_budget_joins_finished_fetches(self) -> None:
+        from unittest import mock
+
+        self.release.set()
+        with mock.patch.object(self.main, "ENRICH_WAIT_SECONDS", 5):
+            response = self.client.post('/get_wishlist_complete?enrich=1', json=self.body, headers=self.headers)
+        result = response.get_json()["result"]
+        self.assertEqual(result["comics_pending"], 0)
+        self.assertEqual([item["comic"]["price"] for item in result["data"]], ["5,00 €"] * 3)
+
+    def test_batch_without_get_many_uses_prefetch_pool(self) -> None:
+        from unittest import mock
+
+        with mock.patch.dict(os.environ, {"SCRAPER_BACKEND": "selenium"}), \
+                mock.patch.object(self.main, "get_information_many", side_effect=AssertionError("serial fallback")):
+            response = self.client.post('/get_comic_information_batch', json={"urls": self.LINKS},
+                                        headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()["pending"], self.LINKS)
+            self.release.set()
+            self.main._prefetcher.wait(self.LINKS, 5)
+            body = self.client.post('/get_comic_information_batch', json={"urls": self.LINKS},
+                                    headers=self.headers).get_json()
+        self.assertEqual(body["pending"], [])
+        self.assertEqual(sorted(body["result"]), self.LINKS)
+
+    def test_prefetcher_dedupes_and_bounds_queue(self) -> None:
+        from comic_prefetch import Prefetcher
+        prefetcher = Prefetcher(lambda url: None, lambda url: self.release.wait(5) and {}, max_workers=1, max_queued=2)
+        for url in ("a", "a", "b", "c"):
+            prefetcher.submit(url)
+        stats = prefetcher.get_stats()
+        self.assertEqual((stats["submitted"], stats["dropped"], stats["in_flight"]), (2, 1, 2))
+        self.release.set()
+        prefetcher.wait(["a", "b"], 5)
+        self.assertFalse(prefetcher.pending("a"))
+
+
+class TestLoginSessions(unittest.TestCase):
+    """A login check parks its browser so the wishlist scrape that follows can reuse it."""
+
+    class FakeDriver:
+        def __init__(self) -> None:
+            self.quit_calls = 0
+
+        def quit(self) -> None:
+            self.quit_calls += 1
+
+    def setUp(self) -> None:
+        import login_sessions
+        login_sessions.clear()
+        self.addCleanup(login_sessions.clear)
+        self.sessions = login_sessions
+
+    def test_take_returns_parked_driver_once(self) -> None:
+        reused = self.sessions.get_stats()["reused"]
+        driver = self.FakeDriver()
+        self.assertTrue(self.sessions.park("A@b.c", "pw", driver))
+        self.assertIsNone(self.sessions.take("a@b.c", "other"))
+        self.assertIs(self.sessions.take("a@b.c", "pw"), driver)
+        self.assertIsNone(self.sessions.take("a@b.c", "pw"))
+        self.assertEqual(driver.quit_calls, 0)
+        self.assertEqual(self.sessions.get_stats()["reused"], reused + 1)
+
+    def test_expired_and_evicted_sessions_are_quit(self) -> None:
+        import time
+        from unittest import mock
+
+        drivers = [self.FakeDriver() for _ in range(3)]
+        with mock.patch.object(self.sessions, "LOGIN_SESSION_MAX", 2):
+            for i, driver in enumerate(drivers):
+                self.sessions.park(f"user{i}@b.c", "pw", driver)
+        self.assertEqual(drivers[0].quit_calls, 1)
+        self.assertEqual(self.sessions.sweep(time.monotonic() + self.sessions.LOGIN_SESSION_TTL + 1), 2)
+        self.assertEqual([d.quit_calls for d in drivers], [1, 1, 1])
+        self.assertEqual(self.sessions.get_stats()["active"], 0)
+
+    def test_reused_session_skips_login(self) -> None:
+        from unittest import mock
+
+        import get_wishlist
+        driver = self.FakeDriver()
+        self.sessions.park("a@b.c", "pw", driver)
+        with mock.patch.object(get_wishlist, "wait_for_admission"), \
+                mock.patch.object(get_wishlist, "release_admission"), \
+                mock.patch.object(get_wishlist, "new_driver") as new_driver, \
+                mock.patch.object(get_wishlist, "gigya_login") as gigya_login:
+            events = get_wishlist.iter_wishlist("a@b.c", "pw")
+            self.assertEqual([next(events)["event"] for _ in range(2)], ["queued", "browser_started"])
+            self.assertEqual(next(events), {"event": "logged_in"})
+            events.close()
+        new_driver.assert_not_called()
+        gigya_login.assert_not_called()
+        self.assertEqual(driver.quit_calls, 1)
+
+    def test_failed_login_reported_in_result(self) -> None:
+        import contextlib
+        import io
+        from unittest import mock
+
+        import get_wishlist
+        with mock.patch.object(get_wishlist, "wait_for_admission"), \
+                mock.patch.object(get_wishlist, "release_admission"), \
+                mock.patch.object(get_wishlist, "new_driver", return_value=mock.MagicMock()), \
+                mock.patch.object(get_wishlist, "gigya_login", side_effect=RuntimeError("bad credentials")), \
+                contextlib.redirect_stdout(io.StringIO()):
+            result = get_wishlist.login_and_get_wishlist("a@b.c", "pw")
+        self.assertEqual(result["login"], "Login failed")
+        self.assertEqual(result["data"], [])
+
+    def test_route_returns_wishlist_after_login(self) -> None:
+        from unittest import mock
+
+        import main
+        client = main.app.test_client()
+        body = {"email": encrypt("a@b.c"), "password": encrypt("pw")}
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        result = {"login": "Login successful", "message": "Wishlist", "data": [{"name": "One Piece 105"}]}
+        with mock.patch.object(main, "login_and_get_wishlist", return_value=result):
+            response = client.post('/login_and_get_wishlist', json=body, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["message"], "Login successful")
+        self.assertEqual(response.get_json()["result"]["data"][0]["name"], "One Piece 105")
+        with mock.patch.object(main, "login_and_get_wishlist", return_value={"login": "Login failed", "data": []}):
+            response = client.post('/login_and_get_wishlist', json=body, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCancellation(unittest.TestCase):
+    """A request past its X-Request-Deadline, or whose client hung up, stops its scrape."""
+
+    def setUp(self) -> None:
+        import cancellation
+        self.cancellation = cancellation
+
+    def test_deadline_fires_callbacks_once(self) -> None:
+        calls: list[str] = []
+        token = self.cancellation.CancelToken(self.cancellation.parse_deadline(str(time.time() * 1000 + 50)))
+        token.on_cancel("kept", lambda: calls.append("kept"))
+        token.on_cancel("dropped", lambda: calls.append("dropped"))
+        token.discard("dropped")
+        self.assertFalse(token.poll())
+        time.sleep(0.1)
+        self.assertTrue(token.poll())
+        token.poll()
+        self.assertEqual((token.reason, calls), ("deadline", ["kept"]))
+        self.assertIsNone(self.cancellation.parse_deadline("soon"))
+
+    def test_peer_closed_probe(self) -> None:
+        import socket
+
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        probe = self.cancellation.peer_closed(server)
+        self.assertFalse(probe())
+        client.close()
+        self.assertTrue(probe())
+
+    def test_parked_admission_woken_by_cancel(self) -> None:
+        import queue_it
+        self.addCleanup(queue_it._mark_cleared)
+        with queue_it._condition:
+            queue_it._active = True
+            queue_it._probe_owner = -1
+        token = self.cancellation.CancelToken()
+        threading.Timer(0.1, token.cancel, ["disconnected"]).start()
+        with self.cancellation.scope(token), self.assertRaises(self.cancellation.Cancelled):
+            queue_it.wait_for_admission(timeout=5)
+        self.assertLess(time.monotonic() - token.started, 2)
+        self.assertGreaterEqual(self.cancellation.get_stats()["cancelled_disconnected"], 1)
+
+    def test_driver_ready_after_cancel_returns_to_pool(self) -> None:
+        from unittest import mock
+
+        import browser_pool
+        driver = mock.MagicMock()
+        token = self.cancellation.CancelToken()
+        token.cancel("deadline")
+        with mock.patch.object(browser_pool, "_launch", return_value=driver), \
+                mock.patch.object(browser_pool, "_idle", []) as idle, \
+                self.cancellation.scope(token), self.assertRaises(self.cancellation.Cancelled):
+            browser_pool.new_driver()
+        self.assertEqual([d for _, d in idle], [driver])
+        driver.quit.assert_not_called()
+
+    def test_route_answers_504_at_deadline(self) -> None:
+        from unittest import mock
+
+        import main
+
+        def slow_get_information(url: str) -> dict[str, str]:
+            self.cancellation.sleep(10)
+            return {"price": "5,00 €"}
+
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY'], "X-Request-Deadline": str(time.time() * 1000 + 200)}
+        with mock.patch.object(main, "get_information", slow_get_information):
+            response = main.app.test_client().post(
+                '/get_comic_information', json={"url": "https://www.panini.de/shp_deu_de/slow-comic.html"},
+                headers=headers)
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.get_json()["reason"], "deadline")
+        self.assertIsNone(main._get_cached_comic("https://www.panini.de/shp_deu_de/slow-comic.html"))
+
+
+class TestHedging(unittest.TestCase):
+    """A comic lookup stuck in the tail gets a second attempt; the first result wins."""
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import cancellation
+        import hedging
+        self.hedging = hedging
+        patcher = mock.patch.object(cancellation, "CANCEL_POLL_SECONDS", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.attempts: list[str] = []
+        self.lock = threading.Lock()
+
+    def _lookup(self, slow_attempts: set[int]) -> object:
+        import cancellation
+
+        def lookup(url: str) -> dict[str, str]:
+            with self.lock:
+                attempt = len(self.attempts)
+                self.attempts.append(url)
+            try:
+                cancellation.sleep(0.3 if attempt in slow_attempts else 0.01)
+            except cancellation.Cancelled:
+                with self.lock:
+                    self.attempts[attempt] = "cancelled"
+                raise
+            return {"url": url, "attempt": str(attempt)}
+        return lookup
+
+    def test_slow_attempt_hedged_and_loser_cancelled(self) -> None:
+        hedger = self.hedging.Hedger(self._lookup({0}), min_delay=0.05, budget_percent=100)
+        start = time.monotonic()
+        result = hedger.call("https://www.panini.de/shp_deu_de/slow.html")
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(result["attempt"], "1")
+        time.sleep(0.1)
+        self.assertEqual(self.attempts[0], "cancelled")
+        stats = hedger.get_stats()
+        self.assertEqual((stats["hedged"], stats["hedge_won"], stats["in_flight"]), (1, 1, 0))
+
+    def test_budget_limits_hedges(self) -> None:
+        hedger = self.hedging.Hedger(self._lookup({0, 2}), min_delay=0.05, budget_percent=0)
+        hedger.call("https://www.panini.de/shp_deu_de/a.html")  # spends the one starting credit
+        result = hedger.call("https://www.panini.de/shp_deu_de/b.html")
+        self.assertEqual(result["attempt"], "2")
+        stats = hedger.get_stats()
+        self.assertEqual((stats["hedged"], stats["over_budget"]), (1, 1))
+
+    def test_fast_lookup_not_hedged(self) -> None:
+        hedger = self.hedging.Hedger(self._lookup(set()), min_delay=0.05, budget_percent=100)
+        self.assertEqual(hedger.call("https://www.panini.de/shp_deu_de/fast.html")["attempt"], "0")
+        self.assertEqual(len(self.attempts), 1)
+
+    def test_placeholder_result_does_not_win(self) -> None:
+        from unittest import mock
+
+        import main
+        lookup = self._lookup({0})
+
+        def failing_hedge(url: str) -> dict[str, str]:
+            result = lookup(url)
+            if result["attempt"] == "1":  # the hedge's scrape failed
+                return {"price": "Price unavailable", "url": url, "title": "Unknown Title", "scrape_failed": True}
+            return {**result, "price": "5,00 €", "title": "Slow"}
+
+        hedger = self.hedging.Hedger(failing_hedge, min_delay=0.05, budget_percent=100,
+                                     is_success=main._is_complete_comic)
+        url = "https://www.panini.de/shp_deu_de/placeholder.html"
+        self.assertEqual(hedger.call(url)["attempt"], "0")
+        self.assertEqual(hedger.get_stats()["hedge_won"], 0)
+
+        placeholder = {"price": "Price unavailable", "url": url, "title": "Unknown Title", "name": "Unknown Comic",
+                       "scrape_failed": True}
+        sold_out = {"price": "Price unavailable", "url": url, "title": "Sold Out 1", "name": "Sold Out 1"}
+        headers = {"X-API-Key": os.environ['FLASK_API_KEY']}
+        with mock.patch.object(main, "_lookup_comic", return_value=placeholder):
+            response = main.app.test_client().post('/get_comic_information', json={"url": url}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(main._get_cached_comic(url))
+        # A real page without a price is no failure and is cached as before.
+        with mock.patch.object(main, "_lookup_comic", return_value=sold_out):
+            main.app.test_client().post('/get_comic_information', json={"url": url}, headers=headers)
+        self.assertEqual(main._get_cached_comic(url), sold_out)
+
+    def test_placeholder_beats_a_later_exception(self) -> None:
+        import cancellation
+
+        def lookup(url: str) -> dict[str, object]:
+            with self.lock:
+                attempt = len(self.attempts)
+                self.attempts.append(url)
+            if attempt == 0:
+                cancellation.sleep(0.1)
+                return {"url": url, "scrape_failed": True}
+            cancellation.sleep(0.2)
+            raise RuntimeError("browser crashed")
+
+        hedger = self.hedging.Hedger(lookup, min_delay=0.05, budget_percent=100,
+                                     is_success=lambda result: not result.get("scrape_failed"))
+        self.assertTrue(hedger.call("https://www.panini.de/shp_deu_de/x.html")["scrape_failed"])
+
+
+class TestPacing(unittest.TestCase):
+    """Outbound requests are paced per host and back off when the host pushes back."""
+
+    def setUp(self) -> None:
+        from unittest import mock
+
+        import cancellation
+        import pacing
+        pacing.reset()
+        self.addCleanup(pacing.reset)
+        self.pacing = pacing
+        for patcher in (mock.patch.object(cancellation, "CANCEL_POLL_SECONDS", 0.01),
+                        mock.patch.object(pacing, "PACING_COOLDOWN", 0.2),
+                        mock.patch.object(pacing, "PACING_RECOVERY_SECONDS", 1.0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_token_bucket_spaces_requests(self) -> None:
+        pacer = self.pacing.HostPacer("www.panini.de", rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            pacer.release(pacer.acquire(), False, self.pacing.Slot())
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)  # two beyond the burst at 20/s
+        self.assertEqual(pacer.get_stats()["requests"], 4)
+
+    def test_throttled_burst_backs_off_once_then_recovers(self) -> None:
+        pacer = self.pacing.HostPacer("www.panini.de", rate=8, burst=8)
+        started = [pacer.acquire() for _ in range(3)]
+        for begun in started:
+            slot = self.pacing.Slot()
+            slot.throttle(retry_after=0.1)
+            pacer.release(begun, False, slot)
+        stats = pacer.get_stats()
+        self.assertEqual((stats["backoffs"], stats["throttled"], stats["rate"]), (1, 3, 4.0))
+        start = time.monotonic()
+        pacer.release(pacer.acquire(), False, self.pacing.Slot())
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)  # paused for Retry-After
+        self.assertGreater(pacer.get_stats()["rate"], 4.0)
+
+    def test_navigation_limit(self) -> None:
+        pacer = self.pacing.HostPacer("www.panini.de", rate=100, burst=10, max_navigations=1)
+        first = pacer.acquire(navigation=True)
+        acquired = threading.Event()
+
+        def second() -> None:
+            pacer.release(pacer.acquire(navigation=True), True, self.pacing.Slot())
+            acquired.set()
+
+        threading.Thread(target=second, daemon=True).start()
+        self.assertFalse(acquired.wait(0.1))
+        pacer.release(first, True, self.pacing.Slot())
+        self.assertTrue(acquired.wait(1))
+
+    def test_http_429_throttles_host(self) -> None:
+        from unittest import mock
+
+        import http_client
+        response = mock.MagicMock(status=429, headers={"Retry-After": "0"})
+        with mock.patch.object(http_client._pool, "request", return_value=response):
+            http_client.request("GET", "https://www.panini.de/shp_deu_de/a.html")
+            http_client.request("GET", "http://127.0.0.1:8089/graphql")
+        hosts = self.pacing.get_stats()["hosts"]
+        self.assertEqual(list(hosts), ["www.panini.de"])
+        self.assertEqual(hosts["www.panini.de"]["throttled"], 1)
+        self.assertLess(hosts["www.panini.de"]["rate"], self.pacing.PACING_RATE)
+
+    def test_waiting_for_a_slot_is_cancellable(self) -> None:
+        import cancellation
+        pacer = self.pacing.HostPacer("www.panini.de", rate=0.01, burst=1)
+        pacer.acquire()
+        token = cancellation.CancelToken(time.monotonic() + 0.1)
+        with cancellation.scope(token), self.assertRaises(cancellation.Cancelled):
+            pacer.acquire()
+
+    def test_thumbnail_download_yields_to_scrapes(self) -> None:
+        import tempfile
+        from types import SimpleNamespace
+        from unittest import mock
+
+        import http_client
+        import thumbnails
+        fetched: list[str] = []
+
+        def pool_request(method: str, url: str, **kwargs: object) -> SimpleNamespace:
+            fetched.append(url)
+            return SimpleNamespace(status=200, data=b"image", headers={})
+
+        scrape_url = "https://www.panini.de/shp_deu_de/comic.html"
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(self.pacing, "PACING_RATE", 20), \
+                mock.patch.object(http_client._pool, "request", pool_request), \
+                mock.patch.object(thumbnails, "_make_thumbnail", lambda data: (data, "image/jpeg")):
+            pacer = self.pacing.pacer_for("www.panini.de")
+            for _ in range(int(pacer.burst)):
+                pacer.acquire()  # a burst of scrapes emptied the bucket
+            cache = thumbnails.ThumbnailCache(directory)
+            thumb_id = cache.register(TestThumbnails.IMAGE_URL)
+            thumbnail = threading.Thread(target=cache.get, args=(thumb_id,))
+            thumbnail.start()
+            time.sleep(0.02)
+            http_client.request("GET", scrape_url)
+            thumbnail.join(5)
+        self.assertEqual(fetched[0], scrape_url)
+        self.assertEqual(len(fetched), 2)
+        self.assertEqual(self.pacing.get_stats()["hosts"]["www.panini.de"]["background"], 1)
+
+
+class TestAssetProxy(unittest.TestCase):
+    """The caching forward proxy in front of the scrape browsers, against a local origin."""
+
+    def setUp(self) -> None:
+        import tempfile
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        import urllib3
+
+        import asset_proxy
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.origin_requests: list[tuple[str, str | None]] = []
+        requests = self.origin_requests
+
+        class Origin(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                requests.append((self.path, self.headers.get("If-None-Match")))
+                if self.path == "/stale.css" and self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.send_header("ETag", '"v1"')
+                    self.end_headers()
+                    return
+                body = (b"<html>hi</html>" if self.path.endswith(".html") else self.path.encode() * 1000)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html" if self.path.endswith(".html")
+                                 else "text/css" if self.path.endswith(".css") else "application/javascript")
+                if self.path == "/stale.css":
+                    self.send_header("Cache-Control", "max-age=0")
+                    self.send_header("ETag", '"v1"')
+                elif not self.path.endswith(".html"):
+                    self.send_header("Cache-Control", "public, max-age=3600")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.origin = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+        threading.Thread(target=self.origin.serve_forever, daemon=True).start()
+        self.addCleanup(self.origin.server_close)
+        self.addCleanup(self.origin.shutdown)
+        self.base = f"http://127.0.0.1:{self.origin.server_address[1]}"
+        self.proxy = asset_proxy.AssetProxy(self._tmp.name, max_bytes=25000, ca_cert="", ca_key="")
+        self.addCleanup(self.proxy.close)
+        self.http = urllib3.ProxyManager(f"http://{self.proxy.address}", retries=False)
+        self.addCleanup(self.http.clear)
+
+    def test_static_assets_are_cached_and_html_is_not(self) -> None:
+        bodies = [self.http.request("GET", f"{self.base}/app.js").data for _ in range(2)]
+        for _ in range(2):
+            self.http.request("GET", f"{self.base}/page.html")
+        self.assertEqual(bodies[0], b"/app.js" * 1000)
+        self.assertEqual(bodies[0], bodies[1])
+        self.assertEqual([path for path, _ in self.origin_requests], ["/app.js", "/page.html", "/page.html"])
+        stats = self.proxy.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["passed"]), (1, 1, 2))
+        self.assertEqual(stats["bytes_saved"], 7000)
+        self.assertEqual(stats["hit_rate"], 0.25)
+
+    def test_stale_asset_is_revalidated(self) -> None:
+        bodies = [self.http.request("GET", f"{self.base}/stale.css").data for _ in range(2)]
+        self.assertEqual(bodies[1], b"/stale.css" * 1000)
+        self.assertEqual(self.origin_requests, [("/stale.css", None), ("/stale.css", '"v1"')])
+        self.assertEqual(self.proxy.get_stats()["revalidated"], 1)
+
+    def test_cache_is_bounded_on_disk(self) -> None:
+        import asset_proxy
+        for name in ("a", "b", "c"):
+            self.http.request("GET", f"{self.base}/{name}.js")  # 5000 bytes each
+        self.http.request("GET", f"{self.base}/a.js")  # a is now the most recently used
+        self.http.request("GET", f"{self.base}/long_name.js")  # 13000 bytes
+        cache = self.proxy.cache.get_stats()
+        self.assertEqual((cache["entries"], cache["evictions"]), (3, 1))
+        self.assertLessEqual(cache["bytes"], 25000)
+        entry = self.proxy.cache.lookup(f"{self.base}/a.js", {})
+        self.assertIsNotNone(entry)
+        entry[1].close()
+        self.assertIsNone(self.proxy.cache.lookup(f"{self.base}/b.js", {}))
+        reopened = asset_proxy.AssetCache(self._tmp.name, max_bytes=25000)
+        self.assertEqual(reopened.get_stats()["entries"], 3)
+
+    def test_connect_is_tunnelled_without_a_ca(self) -> None:
+        import socket
+        port = self.origin.server_address[1]
+        with socket.create_connection(("127.0.0.1", self.proxy.port), timeout=5) as sock:
+            sock.sendall(f"CONNECT 127.0.0.1:{port} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+            reply = sock.recv(4096)
+            self.assertTrue(reply.startswith(b"HTTP/1.1 200"), reply)
+            sock.sendall(b"GET /page.html HTTP/1.1\r\nHost: origin\r\nConnection: close\r\n\r\n")
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+        self.assertTrue(response.endswith(b"<html>hi</html>"), response)
+        self.assertEqual(self.proxy.get_stats()["tunnels"], 1)
+
+    def test_chrome_goes_through_the_proxy_when_enabled(self) -> None:
+        from unittest import mock
+
+        import asset_proxy
+        from chrome_options import get_chrome_options
+        self.assertFalse(any("proxy-server" in arg for arg in get_chrome_options().arguments))
+        proxy_class = asset_proxy.AssetProxy
+        self.addCleanup(setattr, asset_proxy, "_proxy", None)
+        with mock.patch.object(asset_proxy, "ASSET_PROXY_ENABLED", True), \
+                mock.patch.object(asset_proxy, "AssetProxy", lambda: proxy_class(self._tmp.name, ca_cert="", ca_key="")):
+            arguments = get_chrome_options().arguments
+            proxy = asset_proxy.get_proxy()
+        self.addCleanup(proxy.close)
+        self.assertIn(f"--proxy-server=http://{proxy.address}", arguments)
+        self.assertEqual(asset_proxy.get_stats()["address"], proxy.address)
+
+
+class TestProfileTemplate(unittest.TestCase):
+    """Per-browser copies of the consent-given Chrome profile template."""
+
+    def setUp(self) -> None:
+        import tempfile
+        from unittest import mock
+
+        import profile_template
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.template_dir = os.path.join(self._tmp.name, "chrome_profile")
+        os.makedirs(os.path.join(self._tmp.name, "clones"))
+        for patcher in (mock.patch.object(profile_template, "PROFILE_TEMPLATE_DIR", self.template_dir),
+                        mock.patch.object(profile_template, "PROFILE_CLONE_DIR", os.path.join(self._tmp.name, "clones")),
+                        mock.patch.object(profile_template, "_template", None),
+                        mock.patch.object(profile_template, "_building", False),
+                        mock.patch.object(profile_template, "_failed_at", 0.0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _make_template(self, consent: bool = True, age: float = 0.0) -> None:
+        os.makedirs(os.path.join(self.template_dir, "profile", "Default"))
+        with open(os.path.join(self.template_dir, "profile", "Default", "Cookies"), "w") as f:
+            f.write("consent")
+        with open(os.path.join(self.template_dir, "template.json"), "w") as f:
+            json.dump({"built_at": time.time() - age, "consent": consent, "cookies": ["consent"]}, f)
+
+    def test_clone_is_a_private_copy(self) -> None:
+        import profile_template
+        self._make_template()
+        path = profile_template.clone()
+        self.assertIsNotNone(path)
+        cookies = os.path.join(path, "Default", "Cookies")
+        with open(cookies) as f:
+            self.assertEqual(f.read(), "consent")
+        with open(cookies, "w") as f:
+            f.write("changed by the browser")
+        with open(os.path.join(self.template_dir, "profile", "Default", "Cookies")) as f:
+            self.assertEqual(f.read(), "consent")
+        profile_template.remove_clone(path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_strip_keeps_only_cookies_and_http_cache(self) -> None:
+        import profile_template
+        profile = os.path.join(self._tmp.name, "profile")
+        kept = [os.path.join("Default", "Cookies"), os.path.join("Default", "Cache", "Cache_Data", "index"),
+                "Local State"]
+        dropped = [os.path.join("Default", "Local Storage", "leveldb", "000003.log"),
+                   os.path.join("Default", "Session Storage", "MANIFEST-000001"),
+                   os.path.join("Default", "IndexedDB", "https_www.panini.de_0.indexeddb.leveldb", "LOG"),
+                   os.path.join("Default", "Service Worker", "Database", "LOG"),
+                   os.path.join("Default", "Sessions", "Session_1"), "SingletonLock"]
+        for name in kept + dropped:
+            os.makedirs(os.path.dirname(os.path.join(profile, name)), exist_ok=True)
+            with open(os.path.join(profile, name), "w") as f:
+                f.write("x")
+        profile_template._strip(profile)
+        self.assertEqual([name for name in kept + dropped if os.path.exists(os.path.join(profile, name))], kept)
+
+    def test_missing_or_stale_template_is_built_in_background(self) -> None:
+        from unittest import mock
+
+        import profile_template
+        self._make_template(age=profile_template.PROFILE_TEMPLATE_MAX_AGE + 60)
+        self.assertIsNone(profile_template.template())
+        built = threading.Event()
+        with mock.patch.object(profile_template, "build", side_effect=lambda: built.set() or False) as build:
+            self.assertIsNone(profile_template.clone())
+            self.assertTrue(built.wait(5))
+        build.assert_called_once_with()
+
+    def test_launch_runs_on_a_clone_and_removes_it(self) -> None:
+        from unittest import mock
+
+        import browser_pool
+        import profile_template
+        self._make_template()
+        launched = []
+
+        class FakeChrome:
+            def __init__(self, options: object) -> None:
+                launched.append(options.arguments)
+
+            def get(self, url: str) -> None:
+                pass
+
+            def quit(self) -> None:
+                pass
+
+        with mock.patch.object(browser_pool.webdriver, "Chrome", FakeChrome), \
+                mock.patch("browser_watchdog.track_driver", return_value=None):
+            driver = browser_pool._launch()
+        profile = next(arg.split("=", 1)[1] for arg in launched[0] if arg.startswith("--user-data-dir="))
+        self.assertTrue(os.path.isfile(os.path.join(profile, "Default", "Cookies")))
+        self.assertTrue(profile_template.has_consent(driver))
+        driver.quit()
+        self.assertFalse(os.path.exists(profile))
+
+    def test_consented_browser_does_not_wait_for_the_banner(self) -> None:
+        from selenium.common.exceptions import NoSuchElementException
+
+        import profile_template
+        from panini_session import click_cookie_consent
+        self._make_template()
+
+        class Banner:
+            clicked = False
+
+            def is_displayed(self) -> bool:
+                return True
+
+            def is_enabled(self) -> bool:
+                return True
+
+            def click(self) -> None:
+                self.clicked = True
+
+        class FakeDriver:
+            banner: Banner | None = None
+
+            def find_element(self, by: str, value: str) -> Banner:
+                if self.banner is None:
+                    raise NoSuchElementException(value)
+                return self.banner
+
+        driver = FakeDriver()
+        profile_template.started(driver)
+        start = time.monotonic()
+        self.assertFalse(click_cookie_consent(driver, timeout=10))
+        self.assertLess(time.monotonic() - start, 1)
+
+        # The banner showing up anyway means the template's consent is no longer good.
+        driver.banner = Banner()
+        self.assertTrue(click_cookie_consent(driver, timeout=10))
+        self.assertTrue(driver.banner.clicked)
+        self.assertFalse(profile_template.template()["consent"])
+        self.assertFalse(profile_template.has_consent(driver))
+        other = FakeDriver()
+        profile_template.started(other)
+        self.assertFalse(profile_template.has_consent(other))
+
+
 class TestChromeOptions(unittest.TestCase):
     """Test that Chrome options are configured correctly."""
 
@@ -0,0 +1,245 @@
+"""Canonical product image URLs and a local thumbnail cache.
+
+Wishlist items reference product images on panini.de. Each canonical image
+URL gets a short id; the first request for ``/thumbnail/<id>`` downloads the
+image once, resizes and recompresses it (when Pillow is installed) and stores
+it under ``blobs/``. Each id's entry is a small JSON file under ``entries/``
+carrying the SHA-256 of the stored bytes, so every gunicorn worker can serve
+ids that another one registered. The cache is bounded by
+THUMBNAIL_CACHE_MAX_BYTES, entries and blobs together: each worker sizes up
+the directory once at start, keeps an LRU of the entries it has seen and
+evicts the least recently used entry with its blob. An evicted id is unknown
+until a wishlist registers its image again.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urlparse, urlunparse
+
+import http_client
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+THUMBNAIL_DIR = os.environ.get("THUMBNAIL_DIR", os.path.join(_HERE, "data", "thumbnails"))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get("THUMBNAIL_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+THUMBNAIL_MAX_SIZE = int(os.environ.get("THUMBNAIL_MAX_SIZE", "320"))
+THUMBNAIL_QUALITY = int(os.environ.get("THUMBNAIL_QUALITY", "80"))
+
+_ALLOWED_IMAGE_HOSTS = frozenset({"panini.de", "www.panini.de"})
+_MAGENTO_CACHE_RE = re.compile(r"/cache/[0-9a-f]+/", re.IGNORECASE)
+
+
+def canonical_image_url(url: str) -> str:
+    """Drop Magento's ``/cache/<hash>/`` resize segment, query and fragment."""
+    if not url:
+        return ""
+    url = url.strip()
+    if url.startswith("//"):
+        url = "https:" + url
+    parsed = urlparse(url)
+    path = _MAGENTO_CACHE_RE.sub("/", parsed.path, count=1)
+    scheme = parsed.scheme or ("https" if parsed.netloc else "")
+    return urlunparse((scheme, parsed.netloc.lower(), path, "", "", ""))
+
+
+def thumbnail_id(canonical_url: str) -> str:
+    return hashlib.sha256(canonical_url.encode("utf-8")).hexdigest()[:32]
+
+
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def _sniff_mimetype(data: bytes) -> str:
+    for signature, mimetype in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def _make_thumbnail(data: bytes) -> tuple[bytes, str]:
+    """Resize and recompress ``data``; without Pillow the original is kept."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data, _sniff_mimetype(data)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((THUMBNAIL_MAX_SIZE, THUMBNAIL_MAX_SIZE))
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    except Exception as e:
+        print(f"Could not resize thumbnail, keeping original: {e}")
+        return data, _sniff_mimetype(data)
+    return out.getvalue(), "image/jpeg"
+
+
+class ThumbnailCache:
+    def __init__(self, directory: str, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Only ids being fetched right now keep their lock alive.
+        self._fetch_locks: weakref.WeakValueDictionary[str, threading.Lock] = weakref.WeakValueDictionary()
+        self._entries_dir = os.path.join(directory, "entries")
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        os.makedirs(self._entries_dir, exist_ok=True)
+        # thumbnail id -> bytes of its entry file and blob, least recently used first
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "fetches": 0, "evictions": 0}
+        self._scan()
+
+    def _scan(self) -> None:
+        """Size up the entries on disk once; later changes are accounted for as they are seen."""
+        found = []
+        for name in os.listdir(self._entries_dir):
+            path = os.path.join(self._entries_dir, name)
+            with contextlib.suppress(OSError):
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                elif name.endswith(".json"):
+                    thumb_id = name[:-len(".json")]
+                    found.append((os.path.getmtime(path), thumb_id, self._size_on_disk(thumb_id)))
+        with self._lock:
+            for _, thumb_id, size in sorted(found):
+                self._sizes[thumb_id] = size
+                self._bytes += size
+            self._evict()
+
+    def _blob_path(self, thumb_id: str) -> str:
+        return os.path.join(self.directory, "blobs", thumb_id[:2], thumb_id)
+
+    def _entry_path(self, thumb_id: str) -> str:
+        return os.path.join(self._entries_dir, f"{thumb_id}.json")
+
+    def _size_on_disk(self, thumb_id: str) -> int:
+        size = 0
+        for path in (self._entry_path(thumb_id), self._blob_path(thumb_id)):
+            with contextlib.suppress(OSError):
+                size += os.path.getsize(path)
+        return size
+
+    def _read_entry(self, thumb_id: str) -> dict[str, Any] | None:
+        try:
+            with open(self._entry_path(thumb_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_entry(self, thumb_id: str, entry: dict[str, Any]) -> None:
+        """Write one entry's file; every worker reads the others' entries from there."""
+        path = self._entry_path(thumb_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _account(self, thumb_id: str, size: int) -> None:
+        """Mark ``thumb_id`` most recently used at ``size`` bytes. Caller holds the lock."""
+        self._bytes += size - self._sizes.pop(thumb_id, 0)
+        self._sizes[thumb_id] = size
+
+    def register(self, image_url: str) -> str | None:
+        """Register an image URL and return its thumbnail id (None if not allowed)."""
+        canonical = canonical_image_url(image_url)
+        if urlparse(canonical).hostname not in _ALLOWED_IMAGE_HOSTS:
+            return None
+        thumb_id = thumbnail_id(canonical)
+        # Checked on disk: another worker may have evicted it since.
+        if not os.path.exists(self._entry_path(thumb_id)):
+            self._save_entry(thumb_id, {"url": canonical, "sha256": None})
+            with self._lock:
+                self._account(thumb_id, self._size_on_disk(thumb_id))
+                self._evict()
+        return thumb_id
+
+    def get(self, thumb_id: str) -> dict[str, Any] | None:
+        """Return the cached entry with its blob ``path``, fetching it once if needed."""
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(thumb_id, threading.Lock())
+
+        with fetch_lock:
+            entry = self._read_entry(thumb_id)
+            if entry is None:
+                with self._lock:
+                    self._bytes -= self._sizes.pop(thumb_id, 0)
+                return None
+            path = self._blob_path(thumb_id)
+            if entry.get("sha256") and os.path.exists(path):
+                with self._lock:
+                    self.stats["hits"] += 1
+                    if thumb_id in self._sizes:
+                        self._sizes.move_to_end(thumb_id)
+                    else:  # fetched by another worker
+                        self._account(thumb_id, self._size_on_disk(thumb_id))
+                return {**entry, "path": path}
+
+            # Cosmetic: leave panini.de's request budget to the scrapes first.
+            response = http_client.request("GET", entry["url"], background=True)
+            if response.status != 200:
+                raise OSError(f"Image fetch returned HTTP {response.status}")
+            data, mimetype = _make_thumbnail(response.data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            entry.update({"sha256": hashlib.sha256(data).hexdigest(), "mimetype": mimetype, "size": len(data)})
+            self._save_entry(thumb_id, entry)
+
+            with self._lock:
+                self.stats["fetches"] += 1
+                self._account(thumb_id, self._size_on_disk(thumb_id))
+                self._evict()
+            return {**entry, "path": path}
+
+    def _evict(self) -> None:
+        """Drop least recently used entries, file and blob, until the cache fits. Caller holds the lock."""
+        while self._bytes > self.max_bytes and len(self._sizes) > 1:
+            thumb_id, size = self._sizes.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            for path in (self._entry_path(thumb_id), self._blob_path(thumb_id)):
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._sizes), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+_cache: ThumbnailCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ThumbnailCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(THUMBNAIL_DIR)
+        return _cache
+
+
+def thumbnail_path(image_url: str) -> str:
+    """Register ``image_url`` and return the ``/thumbnail/<id>`` path, or "" if not allowed."""
+    try:
+        thumb_id = get_cache().register(image_url)
+    except Exception as e:
+        print(f"Failed to register thumbnail for {image_url}: {e}")
+        return ""
+    return f"/thumbnail/{thumb_id}" if thumb_id else ""
@@ -0,0 +1,52 @@
+"""Per-worker warm-up run from gunicorn before a worker accepts traffic."""
+import os
+import time
+
+from lazy_import import preload
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_fixtures() -> int:
+    """Run the wishlist parser over the bundled fixtures to warm bs4/lxml and soupsieve."""
+    from bs4 import BeautifulSoup
+
+    from get_wishlist import _parse_product_item
+
+    with open(os.path.join(FIXTURES_DIR, "wishlist.html"), encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "lxml")
+    items = [_parse_product_item(item) for item in soup.select("li.product-item")]
+
+    with open(os.path.join(FIXTURES_DIR, "product.html"), encoding="utf-8") as f:
+        BeautifulSoup(f.read(), "lxml").select("div.additional-attributes-wrapper ul.items li")
+    return len(items)
+
+
+def warm_worker(browsers: int = 0) -> dict[str, float]:
+    """Import the scrapers, parse fixtures and optionally build the profile template and pre-spawn browsers.
+
+    Returns the seconds spent in each phase.
+    """
+    timings: dict[str, float] = {}
+
+    start = time.perf_counter()
+    preload()
+    timings["imports"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_fixtures()
+    timings["fixtures"] = time.perf_counter() - start
+
+    if browsers > 0:
+        import profile_template
+        from browser_pool import prespawn
+
+        start = time.perf_counter()
+        profile_template.ensure()
+        timings["profile"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prespawn(browsers)
+        timings["browsers"] = time.perf_counter() - start
+
+    return timings
@@ -0,0 +1,105 @@
+"""Server-side sort, filter and pagination for normalized wishlist items."""
+import datetime
+import re
+from typing import Any
+
+SORT_KEYS = ("position", "name", "price", "release_date")
+MAX_PAGE_SIZE = 200
+_ISO_DATE_RE = re.compile(r"\d{4}(?:-\d{2}){0,2}")
+
+
+def date_range(iso: str) -> tuple[datetime.date, datetime.date]:
+    """First and last day of a year, month or day date ("2024", "2024-03", "2024-03-15").
+
+    Raises ValueError if ``iso`` is none of those.
+    """
+    if not _ISO_DATE_RE.fullmatch(iso):
+        raise ValueError(f"not an ISO date: {iso!r}")
+    parts = [int(part) for part in iso.split("-")]
+    if len(parts) == 3:
+        day = datetime.date(*parts)
+        return day, day
+    year, month = parts[0], parts[1] if len(parts) == 2 else None
+    if month is None:
+        return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    first = datetime.date(year, month, 1)
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return first, next_month - datetime.timedelta(days=1)
+
+
+def parse_query_params(args: Any) -> tuple[dict[str, Any] | None, str | None]:
+    """Validate sort/filter/paginate request args. Returns (params, error)."""
+    params: dict[str, Any] = {
+        "sort": args.get("sort", "position"),
+        "order": args.get("order", "asc"),
+        "q": (args.get("q") or "").strip().lower(),
+    }
+    if params["sort"] not in SORT_KEYS:
+        return None, f"sort must be one of {', '.join(SORT_KEYS)}"
+    if params["order"] not in ("asc", "desc"):
+        return None, "order must be asc or desc"
+
+    try:
+        for name in ("min_price", "max_price", "page", "page_size"):
+            value = args.get(name)
+            params[name] = int(value) if value not in (None, "") else None
+    except ValueError:
+        return None, "min_price, max_price, page and page_size must be integers"
+
+    try:
+        for name in ("released_after", "released_before"):
+            value = args.get(name)
+            params[name] = date_range(value) if value else None
+    except ValueError:
+        return None, "released_after and released_before must be dates like 2024, 2024-03 or 2024-03-15"
+
+    if params["page_size"] is not None and not 1 <= params["page_size"] <= MAX_PAGE_SIZE:
+        return None, f"page_size must be between 1 and {MAX_PAGE_SIZE}"
+    if params["page"] is not None and params["page"] < 1:
+        return None, "page must be at least 1"
+    return params, None
+
+
+def _sort_key(sort: str) -> Any:
+    # Items without a value always sort last, whatever the direction.
+    if sort == "name":
+        return lambda item: (False, item.get("name", "").casefold())
+    if sort == "price":
+        return lambda item: (item.get("price_cents") is None, item.get("price_cents") or 0)
+    return lambda item: (item.get("release_date_iso") is None, item.get("release_date_iso") or "")
+
+
+def apply_query(items: list[dict[str, Any]], params: dict[str, Any]) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Filter, sort and paginate ``items``. Returns the page and its metadata."""
+    selected = items
+    if params["q"]:
+        q = params["q"]
+        selected = [item for item in selected if q in item.get("name", "").lower()]
+    if params["min_price"] is not None:
+        selected = [i for i in selected if i.get("price_cents") is not None and i["price_cents"] >= params["min_price"]]
+    if params["max_price"] is not None:
+        selected = [i for i in selected if i.get("price_cents") is not None and i["price_cents"] <= params["max_price"]]
+    # Release dates of month or year precision match when any day they cover does.
+    if params["released_after"]:
+        after = params["released_after"][0]
+        selected = [i for i in selected if i.get("release_date_iso") and date_range(i["release_date_iso"])[1] >= after]
+    if params["released_before"]:
+        before = params["released_before"][1]
+        selected = [i for i in selected if i.get("release_date_iso") and date_range(i["release_date_iso"])[0] <= before]
+
+    if params["sort"] != "position":
+        key = _sort_key(params["sort"])
+        with_value = [i for i in selected if not key(i)[0]]
+        without_value = [i for i in selected if key(i)[0]]
+        with_value.sort(key=key, reverse=params["order"] == "desc")
+        selected = with_value + without_value
+    elif params["order"] == "desc":
+        selected = selected[::-1]
+
+    meta: dict[str, Any] = {"total": len(selected)}
+    if params["page_size"] is not None:
+        page = params["page"] or 1
+        start = (page - 1) * params["page_size"]
+        selected = selected[start:start + params["page_size"]]
+        meta.update({"page": page, "page_size": params["page_size"]})
+    return selected, meta